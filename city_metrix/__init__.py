@@ -1,58 +1,120 @@
+import importlib
+import importlib.util
 import os
 import warnings
 from pathlib import Path
+from threading import Lock
 
-import boto3
-import ee
-
-# initialize ee
-if (
-    "GOOGLE_APPLICATION_CREDENTIALS" in os.environ
-    and "GOOGLE_APPLICATION_USER" in os.environ
-):
-    print("Authenticating to GEE with configured credentials file.")
-    CREDENTIAL_FILE = os.environ["GOOGLE_APPLICATION_CREDENTIALS"]
-    GEE_SERVICE_ACCOUNT = os.environ["GOOGLE_APPLICATION_USER"]
-    if CREDENTIAL_FILE.endswith(".json"):
-        auth = ee.ServiceAccountCredentials(
-            GEE_SERVICE_ACCOUNT, key_file=CREDENTIAL_FILE
-        )
+from .constants import S3_MAX_POOL_CONNECTIONS
+
+# Earth Engine and AWS are initialized on first use rather than at import, so that importing the package
+# (e.g. to read a locally cached layer) does not block on the network or prompt for authentication.
+_initialization_lock = Lock()
+_is_ee_initialized = False
+_aws_session = None
+_s3_client = None
+
+
+def initialize_ee():
+    """
+    Initializes Earth Engine once per process. Safe to call before every Earth Engine request.
+    """
+    global _is_ee_initialized
+    if _is_ee_initialized:
+        return
+
+    with _initialization_lock:
+        if _is_ee_initialized:
+            return
+
+        import ee
+
+        if (
+            "GOOGLE_APPLICATION_CREDENTIALS" in os.environ
+            and "GOOGLE_APPLICATION_USER" in os.environ
+        ):
+            print("Authenticating to GEE with configured credentials file.")
+            CREDENTIAL_FILE = os.environ["GOOGLE_APPLICATION_CREDENTIALS"]
+            GEE_SERVICE_ACCOUNT = os.environ["GOOGLE_APPLICATION_USER"]
+            if CREDENTIAL_FILE.endswith(".json"):
+                auth = ee.ServiceAccountCredentials(
+                    GEE_SERVICE_ACCOUNT, key_file=CREDENTIAL_FILE
+                )
+            else:
+                auth = ee.ServiceAccountCredentials(
+                    GEE_SERVICE_ACCOUNT, key_data=CREDENTIAL_FILE
+                )
+            ee.Initialize(auth, opt_url="https://earthengine-highvolume.googleapis.com")
+        else:
+            print("Authenticating GEE by prompting authentication through Google API.")
+            ee.Authenticate()
+            ee.Initialize(project="citiesindicators", opt_url="https://earthengine-highvolume.googleapis.com")
+
+        _is_ee_initialized = True
+
+
+def get_aws_session():
+    """
+    Returns the boto3 session shared by the package, creating it on first use.
+    """
+    global _aws_session
+    if _aws_session is not None:
+        return _aws_session
+
+    with _initialization_lock:
+        if _aws_session is None:
+            _aws_session = _create_aws_session()
+    return _aws_session
+
+
+def get_s3_client():
+    """
+    Returns the pooled S3 client shared by all threads writing to and reading from the cache, creating it on first use.
+    """
+    global _s3_client
+    if _s3_client is not None:
+        return _s3_client
+
+    aws_session = get_aws_session()
+    with _initialization_lock:
+        if _s3_client is None:
+            from botocore.config import Config
+
+            s3_client_config = Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS)
+            try:
+                _s3_client = aws_session.client('s3', config=s3_client_config)
+            except Exception as e:
+                raise Exception(f"Could not initialize S3 client: {e}")
+    return _s3_client
+
+
+def _create_aws_session():
+    import boto3
+
+    credentials_file_path = Path(os.path.join(Path.home(),'.aws', 'credentials'))
+    config_file_path = Path(os.path.join(Path.home(),'.aws', 'config'))
+
+    if "AWS_PROFILE" in os.environ:
+        aws_profile = os.environ["AWS_PROFILE"]
     else:
-        auth = ee.ServiceAccountCredentials(
-            GEE_SERVICE_ACCOUNT, key_data=CREDENTIAL_FILE
-        )
-    ee.Initialize(auth, opt_url="https://earthengine-highvolume.googleapis.com")
-else:
-    print("Authenticating GEE by prompting authentication through Google API.")
-    ee.Authenticate()
-    ee.Initialize(project="citiesindicators", opt_url="https://earthengine-highvolume.googleapis.com")
-
-# initialize aws
-credentials_file_path = Path(os.path.join(Path.home(),'.aws', 'credentials'))
-config_file_path = Path(os.path.join(Path.home(),'.aws', 'config'))
-
-if "AWS_PROFILE" in os.environ:
-    aws_profile = os.environ["AWS_PROFILE"]
-else:
-    aws_profile = "cities-data-dev"
-
-if (
-    "AWS_ACCESS_KEY_ID" in os.environ
-    and "AWS_SECRET_ACCESS_KEY" in os.environ
-):
-    s3_client = boto3.client('s3', region_name='us-east-1')
-elif credentials_file_path.exists() or config_file_path.exists():
-    try:
-        session = boto3.Session(profile_name=aws_profile, region_name='us-east-1')
-        s3_client = session.client('s3')
-    except Exception as e:
-        raise Exception(f"Could not initialize S3 client with profile '{aws_profile}': {e}")
-else:
-    try:
-        session = boto3.Session()
-        s3_client = session.client('s3')
-    except Exception as e:
-        raise Exception(f"Could not initialize S3 client without a profile: {e}")
+        aws_profile = "cities-data-dev"
+
+    if (
+        "AWS_ACCESS_KEY_ID" in os.environ
+        and "AWS_SECRET_ACCESS_KEY" in os.environ
+    ):
+        return boto3.Session(region_name='us-east-1')
+    elif credentials_file_path.exists() or config_file_path.exists():
+        try:
+            return boto3.Session(profile_name=aws_profile, region_name='us-east-1')
+        except Exception as e:
+            raise Exception(f"Could not initialize S3 client with profile '{aws_profile}': {e}")
+    else:
+        try:
+            return boto3.Session()
+        except Exception as e:
+            raise Exception(f"Could not initialize S3 client without a profile: {e}")
+
 
 # set for AWS requests
 os.environ["AWS_REQUEST_PAYER"] = "requester"
@@ -62,4 +124,27 @@ warnings.filterwarnings("ignore", module="xee")
 warnings.filterwarnings("ignore", module="dask")
 warnings.filterwarnings("ignore", module="xarray")
 
-from .metrics import *
+
+def __getattr__(name):
+    # PEP 562: clients and the metric classes previously imported with `from .metrics import *` are resolved
+    # on first access
+    if name == "s3_client":
+        return get_s3_client()
+    if name == "aws_session":
+        return get_aws_session()
+    if name == "__all__":
+        # `from city_metrix import *` still exports the metric classes. The clients are not exported, so that
+        # a star import does not create them.
+        metrics = importlib.import_module(".metrics", __name__)
+        return ["initialize_ee", "get_aws_session", "get_s3_client"] + list(metrics.__all__)
+    if name.startswith("__"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if importlib.util.find_spec(f"{__name__}.{name}") is not None:
+        return importlib.import_module(f".{name}", __name__)
+
+    metrics = importlib.import_module(".metrics", __name__)
+    try:
+        return getattr(metrics, name)
+    except AttributeError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
@@ -1,8 +1,18 @@
+import hashlib
 import os
+import sys
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
 from enum import Enum
+from threading import Lock, get_ident
+
+import numpy as np
+import pandas as pd
+import shapely
+import xarray as xr
 
-from city_metrix import s3_client
 from city_metrix.constants import (
     CSV_FILE_EXTENSION,
     CUSTOM_CACHED_DIFFERENTLY,
@@ -11,13 +21,17 @@ from city_metrix.constants import (
     GEOJSON_FILE_EXTENSION,
     GTIFF_FILE_EXTENSION,
     LOCAL_CACHE_URI,
+    LOCAL_EE_CACHE_MAX_BYTES,
     NETCDF_FILE_EXTENSION,
+    USE_LOCAL_ZONE_INDEX_CACHE,
+    ZONE_INDEX_CACHE_MAX_BYTES,
     GeoType,
 )
 from city_metrix.metrix_dao import (
     get_bucket_name_from_s3_uri,
     get_file_path_from_uri,
     get_uri_scheme,
+    is_s3_key_in_cache_manifest,
     read_csv_from_s3,
     read_geojson_from_cache,
     read_geotiff_from_cache,
@@ -37,7 +51,6 @@ def build_file_key(
     cache_folder_name, feature_id, file_format, is_custom_object = build_cache_name(
         class_obj
     )
-    print(cache_folder_name)
     # Determine if object is a layer or metric
     feature_base_class_name = class_obj.__class__.__bases__[0].__name__
     if s3_bucket is not None:
@@ -116,6 +129,356 @@ def retrieve_city_cache(
     return data, feature_id, file_uri
 
 
+# ============ Request-scoped tile cache ================================
+DEFAULT_TILE_CACHE_MAX_BYTES = 4 * 1024**3
+
+_active_tile_cache = ContextVar("active_tile_cache", default=None)
+
+
+class TileCache:
+    """
+    In-memory LRU cache for layer data retrieved while a metric is running. Entries are keyed by the layer
+    cache name, the query extent and the spatial resolution, and the least-recently-used entries are evicted
+    once the memory budget is exceeded. Cached objects are shared between callers and must not be modified in place.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_TILE_CACHE_MAX_BYTES):
+        self.max_bytes = DEFAULT_TILE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return None
+
+    def __contains__(self, key):
+        # a membership check does not count as a hit or miss, nor refresh the entry
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, data):
+        if data is None:
+            return data
+
+        # Materialize lazy (dask-backed) arrays so that later consumers do not re-query the source
+        if isinstance(data, (xr.DataArray, xr.Dataset)):
+            data = data.load()
+
+        data_bytes = _get_data_nbytes(data)
+        if data_bytes > self.max_bytes:
+            return data
+
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (data, data_bytes)
+            self.current_bytes += data_bytes
+            while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+
+@contextmanager
+def tile_cache_scope(max_bytes: int = None):
+    """
+    Activates a TileCache for all Layer.retrieve_data calls made within the context. Nested scopes reuse the
+    outer cache so that a full metric run shares one cache.
+    """
+    active_cache = _active_tile_cache.get()
+    if active_cache is not None:
+        yield active_cache
+        return
+
+    tile_cache = TileCache(max_bytes)
+    token = _active_tile_cache.set(tile_cache)
+    try:
+        yield tile_cache
+    finally:
+        _active_tile_cache.reset(token)
+        tile_cache.clear()
+
+
+def get_active_tile_cache():
+    return _active_tile_cache.get()
+
+
+def build_tile_cache_key(
+    class_obj,
+    geo_extent,
+    spatial_resolution,
+    aoi_buffer_m=None,
+    city_aoi_subarea=None,
+    s3_bucket=None,
+    output_env=None,
+):
+    # The naming attributes used for the S3 cache name do not cover every parameter, so the full set
+    # of object attributes is included in the key. Masks are not applied by retrieve_data.
+    attributes = _build_attributes_key(class_obj, excluded_attributes=["aggregate", "masks"])
+    bbox = getattr(geo_extent, "bbox", None)
+    bounds = None if bbox is None else tuple(float(value) for value in bbox)
+    extent_key = (
+        geo_extent.geo_type,
+        getattr(geo_extent, "city_id", None),
+        getattr(geo_extent, "aoi_id", None),
+        getattr(geo_extent, "crs", None),
+        bounds,
+    )
+    subarea = None if city_aoi_subarea is None else tuple(city_aoi_subarea)
+
+    return (
+        class_obj.__class__.__name__,
+        attributes,
+        extent_key,
+        spatial_resolution,
+        aoi_buffer_m,
+        subarea,
+        s3_bucket,
+        output_env,
+    )
+
+
+def _build_attributes_key(class_obj, excluded_attributes=()):
+    return tuple(
+        sorted(
+            (key, _build_value_key(value))
+            for key, value in class_obj.__dict__.items()
+            # a layer is its own aggregate
+            if key not in excluded_attributes and value is not class_obj
+        )
+    )
+
+
+def _build_value_key(value):
+    # value-based key, so that equal nested layers and other objects without a value-based repr share entries
+    if value is None or isinstance(value, (str, int, float, bool, Enum)):
+        return repr(value)
+    elif isinstance(value, (list, tuple)):
+        return tuple(_build_value_key(item) for item in value)
+    elif isinstance(value, dict):
+        return tuple(sorted((repr(key), _build_value_key(item)) for key, item in value.items()))
+    elif hasattr(value, "__dict__") and type(value).__repr__ is object.__repr__:
+        return (value.__class__.__name__, _build_attributes_key(value))
+    else:
+        return repr(value)
+
+
+def _get_data_nbytes(data):
+    if isinstance(data, (xr.DataArray, xr.Dataset)):
+        return int(data.nbytes)
+    elif isinstance(data, pd.DataFrame):
+        return int(data.memory_usage(deep=True).sum())
+    elif isinstance(data, pd.Series):
+        return int(data.memory_usage(deep=True))
+    else:
+        return sys.getsizeof(data)
+
+
+# ============ Local Earth Engine download cache ================================
+class ImageCollectionCache:
+    """
+    On-disk LRU cache of ImageCollection downloads under LOCAL_CACHE_URI. Each entry is a NetCDF file named by a
+    hash of the serialized ee expression, scale, CRS and bounds. Reading an entry refreshes its modification time
+    and the least-recently-used entries are removed once the folder exceeds the size budget.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = LOCAL_EE_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+
+    @staticmethod
+    def build_key(ee_expression: str, scale, crs, bounds):
+        bounds = tuple(float(value) for value in bounds)
+        key_source = f"{ee_expression}|{scale}|{crs}|{bounds}"
+        return hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        entry_path = self._get_entry_path(key)
+        try:
+            with xr.open_dataset(entry_path) as cached_data:
+                data = cached_data.load()
+            os.utime(entry_path)
+        except (FileNotFoundError, OSError, ValueError):
+            # a missing, evicted or unreadable entry is a miss and gets replaced
+            data = None
+
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def put(self, key, data):
+        entry_path = self._get_entry_path(key)
+        # concurrent writers of the same entry each use their own partial file
+        partial_path = f"{entry_path}.{os.getpid()}_{get_ident()}.partial"
+        os.makedirs(self.cache_dir, exist_ok=True)
+        try:
+            data.to_netcdf(partial_path)
+        except Exception as e_msg:
+            print(f"Data not written to local Earth Engine cache: {e_msg}")
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            return
+
+        with self._lock:
+            os.replace(partial_path, entry_path)
+            self._evict()
+
+    def _get_entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.{NETCDF_FILE_EXTENSION}")
+
+    def _evict(self):
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.endswith(f".{NETCDF_FILE_EXTENSION}"):
+                file_stat = os.stat(os.path.join(self.cache_dir, file_name))
+                entries.append((file_stat.st_mtime, file_stat.st_size, file_name))
+
+        total_bytes = sum(entry[1] for entry in entries)
+        for _, entry_bytes, file_name in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, file_name))
+            except FileNotFoundError:
+                pass
+            total_bytes -= entry_bytes
+
+
+_image_collection_cache = None
+
+
+def get_image_collection_cache():
+    global _image_collection_cache
+    if _image_collection_cache is None:
+        cache_dir = os.path.join(get_file_path_from_uri(LOCAL_CACHE_URI), "ee")
+        _image_collection_cache = ImageCollectionCache(cache_dir)
+    return _image_collection_cache
+
+
+# ============ Zone-pixel index cache ================================
+class ZonePixelIndexCache:
+    """
+    Process-wide LRU cache of zone-pixel indexes, keyed by a hash of the zones and of the grid they were
+    rasterized to, so that every metric computed over the same zones and tiles reuses one rasterization. Entries
+    are dictionaries of numpy arrays and are optionally persisted as .npz files under LOCAL_CACHE_URI.
+    """
+
+    def __init__(self, max_bytes: int = ZONE_INDEX_CACHE_MAX_BYTES, cache_dir: str = None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def build_key(gdf, transform, shape, crs):
+        digest = hashlib.sha256()
+        digest.update(f"{gdf.crs}|{tuple(transform)}|{tuple(shape)}|{crs}".encode("utf-8"))
+        digest.update(np.asarray(gdf.index, dtype="float64").tobytes())
+        for wkb in shapely.to_wkb(np.asarray(gdf.geometry.values)):
+            digest.update(b"" if wkb is None else wkb)
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        arrays = None
+        if self.cache_dir is not None:
+            try:
+                with np.load(self._get_entry_path(key)) as cached_arrays:
+                    arrays = {name: cached_arrays[name] for name in cached_arrays.files}
+            except (FileNotFoundError, OSError, ValueError):
+                arrays = None
+
+        with self._lock:
+            if arrays is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._put_in_memory(key, arrays)
+        return arrays
+
+    def put(self, key, arrays):
+        self._put_in_memory(key, arrays)
+        if self.cache_dir is None:
+            return
+
+        entry_path = self._get_entry_path(key)
+        partial_path = f"{entry_path}.{os.getpid()}_{get_ident()}.partial"
+        os.makedirs(self.cache_dir, exist_ok=True)
+        try:
+            with open(partial_path, "wb") as entry_file:
+                np.savez(entry_file, **arrays)
+            os.replace(partial_path, entry_path)
+        except OSError as e_msg:
+            print(f"Zone index not written to local cache: {e_msg}")
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _put_in_memory(self, key, arrays):
+        entry_bytes = sum(int(array.nbytes) for array in arrays.values())
+        if entry_bytes > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = arrays
+            self.current_bytes += entry_bytes
+            while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted_arrays = self._entries.popitem(last=False)
+                self.current_bytes -= sum(int(array.nbytes) for array in evicted_arrays.values())
+
+    def _get_entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+
+_zone_pixel_index_cache = None
+
+
+def get_zone_pixel_index_cache():
+    global _zone_pixel_index_cache
+    if _zone_pixel_index_cache is None:
+        cache_dir = (
+            os.path.join(get_file_path_from_uri(LOCAL_CACHE_URI), "zone_index")
+            if USE_LOCAL_ZONE_INDEX_CACHE
+            else None
+        )
+        _zone_pixel_index_cache = ZonePixelIndexCache(cache_dir=cache_dir)
+    return _zone_pixel_index_cache
+
+
 # ============ Object naming ================================
 DATE_ATTRIBUTES = ["year", "start_year", "start_date", "end_year", "end_date"]
 
@@ -314,11 +677,7 @@ def check_if_cache_file_exists(file_uri):
     file_key = get_file_path_from_uri(file_uri)
     if uri_scheme == "s3":
         s3_bucket = get_bucket_name_from_s3_uri(file_uri)
-        response = s3_client.list_objects_v2(Bucket=s3_bucket, Prefix=file_key)
-        for obj in response.get("Contents", []):
-            if obj["Key"] == file_key:
-                return True
-        return False
+        return is_s3_key_in_cache_manifest(s3_bucket, file_key)
     else:
         uri_path = os.path.normpath(get_file_path_from_uri(file_key))
         return os.path.exists(uri_path)
@@ -329,26 +688,8 @@ def is_cache_object_available(file_uri):
     file_key = get_file_path_from_uri(file_uri)
     if uri_scheme == "s3":
         s3_bucket = get_bucket_name_from_s3_uri(file_uri)
-        # Add a trailing slash to the path to check for a folder
-        folder_path = file_key if file_key.endswith("/") else file_key + "/"
-
-        # Check for file
-        file_response = s3_client.list_objects_v2(
-            Bucket=s3_bucket, Prefix=file_key, MaxKeys=1
-        )
-        if "Contents" in file_response:
-            return True
-        else:
-            return False
-
-        # Check for folder
-        folder_response = s3_client.list_objects_v2(
-            Bucket=s3_bucket, Prefix=folder_path, MaxKeys=1
-        )
-        if "Contents" in folder_response:
-            return True
-        else:
-            return False
+        # A prefix match covers both a cached file and a folder of cached tiles
+        return is_s3_key_in_cache_manifest(s3_bucket, file_key, match_prefix=True)
     else:
         uri_path = os.path.normpath(get_file_path_from_uri(file_key))
         return os.path.exists(uri_path)
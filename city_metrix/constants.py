@@ -19,6 +19,17 @@ CIF_DASHBOARD_LAYER_S3_BUCKET_URI = 's3://wri-cities-data-api'
 CIF_CACHE_S3_BUCKET_URI = 's3://wri-cities-indicators'  # 's3://cities-test-sandbox' # 's3://cities-cache-store'
 CIF_TESTING_S3_BUCKET_URI = 's3://cities-test-sandbox'  # not used in new file storage structure
 CIF_ACTIVE_PROCESSING_FILE_NAME = '___NOTICE_SYSTEM_IS_ACTIVELY_PROCESSING_TILES__.csv'
+# The processing notice acts as a lock, renewed on a timer by the run holding it, that expires if it is not renewed
+# within the lease period
+CIF_ACTIVE_PROCESSING_LEASE_SECONDS = 3600
+# S3 transfers: uploads above the threshold are sent as concurrent multipart uploads, and the shared client's
+# connection pool is sized for one upload per dask worker
+S3_MULTIPART_THRESHOLD_BYTES = 64 * 1024 * 1024
+S3_MULTIPART_CHUNK_SIZE_BYTES = 16 * 1024 * 1024
+S3_UPLOAD_MAX_CONCURRENCY = 4
+S3_MAX_POOL_CONNECTIONS = max(10, (os.cpu_count() or 1) * S3_UPLOAD_MAX_CONCURRENCY)
+# Listings of S3 cache folders are memoized in-process for this period
+CIF_CACHE_MANIFEST_TTL_SECONDS = 300
 
 local_cache_directory = os.path.join(Path.home(), 'CIF_local_cache')
 LOCAL_CACHE_URI = f'file://{local_cache_directory}'
@@ -29,6 +40,28 @@ CUSTOM_CACHED_DIFFERENTLY = False
 
 USE_CACHED_LAYERS = False
 
+# Optional local cache of Earth Engine ImageCollection downloads, enabled by setting CIF_EE_LOCAL_CACHE=1
+USE_LOCAL_EE_CACHE = os.environ.get('CIF_EE_LOCAL_CACHE', '0').lower() in ('1', 'true', 'yes')
+LOCAL_EE_CACHE_MAX_BYTES = int(os.environ.get('CIF_EE_LOCAL_CACHE_MAX_BYTES', 20 * 1024**3))
+# Optionally apply Earth Engine masks and group-by layers of zonal statistics server-side in one request per tile,
+# enabled by setting CIF_EE_PUSHDOWN=1
+PUSH_DOWN_EE_REQUESTS = os.environ.get('CIF_EE_PUSHDOWN', '0').lower() in ('1', 'true', 'yes')
+
+# Overture Maps release read by OvertureBuildings, defaulting to the latest published release. Query results are
+# optionally kept in a local parquet cache per release by setting CIF_OVERTURE_LOCAL_CACHE=1
+OVERTURE_RELEASE = os.environ.get('CIF_OVERTURE_RELEASE')
+USE_LOCAL_OVERTURE_CACHE = os.environ.get('CIF_OVERTURE_LOCAL_CACHE', '0').lower() in ('1', 'true', 'yes')
+
+# GBIF occurrence pages read by SpeciesRichness are optionally kept in a local cache per query by setting
+# CIF_GBIF_LOCAL_CACHE=1. Occurrences keep being added and re-graded, so cached queries expire after the TTL
+USE_LOCAL_GBIF_CACHE = os.environ.get('CIF_GBIF_LOCAL_CACHE', '0').lower() in ('1', 'true', 'yes')
+GBIF_LOCAL_CACHE_TTL_SECONDS = int(os.environ.get('CIF_GBIF_LOCAL_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+
+# Zone-pixel indexes built for zonal statistics are kept in memory up to this size, and are also persisted under
+# the local cache by setting CIF_ZONE_INDEX_LOCAL_CACHE=1
+ZONE_INDEX_CACHE_MAX_BYTES = int(os.environ.get('CIF_ZONE_INDEX_CACHE_MAX_BYTES', 1024**3))
+USE_LOCAL_ZONE_INDEX_CACHE = os.environ.get('CIF_ZONE_INDEX_LOCAL_CACHE', '0').lower() in ('1', 'true', 'yes')
+
 CITIES_DATA_API_URL = "https://dev.cities-data-api.wri.org" # at later date, consider switching to "cities-data-api.wri.org". Ask Saif
 
 # CTCM features
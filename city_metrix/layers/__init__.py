@@ -1,50 +1,84 @@
-from .acag_pm2p5 import AcagPM2p5
-from .albedo_cloud_masked import AlbedoCloudMasked
-from .albedo import Albedo
-from .alos_dsm import AlosDSM
-from .aqueduct_flood import AqueductFlood
-from .average_net_building_height import AverageNetBuildingHeight
-from .built_up_height import BuiltUpHeight
-from .cams_ghg import CamsGhg
-from .cams import Cams, CamsSpecies
-from .carbon_flux_from_trees import CarbonFluxFromTrees
-from .era5_hottest_day_gee import Era5HottestDay
-from .esa_world_cover import EsaWorldCover, EsaWorldCoverClass
-from .fab_dem import FabDEM
-from .fractional_vegetation_percent import FractionalVegetationPercent
-from .glad_lulc import LandCoverGlad, LandCoverSimplifiedGlad, LandCoverHabitatGlad, LandCoverHabitatChangeGlad
-from .height_above_nearest_drainage import HeightAboveNearestDrainage
-from .high_land_surface_temperature import HighLandSurfaceTemperature
-from .high_slope import HighSlope
-from .impervious_surface import ImperviousSurface
-from .key_biodiversity_areas import KeyBiodiversityAreas
-from .land_surface_temperature import LandSurfaceTemperature
-from .landsat_collection_2 import LandsatCollection2
-from .nasa_dem import NasaDEM
-from .natural_areas import NaturalAreas
-from .ndvi_sentinel2_gee import NdviSentinel2
-from .ndwi_sentinel2_gee import NdwiSentinel2
-from .nex_gddp_cmip6 import NexGddpCmip6, NexGddpCmip6Variables
-from .open_buildings import OpenBuildings
-from .open_street_map import OpenStreetMap, OpenStreetMapAmenityCount, OpenStreetMapClass
-from .open_urban import OpenUrban
-from .overture_buildings_dsm import OvertureBuildingsDSM
-from .overture_buildings_w_height import OvertureBuildingsHeight
-from .overture_buildings import OvertureBuildings
-from .pop_weighted_pm2p5 import PopWeightedPM2p5
-from .protected_areas import ProtectedAreas
-from .riparian_areas import RiparianAreas
-from .sentinel_2_level_2 import Sentinel2Level2
-from .slope import Slope
-from .species_richness import SpeciesRichness, GBIFTaxonClass
-from .surface_water import SurfaceWater
-from .tree_canopy_cover_mask import TreeCanopyCoverMask
-from .tree_canopy_height import TreeCanopyHeight
-from .tree_canopy_height_for_ctcm import TreeCanopyHeightCTCM
-from .tree_cover import TreeCover
-from .urban_extents import UrbanExtents
-from .urban_land_use import UrbanLandUse
-from .global_building_atlas import GlobalBuildingAtlas
-from .ut_globus import UtGlobus
-from .vegetation_water_map import VegetationWaterMap
-from .world_pop import WorldPop, WorldPopClass
+import importlib
+import importlib.util
+
+# Classes are imported from their modules on first access (PEP 562), so that importing the package does not
+# pull in the dependencies of every module.
+_LAZY_IMPORTS = {
+    "AcagPM2p5": ".acag_pm2p5",
+    "AlbedoCloudMasked": ".albedo_cloud_masked",
+    "Albedo": ".albedo",
+    "AlosDSM": ".alos_dsm",
+    "AqueductFlood": ".aqueduct_flood",
+    "AverageNetBuildingHeight": ".average_net_building_height",
+    "BuiltUpHeight": ".built_up_height",
+    "CamsGhg": ".cams_ghg",
+    "Cams": ".cams",
+    "CamsSpecies": ".cams",
+    "CarbonFluxFromTrees": ".carbon_flux_from_trees",
+    "Era5HottestDay": ".era5_hottest_day_gee",
+    "EsaWorldCover": ".esa_world_cover",
+    "EsaWorldCoverClass": ".esa_world_cover",
+    "FabDEM": ".fab_dem",
+    "FractionalVegetationPercent": ".fractional_vegetation_percent",
+    "LandCoverGlad": ".glad_lulc",
+    "LandCoverSimplifiedGlad": ".glad_lulc",
+    "LandCoverHabitatGlad": ".glad_lulc",
+    "LandCoverHabitatChangeGlad": ".glad_lulc",
+    "HeightAboveNearestDrainage": ".height_above_nearest_drainage",
+    "HighLandSurfaceTemperature": ".high_land_surface_temperature",
+    "HighSlope": ".high_slope",
+    "ImperviousSurface": ".impervious_surface",
+    "KeyBiodiversityAreas": ".key_biodiversity_areas",
+    "LandSurfaceTemperature": ".land_surface_temperature",
+    "LandsatCollection2": ".landsat_collection_2",
+    "NasaDEM": ".nasa_dem",
+    "NaturalAreas": ".natural_areas",
+    "NdviSentinel2": ".ndvi_sentinel2_gee",
+    "NdwiSentinel2": ".ndwi_sentinel2_gee",
+    "NexGddpCmip6": ".nex_gddp_cmip6",
+    "NexGddpCmip6Variables": ".nex_gddp_cmip6",
+    "OpenBuildings": ".open_buildings",
+    "OpenStreetMap": ".open_street_map",
+    "OpenStreetMapAmenityCount": ".open_street_map",
+    "OpenStreetMapClass": ".open_street_map",
+    "OpenUrban": ".open_urban",
+    "OvertureBuildingsDSM": ".overture_buildings_dsm",
+    "OvertureBuildingsHeight": ".overture_buildings_w_height",
+    "OvertureBuildings": ".overture_buildings",
+    "PopWeightedPM2p5": ".pop_weighted_pm2p5",
+    "ProtectedAreas": ".protected_areas",
+    "RiparianAreas": ".riparian_areas",
+    "Sentinel2Level2": ".sentinel_2_level_2",
+    "Slope": ".slope",
+    "SpeciesRichness": ".species_richness",
+    "GBIFTaxonClass": ".species_richness",
+    "SurfaceWater": ".surface_water",
+    "TreeCanopyCoverMask": ".tree_canopy_cover_mask",
+    "TreeCanopyHeight": ".tree_canopy_height",
+    "TreeCanopyHeightCTCM": ".tree_canopy_height_for_ctcm",
+    "TreeCover": ".tree_cover",
+    "UrbanExtents": ".urban_extents",
+    "UrbanLandUse": ".urban_land_use",
+    "GlobalBuildingAtlas": ".global_building_atlas",
+    "UtGlobus": ".ut_globus",
+    "VegetationWaterMap": ".vegetation_water_map",
+    "WorldPop": ".world_pop",
+    "WorldPopClass": ".world_pop",
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    if not name.startswith("_") and importlib.util.find_spec(f"{__name__}.{name}") is not None:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
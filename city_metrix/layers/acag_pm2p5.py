@@ -1,5 +1,6 @@
 import ee
 
+from city_metrix import initialize_ee
 from city_metrix.metrix_model import GeoExtent, Layer, get_image_collection
 
 from ..constants import GTIFF_FILE_EXTENSION
@@ -30,6 +31,7 @@ class AcagPM2p5(Layer):
 
         spatial_resolution = self.resolution or spatial_resolution or DEFAULT_SPATIAL_RESOLUTION
 
+        initialize_ee()
         acag_data = ee.Image(f'projects/wri-datalab/cities/aq/acag_annual_pm2p5_{self.year}')
 
         ee_rectangle = bbox.to_ee_rectangle()
@@ -98,6 +98,31 @@ class Albedo(Layer):
 
     def get_data(self, bbox: GeoExtent, spatial_resolution:int=DEFAULT_SPATIAL_RESOLUTION,
                  resampling_method:str=DEFAULT_RESAMPLING_METHOD):
+        albedo_mean, ee_rectangle, spatial_resolution = self._get_albedo_mean_image(bbox, spatial_resolution,
+                                                                                    resampling_method)
+
+        albedo_mean_ic = ee.ImageCollection(albedo_mean)
+        data = get_image_collection(
+            albedo_mean_ic,
+            ee_rectangle,
+            spatial_resolution,
+            "albedo"
+        ).albedo_mean
+
+        if self.threshold is not None:
+            return data.where(data < self.threshold)
+
+        return data
+
+    def get_ee_image(self, bbox: GeoExtent, spatial_resolution:int=DEFAULT_SPATIAL_RESOLUTION):
+        albedo_mean, ee_rectangle, spatial_resolution = self._get_albedo_mean_image(bbox, spatial_resolution,
+                                                                                    DEFAULT_RESAMPLING_METHOD)
+        if self.threshold is not None:
+            albedo_mean = albedo_mean.updateMask(albedo_mean.lt(self.threshold))
+
+        return albedo_mean, ee_rectangle, spatial_resolution
+
+    def _get_albedo_mean_image(self, bbox: GeoExtent, spatial_resolution, resampling_method):
         # spatial_resolution = DEFAULT_SPATIAL_RESOLUTION if spatial_resolution is None else spatial_resolution
         spatial_resolution = self.resolution or spatial_resolution or DEFAULT_SPATIAL_RESOLUTION
 
@@ -150,18 +175,7 @@ class Albedo(Layer):
                        .reduce(ee.Reducer.mean())
                        )
 
-        albedo_mean_ic = ee.ImageCollection(albedo_mean)
-        data = get_image_collection(
-            albedo_mean_ic,
-            ee_rectangle,
-            spatial_resolution,
-            "albedo"
-        ).albedo_mean
-
-        if self.threshold is not None:
-            return data.where(data < self.threshold)
-
-        return data
+        return albedo_mean, ee_rectangle, spatial_resolution
 
 """
 Determines last day of February since the date varies for leap and non-leap years.
@@ -1,5 +1,6 @@
 import ee
 
+from city_metrix import initialize_ee
 from city_metrix.metrix_model import (
     GeoExtent,
     Layer,
@@ -30,6 +31,7 @@ class AlosDSM(Layer):
         resampling_method = DEFAULT_RESAMPLING_METHOD if resampling_method is None else resampling_method
         validate_raster_resampling_method(resampling_method)
 
+        initialize_ee()
         alos_dsm = ee.ImageCollection("JAXA/ALOS/AW3D30/V3_2")
 
         ee_rectangle  = bbox.to_ee_rectangle()
@@ -2,6 +2,7 @@ import ee
 import numpy as np
 import xarray as xr
 
+from city_metrix import initialize_ee
 from city_metrix.metrix_model import GeoExtent, Layer, get_image_collection
 
 from ..constants import GTIFF_FILE_EXTENSION
@@ -52,6 +53,7 @@ class AqueductFlood(Layer):
         # spatial_resolution = DEFAULT_SPATIAL_RESOLUTION if spatial_resolution is None else spatial_resolution
         spatial_resolution = self.resolution or spatial_resolution or DEFAULT_SPATIAL_RESOLUTION
 
+        initialize_ee()
         # read Aqueduct Floods data
         flood_image = ee.ImageCollection(
             "projects/WRI-Aquaduct/floods/Y2018M08D16_RH_Floods_Inundation_EE_V01/output_V06/inundation")
@@ -1,5 +1,6 @@
 import ee
 
+from city_metrix import initialize_ee
 from city_metrix.metrix_model import GeoExtent, Layer, get_image_collection
 
 from ..constants import GTIFF_FILE_EXTENSION
@@ -28,6 +29,7 @@ class AverageNetBuildingHeight(Layer):
         # US - ee.ImageCollection("projects/wri-datalab/GHSL/GHS-BUILT-H-ANBH_R2023A")
         # GLOBE - ee.Image("projects/wri-datalab/GHSL/GHS-BUILT-H-ANBH_GLOBE_R2023A")
 
+        initialize_ee()
         anbh = ee.Image("projects/wri-datalab/GHSL/GHS-BUILT-H-ANBH_GLOBE_R2023A")
 
         ee_rectangle  = bbox.to_ee_rectangle()
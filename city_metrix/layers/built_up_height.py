@@ -1,5 +1,6 @@
 import ee
 
+from city_metrix import initialize_ee
 from city_metrix.metrix_model import GeoExtent, Layer, get_image_collection
 
 from ..constants import GTIFF_FILE_EXTENSION
@@ -27,6 +28,7 @@ class BuiltUpHeight(Layer):
         # AGBH is the amount of built cubic meters per surface unit in the cell
         # ee.ImageCollection("projects/wri-datalab/GHSL/GHS-BUILT-H-ANBH_R2023A")
 
+        initialize_ee()
         built_height = ee.Image("JRC/GHSL/P2023A/GHS_BUILT_H/2018")
 
         built_height_ic = ee.ImageCollection(built_height)
@@ -6,6 +6,7 @@ import os
 import xarray as xr
 import glob
 
+from city_metrix import initialize_ee
 from city_metrix.constants import WGS_CRS, NETCDF_FILE_EXTENSION
 from city_metrix.metrix_model import Layer, GeoExtent
 from city_metrix.metrix_tools import is_date
@@ -42,6 +43,7 @@ class Era5HottestDay(Layer):
 
         min_lon, min_lat, max_lon, max_lat = geographic_bbox.bounds
 
+        initialize_ee()
         dataset = ee.ImageCollection("ECMWF/ERA5_LAND/HOURLY")
 
         # Function to find the city mean temperature of each hour
@@ -2,6 +2,7 @@ from enum import Enum
 
 import ee
 
+from city_metrix import initialize_ee
 from city_metrix.metrix_model import GeoExtent, Layer, get_image_collection
 
 from ..constants import GTIFF_FILE_EXTENSION
@@ -48,16 +49,7 @@ class EsaWorldCover(Layer):
         # spatial_resolution = DEFAULT_SPATIAL_RESOLUTION if spatial_resolution is None else spatial_resolution
         spatial_resolution = self.resolution or spatial_resolution or DEFAULT_SPATIAL_RESOLUTION
 
-        if self.year == 2020:
-            esa_data_ic = ee.ImageCollection("ESA/WorldCover/v100")
-        elif self.year == 2021:
-            esa_data_ic = ee.ImageCollection("ESA/WorldCover/v200")
-        else:
-            raise ValueError(f'Specified year ({self.year}) is not currently supported')
-
-        if spatial_resolution > DEFAULT_SPATIAL_RESOLUTION:
-            esa_data_ic = esa_data_ic.map(lambda x: x.setDefaultProjection(crs=x.projection().crs(), scale=DEFAULT_SPATIAL_RESOLUTION).reduceResolution(ee.Reducer.mode(), bestEffort=False, maxPixels=2048).reproject(crs=x.projection().crs(), scale=spatial_resolution))
-
+        esa_data_ic = self._get_esa_image_collection(spatial_resolution)
         ee_rectangle  = bbox.to_ee_rectangle()
         data = get_image_collection(
             esa_data_ic,
@@ -70,3 +62,26 @@ class EsaWorldCover(Layer):
             data = data.where(data == self.land_cover_class.value)
 
         return data
+
+    def get_ee_image(self, bbox: GeoExtent, spatial_resolution:int=DEFAULT_SPATIAL_RESOLUTION):
+        spatial_resolution = self.resolution or spatial_resolution or DEFAULT_SPATIAL_RESOLUTION
+
+        esa_data_img = ee.Image(self._get_esa_image_collection(spatial_resolution).first())
+        if self.land_cover_class:
+            esa_data_img = esa_data_img.updateMask(esa_data_img.eq(self.land_cover_class.value))
+
+        return esa_data_img, bbox.to_ee_rectangle(), spatial_resolution
+
+    def _get_esa_image_collection(self, spatial_resolution):
+        initialize_ee()
+        if self.year == 2020:
+            esa_data_ic = ee.ImageCollection("ESA/WorldCover/v100")
+        elif self.year == 2021:
+            esa_data_ic = ee.ImageCollection("ESA/WorldCover/v200")
+        else:
+            raise ValueError(f'Specified year ({self.year}) is not currently supported')
+
+        if spatial_resolution > DEFAULT_SPATIAL_RESOLUTION:
+            esa_data_ic = esa_data_ic.map(lambda x: x.setDefaultProjection(crs=x.projection().crs(), scale=DEFAULT_SPATIAL_RESOLUTION).reduceResolution(ee.Reducer.mode(), bestEffort=False, maxPixels=2048).reproject(crs=x.projection().crs(), scale=spatial_resolution))
+
+        return esa_data_ic
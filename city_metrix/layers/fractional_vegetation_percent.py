@@ -2,6 +2,7 @@ import ee
 import numpy as np
 import xarray as xr
 
+from city_metrix import initialize_ee
 from city_metrix.metrix_model import GeoExtent, Layer, get_image_collection
 from city_metrix.metrix_tools import align_raster_array
 
@@ -32,6 +33,7 @@ class FractionalVegetationPercent(Layer):
         # spatial_resolution = DEFAULT_SPATIAL_RESOLUTION if spatial_resolution is None else spatial_resolution
         spatial_resolution = self.resolution or spatial_resolution or DEFAULT_SPATIAL_RESOLUTION
 
+        initialize_ee()
         dw = ee.ImageCollection("GOOGLE/DYNAMICWORLD/V1")
         S2 = ee.ImageCollection("COPERNICUS/S2_SR_HARMONIZED")
         S2CS = ee.ImageCollection("GOOGLE/CLOUD_SCORE_PLUS/V1/S2_HARMONIZED")
@@ -4,6 +4,7 @@ import pandas as pd
 import geopandas as gpd
 from shapely.geometry import Polygon, MultiPolygon, box
 
+from city_metrix import initialize_ee
 from city_metrix.metrix_model import Layer, WGS_CRS, GeoExtent
 from ..constants import GEOJSON_FILE_EXTENSION
 
@@ -89,6 +90,7 @@ def _parse_tile_bounds(tile_name):
 
 def _find_intersecting_tiles(bbox_shape):
     """List all GBA assets and return paths of tiles that intersect bbox_shape."""
+    initialize_ee()
     try:
         asset_list = ee.data.listAssets(GBA_FOLDER).get('assets', [])
     except Exception as e:
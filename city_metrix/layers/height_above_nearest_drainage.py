@@ -1,5 +1,6 @@
 import ee
 
+from city_metrix import initialize_ee
 from city_metrix.metrix_model import GeoExtent, Layer, get_image_collection
 
 from ..constants import GTIFF_FILE_EXTENSION
@@ -32,6 +33,7 @@ class HeightAboveNearestDrainage(Layer):
         if spatial_resolution not in [30,90]:
             raise Exception(f'spatial_resolution of {spatial_resolution} is currently not supported.')
 
+        initialize_ee()
         if spatial_resolution == 30 and self.river_head == 100:
             hand = ee.ImageCollection('users/gena/global-hand/hand-100')
             # smoothen HAND a bit, scale varies a little in the tiles
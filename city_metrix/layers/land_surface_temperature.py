@@ -1,6 +1,7 @@
 import ee
 from datetime import datetime, timedelta
 import numpy as np
+from city_metrix import initialize_ee
 from city_metrix.metrix_model import GeoExtent, Layer, get_image_collection
 
 from ..constants import GTIFF_FILE_EXTENSION
@@ -33,6 +34,7 @@ class LandSurfaceTemperature(Layer):
         # spatial_resolution = DEFAULT_SPATIAL_RESOLUTION if spatial_resolution is None else spatial_resolution
         spatial_resolution = self.resolution or spatial_resolution or [DEFAULT_SPATIAL_RESOLUTION_LANDSAT, DEFAULT_SPATIAL_RESOLUTION_MODIS][int(self.use_modis)]
 
+        initialize_ee()
         era5_ic = ee.ImageCollection("ECMWF/ERA5_LAND/DAILY_AGGR")
         coarse_era5 = ee.ImageCollection("ECMWF/ERA5/DAILY") # Using ERA5-Land at full resolution causes memory limit errors
 
@@ -1,5 +1,6 @@
 import ee
 
+from city_metrix import initialize_ee
 from city_metrix.metrix_model import (
     GeoExtent,
     Layer,
@@ -34,6 +35,7 @@ class NasaDEM(Layer):
         resampling_method = DEFAULT_RESAMPLING_METHOD if resampling_method is None else resampling_method
         validate_raster_resampling_method(resampling_method)
 
+        initialize_ee()
         nasa_dem = ee.Image("NASA/NASADEM_HGT/001")
 
         ee_rectangle  = bbox.to_ee_rectangle()
@@ -2,6 +2,7 @@ import ee
 import numpy as np
 import xarray as xr
 
+from city_metrix import initialize_ee
 from city_metrix.metrix_model import GeoExtent, Layer, get_image_collection
 
 from ..constants import GTIFF_FILE_EXTENSION
@@ -49,6 +50,7 @@ class NdviSentinel2(Layer):
                     .rename('NDVI'))
             return image.addBands(ndvi)
 
+        initialize_ee()
         s2 = ee.ImageCollection("COPERNICUS/S2_HARMONIZED")
 
         ee_rectangle  = bbox.to_ee_rectangle()
@@ -1,13 +1,17 @@
 import calendar
 import math
+import os
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 
 import ee
 import numpy as np
 
+from city_metrix import initialize_ee
+from city_metrix.metrix_dao import get_file_path_from_uri
 from city_metrix.metrix_model import GeoExtent, Layer
 
-from ..constants import GTIFF_FILE_EXTENSION
+from ..constants import GTIFF_FILE_EXTENSION, LOCAL_CACHE_URI
 
 DEFAULT_SPATIAL_RESOLUTION = 27830
 
@@ -48,6 +52,11 @@ HUSS_EXCLUDED = ['IPSL-CM6A-LR', 'MIROC6', 'NESM3']
 MODELS = [i for i in MODEL_INFO if not i in EXCLUDED_MODELS]
 HIST_START = 1980
 HIST_END = 2014
+# Point time-series requests to Earth Engine run concurrently up to this limit
+MAX_CONCURRENT_SERIES_REQUESTS = 8
+# Fetched series, model rankings and calibration functions are cached on disk per grid cell
+SERIES_CACHE_DIR = os.path.join(get_file_path_from_uri(LOCAL_CACHE_URI), 'nex_gddp_cmip6')
+GRID_CELL_DEGREES = 0.25
 
 
 def hurs_era(latlon, start_year=HIST_START, end_year=HIST_END, yearshift=False, scenario='ssp585'):
@@ -63,6 +72,7 @@ def hurs_era(latlon, start_year=HIST_START, end_year=HIST_END, yearshift=False,
 
     def get_eradata(varname, southern_hem=False):
         # Return numpy array in correct units, leapdays removed
+        initialize_ee()
         dataset = ee.ImageCollection("ECMWF/ERA5/DAILY")
         gee_geom = ee.Geometry.Point((latlon[1], latlon[0]))
         data_vars = dataset.select(varname).filter(ee.Filter.date(
@@ -86,7 +96,41 @@ def hurs_era(latlon, start_year=HIST_START, end_year=HIST_END, yearshift=False,
     return NexGddpCmip6.removeLeapDays(hurs_obs, start_year, end_year, yearshift)
 
 
+def get_grid_cell(latlon, model=None):
+    # Index of the 0.25-degree grid cell that contains the point. Points in the same cell return the same series.
+    # NEX-GDDP-CMIP6 cells have their edges on multiples of 0.25 degrees, while ERA5 cells are centered on them.
+    offset = 0.5 if model == 'ERA5' else 0
+    return (math.floor(latlon[0] / GRID_CELL_DEGREES + offset), math.floor(latlon[1] / GRID_CELL_DEGREES + offset))
+
+
+def _get_cache_path(name):
+    return os.path.join(SERIES_CACHE_DIR, name)
+
+
+def _save_to_cache(file_path, save_fxn, data):
+    os.makedirs(SERIES_CACHE_DIR, exist_ok=True)
+    partial_path = f'{file_path}.{os.getpid()}.partial'
+    with open(partial_path, 'wb') as cache_file:
+        save_fxn(cache_file, data)
+    os.replace(partial_path, file_path)
+
+
 def get_var(varname, model, latlon, start_year=HIST_START, end_year=HIST_END, yearshift=False, scenario='ssp585'):
+    # Returns the series from the local cache when the same variable, model, scenario, years and grid cell were
+    # fetched before
+    series_scenario = 'observed' if model == 'ERA5' else [scenario, 'historical'][int(end_year < 2015)]
+    lat_idx, lon_idx = get_grid_cell(latlon, model)
+    cache_path = _get_cache_path(
+        f'{varname}__{model}__{series_scenario}__{start_year}_{end_year}__{int(yearshift)}__{lat_idx}_{lon_idx}.npy')
+    if os.path.exists(cache_path):
+        return np.load(cache_path)
+
+    result = _fetch_var(varname, model, latlon, start_year, end_year, yearshift, scenario)
+    _save_to_cache(cache_path, np.save, np.asarray(result))
+    return result
+
+
+def _fetch_var(varname, model, latlon, start_year=HIST_START, end_year=HIST_END, yearshift=False, scenario='ssp585'):
     if varname == 'hurs' and model in HURS_EXCLUDED:
         raise Exception(
             f'Model {model} does not include complete data for hurs')
@@ -96,6 +140,7 @@ def get_var(varname, model, latlon, start_year=HIST_START, end_year=HIST_END, ye
     if varname == 'hurs' and model == 'ERA5':
         return hurs_era(latlon, start_year, end_year, yearshift)
 
+    initialize_ee()
     if model == 'ERA5':
         dataset = ee.ImageCollection("ECMWF/ERA5/DAILY")
     else:
@@ -221,98 +266,91 @@ def quarters(d, start_year, end_year, southern_hem=False):
 
 
 def calibration_function(hist_obs, hist_mod):
-    source = np.sort(hist_obs.flatten())
+    # Quantile mapping from the sorted observed values to positions in the sorted modeled values, as fractions of
+    # the observed sample size. hist_mod may be 2-D (models x values) to build one function per model.
+    source = np.sort(np.asarray(hist_obs).flatten())
+    hist_mod = np.asarray(hist_mod)
+    if hist_mod.ndim > 1:
+        return np.array([calibration_function(source, model_values) for model_values in hist_mod])
     target = np.sort(hist_mod.flatten())
 
     if (np.max(source) == 0 and np.min(source) == 0):
         return np.arange(0, target.size) / target.size
     if (np.max(target) == 0 and np.min(target) == 0):
         return np.arange(0, source.size) / source.size
-    new_indices = []
-    # source[-1] = target[-1]  # when target[i] greater than all source values, return max index
-    for target_idx, target_value in enumerate(target):
-        if target_idx < len(source):
-            source_value = source[target_idx]
-            if source_value > target[-1]:
-                new_indices.append(target.size - 1)
-            else:
-                new_indices.append(np.argmax(target >= source_value))
-    return np.array(new_indices) / source.size
 
+    # first target position at or above each source value; values above all targets map to the last position
+    source_values = source[:min(source.size, target.size)]
+    new_indices = np.minimum(np.searchsorted(target, source_values, side='left'), target.size - 1)
+    return new_indices / source.size
 
-def calibrate_interval(uncalibrated_data, calibration_fxn):
-    N = len(uncalibrated_data)
-    unsorted_uncalib = [(i, idx) for idx, i in enumerate(uncalibrated_data)]
-    sorted_uncalib = sorted(unsorted_uncalib)
-    result = [0] * N
-    for j in range(N):
-        X_j = j / (N + 1)
-        Y_jprime = calibration_fxn[math.floor(X_j * len(calibration_fxn))]
-        jprime = math.floor(Y_jprime * (N + 1))
-        result[sorted_uncalib[j][1]] = sorted_uncalib[min(
-            len(sorted_uncalib)-1, jprime)][0]
 
-    return result
+def calibrate_interval(uncalibrated_data, calibration_fxn):
+    # Replaces each value with the value at its quantile-mapped rank. uncalibrated_data may be 2-D
+    # (models x values) with one calibration function per row.
+    uncalibrated_data = np.asarray(uncalibrated_data)
+    calibration_fxn = np.asarray(calibration_fxn)
+    is_1d = uncalibrated_data.ndim == 1
+    data = np.atleast_2d(uncalibrated_data)
+    fxns = np.atleast_2d(calibration_fxn)
+
+    N = data.shape[1]
+    # ties keep their original order
+    order = np.argsort(data, axis=1, kind='stable')
+    sorted_data = np.take_along_axis(data, order, axis=1)
+
+    X = np.arange(N) / (N + 1)
+    Y = fxns[:, np.floor(X * fxns.shape[1]).astype(int)]
+    jprime = np.minimum(np.floor(Y * (N + 1)).astype(int), N - 1)
+
+    result = np.empty_like(sorted_data)
+    np.put_along_axis(result, order, np.take_along_axis(sorted_data, jprime, axis=1), axis=1)
+    return result[0] if is_1d else result
+
+
+def get_season_masks(day_count):
+    # Masks of the MAM, JJA, SON and DJF days of a leap-day-free daily series
+    day_of_year = np.arange(day_count) % 365
+    mam = (day_of_year >= 60) & (day_of_year < 152)
+    jja = (day_of_year >= 152) & (day_of_year < 244)
+    son = (day_of_year >= 244) & (day_of_year < 335)
+    djf = ~(mam | jja | son)
+    return [mam, jja, son, djf]
 
 
 def calibrate(uncalibrated_data, calibration_fxn):
-    mam = []
-    jja = []
-    son = []
-    djf = []
-    mam_idx = []
-    jja_idx = []
-    son_idx = []
-    djf_idx = []
-    for idx, i in enumerate(uncalibrated_data):
-        if idx % 365 >= 60 and idx % 365 < 152:
-            mam.append(uncalibrated_data[idx])
-            mam_idx.append(idx)
-        elif idx % 365 >= 152 and idx % 365 < 244:
-            jja.append(uncalibrated_data[idx])
-            jja_idx.append(idx)
-        elif idx % 365 >= 244 and idx % 365 < 335:
-            son.append(uncalibrated_data[idx])
-            son_idx.append(idx)
-        else:
-            djf.append(uncalibrated_data[idx])
-            djf_idx.append(idx)
-
-    mam_calib = calibrate_interval(np.array(mam), calibration_fxn[0])
-    jja_calib = calibrate_interval(np.array(jja), calibration_fxn[1])
-    son_calib = calibrate_interval(np.array(son), calibration_fxn[2])
-    djf_calib = calibrate_interval(np.array(djf), calibration_fxn[3])
+    # uncalibrated_data may be 2-D (models x days), in which case calibration_fxn holds the four seasonal
+    # functions of each model
+    uncalibrated_data = np.asarray(uncalibrated_data)
+    is_1d = uncalibrated_data.ndim == 1
+    data = np.atleast_2d(uncalibrated_data)
+    fxns = [calibration_fxn] if is_1d else calibration_fxn
 
-    result = [0] * len(uncalibrated_data)
-    for i in range(len(mam_idx)):
-        result[mam_idx[i]] = mam_calib[i]
-    for i in range(len(jja_idx)):
-        result[jja_idx[i]] = jja_calib[i]
-    for i in range(len(son_idx)):
-        result[son_idx[i]] = son_calib[i]
-    for i in range(len(djf_idx)):
-        result[djf_idx[i]] = djf_calib[i]
+    result = np.empty_like(data)
+    for season_idx, season_mask in enumerate(get_season_masks(data.shape[1])):
+        season_fxns = np.array([model_fxns[season_idx] for model_fxns in fxns])
+        result[:, season_mask] = calibrate_interval(data[:, season_mask], season_fxns)
 
-    return np.array(result)
+    return result[0] if is_1d else result
 
 
 def get_best_models(varname, latlon, hist_start, hist_end, num_bestmodels):
     # Select three best models based on RMSD of quarterly mean of variable
-    hist_obs = get_var(varname, 'ERA5', latlon,
-                       start_year=hist_start, end_year=hist_end)
-    hist_mods = {}
-    rmsds = []
     if varname == 'hurs':
         models = [model for model in MODELS if not model in HURS_EXCLUDED]
     elif varname == 'huss':
         models = [model for model in MODELS if not model in HUSS_EXCLUDED]
     else:
         models = MODELS
-    for model in models:
-        hist_mod = get_var(varname, model, latlon,
-                           start_year=hist_start, end_year=hist_end)
-        hist_mods[model] = hist_mod
-        rmsds.append((get_rmsd(hist_obs, hist_mod), model))
+
+    # fetch the observed and modeled series concurrently
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_SERIES_REQUESTS) as executor:
+        futures = {model: executor.submit(get_var, varname, model, latlon, start_year=hist_start, end_year=hist_end)
+                   for model in ['ERA5'] + models}
+        hist_obs = futures['ERA5'].result()
+        hist_mods = {model: futures[model].result() for model in models}
+
+    rmsds = [(get_rmsd(hist_obs, hist_mods[model]), model) for model in models]
     rmsds.sort()
     best_models = []
     families = []
@@ -325,6 +363,36 @@ def get_best_models(varname, latlon, hist_start, hist_end, num_bestmodels):
     return best_models, {model: hist_mods[model] for model in best_models}, hist_obs
 
 
+def get_calibrated_best_models(varname, latlon, hist_start, hist_end, num_bestmodels):
+    # Returns the best models and their quarterly calibration functions, cached per pair of NEX-GDDP-CMIP6 and
+    # ERA5 grid cells
+    lat_idx, lon_idx = get_grid_cell(latlon)
+    era5_lat_idx, era5_lon_idx = get_grid_cell(latlon, 'ERA5')
+    cache_path = _get_cache_path(
+        f'calibration__{varname}__{hist_start}_{hist_end}__{num_bestmodels}__{lat_idx}_{lon_idx}'
+        f'__{era5_lat_idx}_{era5_lon_idx}.npz')
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            best_models = [str(model) for model in cached['best_models']]
+            calibration_fxns = {model: [cached[f'{model}__{i}'] for i in range(4)] for model in best_models}
+        return best_models, calibration_fxns
+
+    best_models, hist_mods, hist_obs = get_best_models(varname, latlon, hist_start, hist_end, num_bestmodels)
+
+    # build the functions of all best models at once, one season at a time
+    o_quarters = quarters(hist_obs, hist_start, hist_end)
+    m_quarters = [quarters(hist_mods[model], hist_start, hist_end) for model in best_models]
+    season_fxns = [calibration_function(o_quarters[i], np.array([q[i].flatten() for q in m_quarters]))
+                   for i in range(4)]
+    calibration_fxns = {model: [season_fxns[i][model_idx] for i in range(4)]
+                        for model_idx, model in enumerate(best_models)}
+
+    cached_arrays = {f'{model}__{i}': calibration_fxns[model][i] for model in best_models for i in range(4)}
+    _save_to_cache(cache_path, lambda cache_file, data: np.savez(cache_file, **data),
+                   {'best_models': np.array(best_models), **cached_arrays})
+    return best_models, calibration_fxns
+
+
 class NexGddpCmip6Variables(Enum):
     # Unit conversions and variable names for NEX-GDDP-CMIP6 and ERA5
     tas = {
@@ -412,21 +480,16 @@ class NexGddpCmip6(Layer):
         
         latlon = (bbox.as_geographic_bbox().centroid.y,
                   bbox.as_geographic_bbox().centroid.x)
-        best_models, hist_mods, hist_obs = get_best_models(
+        best_models, calibration_fxns = get_calibrated_best_models(
             'tasmax', latlon, HIST_START, HIST_END, self.num_models)
 
-        calibration_fxns = {}
-        for model in best_models:
-            o_quarters = quarters(hist_obs, HIST_START, HIST_END)
-            m_quarters = quarters(hist_mods[model], HIST_START, HIST_END)
-            calibration_fxns[model] = [calibration_function(
-                o_quarters[i].flatten(), m_quarters[i].flatten()) for i in range(4)]
-
-        fut_mods = {}
-        for model in best_models:
-            uncalibrated_data = get_var(
-                self.varname, model, latlon, self.start_year, self.end_year)
-            fut_mods[model] = calibrate(
-                uncalibrated_data, calibration_fxns[model])
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_SERIES_REQUESTS) as executor:
+            futures = [executor.submit(get_var, self.varname, model, latlon, self.start_year, self.end_year)
+                       for model in best_models]
+            uncalibrated_data = np.array([future.result() for future in futures])
+
+        # calibrate all models at once
+        calibrated_data = calibrate(uncalibrated_data, [calibration_fxns[model] for model in best_models])
+        fut_mods = {model: calibrated_data[model_idx] for model_idx, model in enumerate(best_models)}
 
         return fut_mods
@@ -4,6 +4,7 @@ import pandas as pd
 import geopandas as gpd
 from shapely.geometry import Polygon, MultiPolygon
 
+from city_metrix import initialize_ee
 from city_metrix.metrix_model import Layer, WGS_CRS, GeoExtent
 from ..constants import GEOJSON_FILE_EXTENSION
 
@@ -24,6 +25,7 @@ class OpenBuildings(Layer):
     def get_data(self, bbox: GeoExtent, spatial_resolution=None, resampling_method=None):
         #Note: spatial_resolution and resampling_method arguments are ignored.
 
+        initialize_ee()
         dataset = ee.FeatureCollection(f"projects/sat-io/open-datasets/VIDA_COMBINED/{self.country}")
         ee_rectangle = bbox.to_ee_rectangle()
         open_buildings = (dataset
@@ -1,9 +1,21 @@
+import hashlib
+import json
+import os
+from functools import lru_cache
+
 import geopandas as gpd
-import subprocess
-from io import StringIO
+import pandas as pd
+import shapely
 
+from city_metrix.metrix_dao import get_file_path_from_uri
 from city_metrix.metrix_model import Layer, GeoExtent
-from ..constants import GEOJSON_FILE_EXTENSION
+from ..constants import (GEOJSON_FILE_EXTENSION, LOCAL_CACHE_URI, OVERTURE_RELEASE, USE_LOCAL_OVERTURE_CACHE,
+                         WGS_CRS)
+
+OVERTURE_BUCKET = 'overturemaps-us-west-2'
+OVERTURE_REGION = 'us-west-2'
+OVERTURE_BUILDINGS_PATH = 'theme=buildings/type=building'
+OVERTURE_CACHE_DIR = os.path.join(get_file_path_from_uri(LOCAL_CACHE_URI), 'overture')
 
 
 class OvertureBuildings(Layer):
@@ -19,24 +31,103 @@ class OvertureBuildings(Layer):
         #Note: spatial_resolution and resampling_method arguments are ignored.
 
         geographic_box = bbox.as_geographic_bbox()
-        geographic_bbox_str = ','.join(map(str, geographic_box.bounds))
+        overture_buildings = get_overture_buildings(geographic_box.bounds)
+
+        utm_crs = bbox.as_utm_bbox().crs
+        overture_buildings = overture_buildings.to_crs(utm_crs)
+
+        return overture_buildings
+
+
+def get_overture_buildings(bounds, release=OVERTURE_RELEASE, use_local_cache=USE_LOCAL_OVERTURE_CACHE):
+    """
+    Reads the Overture buildings intersecting a geographic bbox from the public GeoParquet release.
+
+    :param bounds: (xmin, ymin, xmax, ymax) in WGS84
+    :param release: Overture release, defaulting to the latest one
+    :param use_local_cache: keep the result in a local parquet cache partitioned by release and bbox
+    :return: GeoDataFrame in WGS84
+    """
+    release = release or get_latest_overture_release()
+
+    cache_path = None
+    if use_local_cache:
+        bbox_key = hashlib.sha256(json.dumps([round(b, 7) for b in bounds]).encode()).hexdigest()
+        cache_path = os.path.join(OVERTURE_CACHE_DIR, f'release={release}', f'bbox={bbox_key}', 'part-0.parquet')
+        if os.path.exists(cache_path):
+            return gpd.read_parquet(cache_path)
+
+    source = f'{OVERTURE_BUCKET}/release/{release}/{OVERTURE_BUILDINGS_PATH}'
+    overture_buildings = read_overture_buildings(bounds, source, filesystem=_get_overture_filesystem())
+
+    if cache_path is not None:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        partial_path = f'{cache_path}.{os.getpid()}.partial'
+        overture_buildings.to_parquet(partial_path)
+        os.replace(partial_path, cache_path)
+
+    return overture_buildings
 
-        command = [
-            "overturemaps", "download",
-            "--bbox="+geographic_bbox_str,
-            "-f", "geojson",
-            "--type=building"
-        ]
 
-        result = subprocess.run(command, capture_output=True, text=True)
+def _get_overture_filesystem():
+    from pyarrow import fs
 
-        if result.returncode == 0:
-            geojson_data = result.stdout
-            overture_buildings = gpd.read_file(StringIO(geojson_data))
+    return fs.S3FileSystem(anonymous=True, region=OVERTURE_REGION)
 
-            utm_crs = bbox.as_utm_bbox().crs
-            overture_buildings = overture_buildings.to_crs(utm_crs)
+
+@lru_cache(maxsize=1)
+def get_latest_overture_release():
+    from pyarrow import fs
+
+    release_dirs = _get_overture_filesystem().get_file_info(fs.FileSelector(f'{OVERTURE_BUCKET}/release/'))
+    releases = sorted(info.base_name for info in release_dirs if info.type == fs.FileType.Directory)
+    if not releases:
+        raise Exception('No Overture release found')
+    return releases[-1]
+
+
+def read_overture_buildings(bounds, source, filesystem=None, columns=None):
+    """
+    Streams the features of an Overture GeoParquet dataset that intersect a bbox. Row groups are pruned with the
+    statistics of the per-feature bbox column, and only the requested columns are read.
+
+    :param bounds: (xmin, ymin, xmax, ymax) in WGS84
+    :param source: parquet file or directory
+    :param filesystem: optional pyarrow filesystem of the source, e.g. S3
+    :param columns: columns to read, defaulting to every column except the bbox struct
+    :return: GeoDataFrame in WGS84, where nested columns are encoded as JSON as in a GeoJSON download
+    """
+    import pyarrow.dataset as ds
+
+    xmin, ymin, xmax, ymax = bounds
+    dataset = ds.dataset(source, filesystem=filesystem, format='parquet')
+    bbox_filter = ((ds.field('bbox', 'xmin') <= xmax) & (ds.field('bbox', 'xmax') >= xmin) &
+                   (ds.field('bbox', 'ymin') <= ymax) & (ds.field('bbox', 'ymax') >= ymin))
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name != 'bbox']
+    elif 'geometry' not in columns:
+        columns = [*columns, 'geometry']
+
+    frames = [_record_batch_to_geodataframe(batch)
+              for batch in dataset.to_batches(columns=columns, filter=bbox_filter) if batch.num_rows > 0]
+    if not frames:
+        return gpd.GeoDataFrame(columns=columns, geometry='geometry', crs=WGS_CRS)
+
+    return gpd.GeoDataFrame(pd.concat(frames, ignore_index=True), geometry='geometry', crs=WGS_CRS)
+
+
+def _record_batch_to_geodataframe(batch):
+    import pyarrow.types as pat
+
+    geometry = shapely.from_wkb(batch.column('geometry').to_numpy(zero_copy_only=False))
+    properties = {}
+    for field, column in zip(batch.schema, batch.columns):
+        if field.name == 'geometry':
+            continue
+        if pat.is_nested(field.type):
+            properties[field.name] = [None if value is None else json.dumps(value, default=str)
+                                      for value in column.to_pylist()]
         else:
-            print("Error occurred:", result.stderr)
+            properties[field.name] = column.to_pandas()
 
-        return overture_buildings
+    return gpd.GeoDataFrame(properties, geometry=geometry, crs=WGS_CRS)
@@ -141,20 +141,21 @@ def _join_building_heights(overture_buildings, gba, ut_globus):
     joined_data["height"] = joined_data["gba_height"].fillna(joined_data["utglobus_height"]).fillna(joined_data["overture_height"])
 
     # Explicitly handle the unique uri_scheme for each row
-    joined_data["id"] = joined_data.apply(lambda row: row["id"] if "id" in row else row.name, axis=1)
+    if 'id' not in joined_data.columns:
+        joined_data["id"] = joined_data.index
 
     # Get mode or median of heights from GBA for buildings that overlapped with GBA buildings
     filtered_data = joined_data.dropna(subset=['gba_height'])
-    mode_or_median_df  = filtered_data.groupby('id')['gba_height'].apply(mode_or_median).reset_index()
-    merged_gdf = filtered_data.merge(mode_or_median_df.rename(columns={'gba_height': 'mode_or_med_gba_height'}), on='id')
-    thinned_gdf = merged_gdf.drop(columns=['gba_height', 'utglobus_height', 'height'], errors='ignore')
+    gba_heights = _mode_or_median_by_id(filtered_data['id'], filtered_data['gba_height'])
+    # Rows of a building only differ in the joined heights, so keep one row per building
+    thinned_gdf = filtered_data[~filtered_data['id'].duplicated()].drop(
+        columns=['gba_height', 'utglobus_height', 'height'], errors='ignore')
+    thinned_gdf['mode_or_med_gba_height'] = thinned_gdf['id'].map(gba_heights)
 
-    # Drop duplicates
-    # First flatten multi-valued columns since drop_duplicates() function fails for multi-valued lists and dictionaries
-    # Note: We may be able to simply drop the multi-valued columns, but retaining the content is useful for testing
+    # Flatten multi-valued columns
     thinned_gdf['sources'] = thinned_gdf['sources'].apply(_list_to_string)
     thinned_gdf['names'] = thinned_gdf['names'].apply(_list_to_string)
-    overture_with_globus_height = thinned_gdf.drop_duplicates()
+    overture_with_globus_height = thinned_gdf
 
     # Initializing the height column
     overture_with_globus_height['height'] = overture_with_globus_height['mode_or_med_gba_height']
@@ -162,22 +163,22 @@ def _join_building_heights(overture_buildings, gba, ut_globus):
     overture_with_globus_height['height_source'] = 'GBA'
 
     # Get buildings that did not overlap with a GBA value
-    overture_without_gba_height = joined_data[~joined_data['id'].isin(mode_or_median_df['id'])]
+    overture_without_gba_height = joined_data[~joined_data['id'].isin(gba_heights.index)]
     overture_without_gba_height = overture_without_gba_height.drop(columns=['gba_height'])
 
     # Get mode or median of heights from UT Globus for buildings without GBA height
     filtered_data = overture_without_gba_height.dropna(subset=['utglobus_height'])
-    mode_or_median_utglobus_df = filtered_data.groupby('id')['utglobus_height'].apply(mode_or_median).reset_index()
-    if len(mode_or_median_utglobus_df) > 0:
-        merged_gdf = filtered_data.merge(mode_or_median_utglobus_df.rename(columns={'utglobus_height': 'mode_or_med_utglobus_height'}), on='id')
-        thinned_gdf = merged_gdf.drop(columns=['utglobus_height', 'height'])
+    utglobus_heights = _mode_or_median_by_id(filtered_data['id'], filtered_data['utglobus_height'])
+    if len(utglobus_heights) > 0:
+        thinned_gdf = filtered_data[~filtered_data['id'].duplicated()].drop(columns=['utglobus_height', 'height'])
+        thinned_gdf['mode_or_med_utglobus_height'] = thinned_gdf['id'].map(utglobus_heights)
         thinned_gdf['sources'] = thinned_gdf['sources'].apply(_list_to_string)
         thinned_gdf['names'] = thinned_gdf['names'].apply(_list_to_string)
-        overture_with_utglobus_height = thinned_gdf.drop_duplicates()
+        overture_with_utglobus_height = thinned_gdf
         overture_with_utglobus_height['height'] = overture_with_utglobus_height['mode_or_med_utglobus_height']
         overture_with_utglobus_height['height_source'] = 'UTGlobus'
 
-        overture_without_utglobus_height = overture_without_gba_height[~overture_without_gba_height['id'].isin(mode_or_median_utglobus_df['id'])]
+        overture_without_utglobus_height = overture_without_gba_height[~overture_without_gba_height['id'].isin(utglobus_heights.index)]
         overture_without_utglobus_height = overture_without_utglobus_height.drop(columns=['utglobus_height'])
         overture_without_utglobus_height['mode_or_med_utglobus_height'] = np.nan
         overture_without_utglobus_height['height_source'] = np.where(overture_without_utglobus_height['overture_height'].notna(), 'Overture', '')
@@ -196,28 +197,44 @@ def _join_building_heights(overture_buildings, gba, ut_globus):
     return df_combined
 
 
-def mode_or_median(series):
-    mode_values = series.mode()
-    if mode_values.size == 1:
-        return mode_values.iloc[0]
-    else:
-        y = custom_median(series)
-        return y
+def _mode_or_median_by_id(ids, values):
+    # Per building id, the single most frequent value or, when several values are equally frequent, the lower
+    # median. Values are sorted within each id so that runs of equal values and medians come from offsets.
+    codes, unique_ids = pd.factorize(ids)
+    # missing ids are not grouped
+    values = np.asarray(values, dtype='float64')[codes >= 0]
+    codes = codes[codes >= 0]
+    if len(codes) == 0:
+        return pd.Series(values, index=unique_ids, dtype='float64')
 
+    order = np.lexsort((values, codes))
+    sorted_codes = codes[order]
+    sorted_values = values[order]
+    n = len(sorted_codes)
 
-def custom_median(series):
-    sorted_values = np.sort(series)
-    n = len(sorted_values)
+    new_group = np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]
+    group_starts = np.flatnonzero(new_group)
+    group_sizes = np.diff(np.r_[group_starts, n])
 
-    if n % 2 == 1:  # Odd length, return the center value
-        return sorted_values[n // 2]
-    else:  # Even length, return the lower of the two middle values
-        return sorted_values[n // 2 - 1]
+    run_starts = np.flatnonzero(new_group | np.r_[True, sorted_values[1:] != sorted_values[:-1]])
+    run_counts = np.diff(np.r_[run_starts, n])
+    run_codes = sorted_codes[run_starts]
+    run_group_starts = np.flatnonzero(np.r_[True, run_codes[1:] != run_codes[:-1]])
+    runs_per_group = np.diff(np.r_[run_group_starts, len(run_starts)])
 
+    max_counts = np.maximum.reduceat(run_counts, run_group_starts)
+    is_mode = run_counts == np.repeat(max_counts, runs_per_group)
+    mode_counts = np.add.reduceat(is_mode, run_group_starts)
+    first_mode_runs = np.minimum.reduceat(np.where(is_mode, np.arange(len(run_starts)), len(run_starts)),
+                                          run_group_starts)
+
+    modes = sorted_values[run_starts[first_mode_runs]]
+    lower_medians = sorted_values[group_starts + (group_sizes - 1) // 2]
+    # groups are in code order, which is the order of unique_ids
+    return pd.Series(np.where(mode_counts == 1, modes, lower_medians), index=unique_ids)
 
-def _get_anbh_for_buildings(bbox, empty_height_blgs):
-    from rasterio.features import geometry_mask
 
+def _get_anbh_for_buildings(bbox, empty_height_blgs):
     # Expand the AOI to ensure coverage of all buildings by ANBH
     anbh_obj = AverageNetBuildingHeight()
     anbh_cell_size = get_class_default_spatial_resolution(anbh_obj)
@@ -227,21 +244,33 @@ def _get_anbh_for_buildings(bbox, empty_height_blgs):
     # Ensure the CRS matches
     empty_height_blgs = empty_height_blgs.to_crs(anbh_da.rio.crs).copy()
 
-    # Iterate through polygons
-    for index, row in empty_height_blgs.iterrows():
-        polygon = row.geometry
-
-        # Mask raster using polygon
-        try:
-            building_mask = geometry_mask([polygon], transform=anbh_da.rio.transform(), all_touched=True,
-                                          invert=True, out_shape=anbh_da.shape)
-            height_values = anbh_da.values[building_mask]
-            # Only include features that arg large enough to overlap or touch a raster cell
-            if height_values.size > 0:
-                min_value = height_values.min().round(2)
-                empty_height_blgs.loc[index, ['height', 'height_source']] = [min_value, 'ANBH']
-        except Exception as e_msg:
-            print(e_msg)
-
-    populated_rows = empty_height_blgs[empty_height_blgs['height_source'] == 'ANBH']
+    min_values, has_cells = _get_min_touched_cell_values(anbh_da, empty_height_blgs.geometry.values)
+
+    # Only include features that arg large enough to overlap or touch a raster cell
+    populated_rows = empty_height_blgs[has_cells].copy()
+    populated_rows['height'] = min_values[has_cells].round(2)
+    populated_rows['height_source'] = 'ANBH'
     return populated_rows
+
+
+def _get_min_touched_cell_values(raster_da, geometries):
+    # Minimum raster value over the cells each geometry touches, as rasterizing the geometry with all_touched would
+    # select them. Neighboring buildings often touch the same coarse cell, so the cells are paired with every
+    # geometry through one spatial-index query rather than burned into a single id raster, where a shared cell
+    # would only be kept by one building.
+    import shapely
+
+    values = raster_da.values.squeeze()
+    transform = raster_da.rio.transform()
+    rows, cols = np.indices(values.shape)
+    x_edges = transform.c + np.array([cols, cols + 1]) * transform.a
+    y_edges = transform.f + np.array([rows, rows + 1]) * transform.e
+    cells = shapely.box(x_edges.min(axis=0).ravel(), y_edges.min(axis=0).ravel(),
+                        x_edges.max(axis=0).ravel(), y_edges.max(axis=0).ravel())
+
+    geometry_idx, cell_idx = shapely.STRtree(cells).query(geometries, predicate='intersects')
+    min_values = np.full(len(geometries), np.inf)
+    np.minimum.at(min_values, geometry_idx, values.ravel()[cell_idx])
+    has_cells = np.bincount(geometry_idx, minlength=len(geometries)) > 0
+
+    return min_values, has_cells
@@ -2,6 +2,7 @@ import ee
 import geopandas as gpd
 import geemap
 
+from city_metrix import initialize_ee
 from city_metrix.metrix_model import Layer, GeoExtent
 from ..constants import GEOJSON_FILE_EXTENSION
 
@@ -26,6 +27,7 @@ class ProtectedAreas(Layer):
     def get_data(self, bbox: GeoExtent, spatial_resolution=None, resampling_method=None,
                  force_data_refresh=False):
 
+        initialize_ee()
         dataset = ee.FeatureCollection('WCMC/WDPA/current/polygons')
         dataset = dataset.filter(ee.Filter.inList('STATUS', self.status)).filter(ee.Filter.lessThanOrEquals('STATUS_YR', self.status_year)).filter(ee.Filter.inList('IUCN_CAT', self.iucn_cat))
 
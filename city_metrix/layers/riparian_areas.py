@@ -3,6 +3,7 @@ import numpy as np
 import xarray as xr
 from scipy.ndimage import distance_transform_edt
 
+from city_metrix import initialize_ee
 from city_metrix.metrix_model import GeoExtent, Layer, get_image_collection
 
 from ..constants import GTIFF_FILE_EXTENSION
@@ -40,6 +41,7 @@ class RiparianAreas(Layer):
         hand = (HeightAboveNearestDrainage(river_head=self.river_head, thresh=self.thresh)
                 .get_data(bbox=bbox, spatial_resolution=spatial_resolution))
 
+        initialize_ee()
         # Read surface water occurance
         water = ee.Image('JRC/GSW1_4/GlobalSurfaceWater').select(['occurrence']).gte(50)
         ee_rectangle = bbox.to_ee_rectangle()
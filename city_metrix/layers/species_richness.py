@@ -1,16 +1,36 @@
 from enum import Enum
+import hashlib
+import json
+import multiprocessing
+import os
 import numpy as np
 import pandas as pd
 import geopandas as gpd
 import requests
-import random
 import scipy
 import shapely
 import rasterio
+import shutil
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from threading import Lock
 
+from city_metrix.metrix_dao import get_file_path_from_uri
 from city_metrix.metrix_model import Layer, GeoExtent
-from ..constants import GEOJSON_FILE_EXTENSION
+from ..constants import (
+    GBIF_LOCAL_CACHE_TTL_SECONDS,
+    GEOJSON_FILE_EXTENSION,
+    LOCAL_CACHE_URI,
+    USE_LOCAL_GBIF_CACHE,
+)
+
+# Raw GBIF occurrence pages are optionally cached on disk per query
+GBIF_CACHE_DIR = os.path.join(get_file_path_from_uri(LOCAL_CACHE_URI), 'gbif')
+GBIF_REQUEST_TRIES = 6
+GBIF_RETRY_DELAY_SECONDS = 5
+# Curve fits run in a bounded pool of spawned processes, since the GBIF request threads and the boto3 and Earth
+# Engine clients are already running when the fits start
+CURVEFIT_MAX_WORKERS = 4
 
 
 class GBIFTaxonClass(Enum):
@@ -35,7 +55,11 @@ class SpeciesRichness(Layer):
     API_URL = "https://api.gbif.org/v1/occurrence/search/"
     DATASETKEY = "50c9509d-22c7-4a22-a47d-8c48425ef4a7"  # iNaturalist research-grade observations
     LIMIT = 300
+    MAX_CONCURRENT_REQUESTS = 4
+    MIN_REQUEST_INTERVAL_SECONDS = 0.2
     NUM_CURVEFITS = 200
+    MAX_CURVEFIT_TRIES = 1000
+    RANDOM_SEED = 0
 
     def __init__(self, taxon=GBIFTaxonClass.BIRDS, start_year=2019, end_year=2024, mask_layer=None, **kwargs):
         super().__init__(**kwargs)
@@ -50,107 +74,238 @@ class SpeciesRichness(Layer):
 
         poly = bbox.as_geographic_bbox().polygon
         print(f"Retrieving {self.taxon.value['taxon']} observations for bbox {bbox.as_geographic_bbox().coords}")
-        offset = -self.LIMIT
-        observations = gpd.GeoDataFrame({"species": [], "geometry": []})
-        while offset == -self.LIMIT or not results_json["endOfRecords"]:
-            offset += self.LIMIT
-            params = {
-                "dataset_key": self.DATASETKEY,
-                "taxon_key": self.taxon.value["taxon_key"],
-                "year": f"{self.start_year},{self.end_year}",
-                "geometry": str(poly),
-                "limit": self.LIMIT,
-                "offset": offset,
-                "hasCoordinate": "true",
-            }
-            
-            remaining_tries = 6
-            while remaining_tries > 0:
-                resp = requests.get(self.API_URL, params=params, headers={"Accept": "application/json"})
-                results_json = resp.json()
-                if isinstance(results_json, dict):
-                    print(f"Collected {results_json['offset']} of {results_json['count']} observations")
-                    break
-                else:
-                    time.sleep(5)  # Rate limiting
-                    remaining_tries -= 1
-
-            has_species = [
-                (
-                    result.get("species"),
-                    shapely.geometry.Point(
-                        float(result.get("decimalLongitude")),
-                        float(result.get("decimalLatitude")),
-                    ),
-                )
-                for result in results_json["results"]
-                if "species" in result
-            ]
-
-            if self.mask_layer is not None:  # Filter for points within unmasked region
-                mask_raster = (self.mask_layer.get_data(bbox) * 0) + 1
-                valid_shapes = rasterio.features.shapes(
-                    # Polygonize the natural-areas raster
-                    mask_raster, connectivity=8, transform=mask_raster.rio.transform())
-                valid_shapes = list(valid_shapes)
-                # Only want the natural areas
-                valid_geoms = [i[0] for i in valid_shapes if i[1] == 1]
-                valid_gdf = gpd.GeoDataFrame({'id': range(len(valid_geoms)), 'geometry': [
-                                             shapely.Polygon(j['coordinates'][0]) for j in valid_geoms]})
-                valid_gdf_wgs = valid_gdf.dissolve().set_crs(
-                    bbox.as_utm_bbox().crs).to_crs('EPSG:4326')
-                has_species = [
-                    obs for obs in has_species if obs[1].intersects(valid_gdf_wgs.geometry.iloc[0])
-                ]
-
-            observations = pd.concat(
-                [
-                    observations,
-                    gpd.GeoDataFrame(
-                        {
-                            "species": [i[0] for i in has_species],
-                            "geometry": [i[1] for i in has_species],
-                        }
-                    ),
-                ]
-            )
+        params = {
+            "dataset_key": self.DATASETKEY,
+            "taxon_key": self.taxon.value["taxon_key"],
+            "year": f"{self.start_year},{self.end_year}",
+            "geometry": str(poly),
+            "hasCoordinate": "true",
+        }
+        cache_dir = GBIF_CACHE_DIR if USE_LOCAL_GBIF_CACHE else None
+        pages = fetch_occurrence_pages(self.API_URL, params, self.LIMIT, cache_dir,
+                                       self.MAX_CONCURRENT_REQUESTS, self.MIN_REQUEST_INTERVAL_SECONDS,
+                                       GBIF_LOCAL_CACHE_TTL_SECONDS)
+
+        has_species = [result for page in pages for result in page["results"] if "species" in result]
+        species = [result.get("species") for result in has_species]
+        points = shapely.points(
+            [float(result.get("decimalLongitude")) for result in has_species],
+            [float(result.get("decimalLatitude")) for result in has_species],
+        )
+
+        if self.mask_layer is not None:  # Filter for points within unmasked region
+            is_valid = shapely.intersects(points, self._get_valid_geometry(bbox))
+            species = [name for name, valid in zip(species, is_valid) if valid]
+            points = points[is_valid]
+
+        observations = gpd.GeoDataFrame({"species": species, "geometry": points})
 
         # Estimate species counts by estimating asymptote of species-accumulation curve created when observation order is randomized
         # Final estimate is average over NUM_CURVEFITS estimates
 
         if len(observations) >= 10:
-            taxon_observations = list(observations.species)
-            asymptotes = []
-            tries = 0
-            # Different observation-orders give different results, so average over many
-            while (len(asymptotes) < self.NUM_CURVEFITS):
-                tries += 1
-                # Randomize order of observations
-                random.shuffle(taxon_observations)
-                sac = []  # Initialize species accumulation curve data
-                # Go through observation list from beginning
-                for obs_count in range(1, len(taxon_observations)):
-                    # and count unique species from start to index
-                    sac.append(len(set(taxon_observations[:obs_count])))
-                # Avoid letting infinite-species errors stop the process
-                if (len(sac) > 5 and tries <= 1000):
-                    try:
-                        asymptotes.append(
-                            scipy.optimize.curve_fit(
-                                lambda x, a, b, c: -((a * np.exp(-b * x)) + c),
-                                list(range(1, len(sac) + 1)),
-                                sac,
-                            )[0][2]
-                        )
-                    except:
-                        pass
-                else:
-                    asymptotes.append(-1)
-            if -1 in asymptotes:
-                count_estimate = np.nan
-            else:
-                count_estimate = -round(np.mean(asymptotes))
+            count_estimate = estimate_species_count(
+                list(observations.species), self.NUM_CURVEFITS, self.MAX_CURVEFIT_TRIES, self.RANDOM_SEED)
         else:
             count_estimate = np.nan
 
         return gpd.GeoDataFrame({"species_count": [count_estimate], "geometry": [bbox.as_utm_bbox().polygon]}, crs=bbox.as_utm_bbox().crs)
+
+    def _get_valid_geometry(self, bbox: GeoExtent):
+        # Polygonize the natural-areas raster once per request
+        mask_raster = (self.mask_layer.get_data(bbox) * 0) + 1
+        valid_shapes = rasterio.features.shapes(
+            mask_raster, connectivity=8, transform=mask_raster.rio.transform())
+        valid_shapes = list(valid_shapes)
+        # Only want the natural areas
+        valid_geoms = [i[0] for i in valid_shapes if i[1] == 1]
+        valid_gdf = gpd.GeoDataFrame({'id': range(len(valid_geoms)), 'geometry': [
+                                     shapely.Polygon(j['coordinates'][0]) for j in valid_geoms]})
+        valid_gdf_wgs = valid_gdf.dissolve().set_crs(
+            bbox.as_utm_bbox().crs).to_crs('EPSG:4326')
+        return valid_gdf_wgs.geometry.iloc[0]
+
+
+class _RateLimiter:
+    # Spaces out requests shared by several threads by at least min_interval seconds
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._next_request_time = 0
+        self._lock = Lock()
+
+    def wait(self):
+        with self._lock:
+            delay = self._next_request_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_request_time = time.monotonic() + self.min_interval
+
+
+def _request_page(session, rate_limiter, api_url, params):
+    for _ in range(GBIF_REQUEST_TRIES):
+        rate_limiter.wait()
+        try:
+            resp = session.get(api_url, params=params, headers={"Accept": "application/json"}, timeout=60)
+            results_json = resp.json()
+            if resp.ok and isinstance(results_json, dict):
+                return results_json
+        except (requests.RequestException, ValueError):
+            pass
+        time.sleep(GBIF_RETRY_DELAY_SECONDS)  # Rate limiting
+
+    raise Exception(f"Could not retrieve GBIF occurrences at offset {params['offset']}")
+
+
+def fetch_occurrence_pages(api_url, params, page_size, cache_dir=None, max_workers=4, min_request_interval=0.2,
+                           cache_ttl_seconds=None):
+    """
+    Retrieves all pages of a GBIF occurrence search. The first page gives the total count, and the remaining
+    pages are requested concurrently through one pooled session.
+
+    :param api_url: occurrence search endpoint
+    :param params: query parameters other than limit and offset
+    :param page_size: number of records per page
+    :param cache_dir: optional directory where raw pages are cached, keyed by a hash of the query
+    :param max_workers: maximum number of concurrent requests
+    :param min_request_interval: minimum number of seconds between the starts of two requests
+    :param cache_ttl_seconds: age after which cached pages are requested again. Cached pages never expire if None
+    :return: list of the JSON pages in offset order
+    """
+    query_key = hashlib.sha256(json.dumps({**params, 'limit': page_size}, sort_keys=True).encode()).hexdigest()
+    query_cache_dir = os.path.join(cache_dir, query_key) if cache_dir is not None else None
+    if query_cache_dir is not None:
+        cached_pages = _read_cached_pages(query_cache_dir, page_size, cache_ttl_seconds)
+        if cached_pages is not None:
+            print(f"Read {cached_pages[0]['count']} observations from the GBIF cache")
+            return cached_pages
+
+    rate_limiter = _RateLimiter(min_request_interval)
+    with requests.Session() as session:
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max_workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        def get_page(offset):
+            return _request_page(session, rate_limiter, api_url, {**params, "limit": page_size, "offset": offset})
+
+        first_page = get_page(0)
+        offsets = [] if first_page["endOfRecords"] else range(page_size, first_page["count"], page_size)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pages = [first_page] + list(executor.map(get_page, offsets))
+
+    if query_cache_dir is not None:
+        _write_cached_pages(query_cache_dir, pages, page_size)
+
+    print(f"Collected {sum(len(page['results']) for page in pages)} of {first_page['count']} observations")
+    return pages
+
+
+def _read_cached_pages(query_cache_dir, page_size, cache_ttl_seconds):
+    # The query record is written after the pages, so a cache without it is incomplete
+    query_path = os.path.join(query_cache_dir, 'query.json')
+    try:
+        with open(query_path) as query_file:
+            query_record = json.load(query_file)
+    except (OSError, ValueError):
+        return None
+    if cache_ttl_seconds is not None and time.time() - query_record['cached_at'] >= cache_ttl_seconds:
+        return None
+
+    pages = []
+    for page_number in range(query_record['page_count']):
+        try:
+            with open(os.path.join(query_cache_dir, f'{page_number * page_size}.json')) as cache_file:
+                pages.append(json.load(cache_file))
+        except (OSError, ValueError):
+            return None
+    if pages[0]['count'] != query_record['count']:
+        return None
+    return pages
+
+
+def _write_cached_pages(query_cache_dir, pages, page_size):
+    # The pages of one query are replaced together, so that pages of different requests are never mixed
+    partial_dir = f'{query_cache_dir}.{os.getpid()}.partial'
+    shutil.rmtree(partial_dir, ignore_errors=True)
+    os.makedirs(partial_dir)
+    for page_number, page in enumerate(pages):
+        with open(os.path.join(partial_dir, f'{page_number * page_size}.json'), 'w') as cache_file:
+            json.dump(page, cache_file)
+    with open(os.path.join(partial_dir, 'query.json'), 'w') as query_file:
+        json.dump({'count': pages[0]['count'], 'page_count': len(pages), 'cached_at': time.time()}, query_file)
+
+    shutil.rmtree(query_cache_dir, ignore_errors=True)
+    try:
+        os.rename(partial_dir, query_cache_dir)
+    except OSError:
+        # another process cached the same query first
+        shutil.rmtree(partial_dir, ignore_errors=True)
+
+
+def _accumulation_model(x, a, b, c):
+    return -((a * np.exp(-b * x)) + c)
+
+
+def _fit_asymptote(sac):
+    # Returns the fitted (negated) asymptote of one species-accumulation curve, or None if the fit fails
+    try:
+        return scipy.optimize.curve_fit(_accumulation_model, np.arange(1, len(sac) + 1), sac)[0][2]
+    except:
+        return None
+
+
+def species_accumulation_curves(species_codes, num_curves, rng):
+    """
+    Builds species-accumulation curves for random orderings of the observations.
+
+    :param species_codes: integer species code of each observation
+    :param num_curves: number of random orderings
+    :param rng: numpy random Generator used to draw the orderings
+    :return: array of shape (num_curves, len(species_codes) - 1) with the number of distinct species among the
+        first 1..n-1 observations of each ordering
+    """
+    species_codes = np.asarray(species_codes)
+    permutations = rng.permuted(np.tile(species_codes, (num_curves, 1)), axis=1)
+
+    # an observation is the first of its species where it leads its run after a stable sort by species
+    order = np.argsort(permutations, axis=1, kind='stable')
+    sorted_codes = np.take_along_axis(permutations, order, axis=1)
+    leads_run = np.ones(sorted_codes.shape, dtype=bool)
+    leads_run[:, 1:] = sorted_codes[:, 1:] != sorted_codes[:, :-1]
+    is_first_occurrence = np.empty_like(leads_run)
+    np.put_along_axis(is_first_occurrence, order, leads_run, axis=1)
+
+    return np.cumsum(is_first_occurrence, axis=1, dtype=np.int32)[:, :-1]
+
+
+def estimate_species_count(species, num_curvefits, max_tries, seed=None):
+    """
+    Estimates species richness as the mean asymptote of curves fitted to randomly ordered species-accumulation curves.
+
+    :param species: species name of each observation
+    :param num_curvefits: number of successful curve fits to average
+    :param max_tries: number of orderings to attempt before giving up
+    :param seed: seed of the random orderings
+    :return: estimated species count, or NaN if too many curve fits failed
+    """
+    rng = np.random.default_rng(seed)
+    _, species_codes = np.unique(np.asarray(species, dtype=str), return_inverse=True)
+
+    asymptotes = []
+    tries = 0
+    with ProcessPoolExecutor(
+        max_workers=min(CURVEFIT_MAX_WORKERS, os.cpu_count() or 1),
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        # Different observation-orders give different results, so average over many
+        while len(asymptotes) < num_curvefits:
+            if tries >= max_tries:
+                return np.nan
+            num_curves = min(num_curvefits - len(asymptotes), max_tries - tries)
+            tries += num_curves
+            curves = species_accumulation_curves(species_codes, num_curves, rng)
+            # Avoid letting infinite-species errors stop the process
+            asymptotes.extend(asymptote for asymptote in executor.map(_fit_asymptote, curves, chunksize=8)
+                              if asymptote is not None)
+
+    return -round(np.mean(asymptotes))
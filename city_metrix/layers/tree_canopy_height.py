@@ -35,15 +35,7 @@ class TreeCanopyHeight(Layer):
         buffered_utm_bbox = bbox.buffer_utm_bbox(10)
         ee_rectangle  = buffered_utm_bbox.to_ee_rectangle()
 
-        canopy_ht = ee.ImageCollection("projects/meta-forest-monitoring-okw37/assets/CanopyHeight")
-        
-        # aggregate time series into a single image
-        canopy_ht_img = (canopy_ht
-                         .reduce(ee.Reducer.mean())
-                         .rename("cover_code")
-                         )
-
-        canopy_ht_ic = ee.ImageCollection(canopy_ht_img)
+        canopy_ht_ic = ee.ImageCollection(self._get_canopy_height_image())
         data = get_image_collection(
             canopy_ht_ic,
             ee_rectangle,
@@ -62,3 +54,25 @@ class TreeCanopyHeight(Layer):
             wp_array =  WorldPop(version=self.worldpop_version).get_data(bbox)
             return align_raster_array(data, wp_array)
         return result_data
+
+    def get_ee_image(self, bbox: GeoExtent, spatial_resolution:int=DEFAULT_SPATIAL_RESOLUTION):
+        if self.index_aggregation:
+            return None
+        spatial_resolution = self.resolution or spatial_resolution or DEFAULT_SPATIAL_RESOLUTION
+        ee_rectangle = bbox.buffer_utm_bbox(10).to_ee_rectangle()
+
+        # pixels without data are read as 0 by get_data, so they are kept rather than masked
+        canopy_ht_img = self._get_canopy_height_image().unmask(0).toUint8()
+        if self.height:
+            canopy_ht_img = canopy_ht_img.updateMask(canopy_ht_img.gte(self.height))
+
+        return canopy_ht_img, ee_rectangle, spatial_resolution
+
+    def _get_canopy_height_image(self):
+        canopy_ht = ee.ImageCollection("projects/meta-forest-monitoring-okw37/assets/CanopyHeight")
+
+        # aggregate time series into a single image
+        return (canopy_ht
+                .reduce(ee.Reducer.mean())
+                .rename("cover_code")
+                )
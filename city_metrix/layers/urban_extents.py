@@ -2,6 +2,7 @@ import ee
 import geemap
 import geopandas as gpd
 
+from city_metrix import initialize_ee
 from city_metrix.metrix_model import Layer, GeoExtent
 from city_metrix.metrix_tools import get_utm_zone_from_latlon_point
 from city_metrix.constants import GEOJSON_FILE_EXTENSION, GeoType
@@ -27,6 +28,7 @@ class UrbanExtents(Layer):
     def get_data(self, bbox: GeoExtent, spatial_resolution=None, resampling_method=None,
                  force_data_refresh=False):
 
+        initialize_ee()
         ue_fc = ee.FeatureCollection(
             f'projects/wri-datalab/cities/urban_land_use/data/global_cities_Aug2024/urbanextents_unions_{self.year}')
 
@@ -30,26 +30,8 @@ class UrbanLandUse(Layer):
         # spatial_resolution = DEFAULT_SPATIAL_RESOLUTION if spatial_resolution is None else spatial_resolution
         spatial_resolution = self.resolution or spatial_resolution or DEFAULT_SPATIAL_RESOLUTION
 
-        ulu = ee.ImageCollection("projects/wri-datalab/cities/urban_land_use/V1")
-
-        # ImageCollection didn't cover the global
         ee_rectangle = bbox.to_ee_rectangle()
-        if ulu.filterBounds(ee_rectangle['ee_geometry']).size().getInfo() == 0:
-            ulu_ic = ee.ImageCollection(ee.Image
-                                     .constant(0)
-                                     .clip(ee_rectangle['ee_geometry'])
-                                     .rename('lulc')
-                                     )
-        else:
-            ulu_ic = ee.ImageCollection(ulu
-                                     .filterBounds(ee_rectangle['ee_geometry'])
-                                     .select(self.band)
-                                     .reduce(ee.Reducer.firstNonNull())
-                                     .rename('lulc')
-                                     )
-        if spatial_resolution > DEFAULT_SPATIAL_RESOLUTION:
-            ulu_ic = ulu_ic.map(lambda x: x.setDefaultProjection(crs=x.projection().crs(), scale=DEFAULT_SPATIAL_RESOLUTION).reduceResolution(ee.Reducer.mode(), bestEffort=False, maxPixels=800).reproject(crs=x.projection().crs(), scale=spatial_resolution))
-
+        ulu_ic = ee.ImageCollection(self._get_ulu_image(ee_rectangle, spatial_resolution))
         data = get_image_collection(
             ulu_ic,
             ee_rectangle,
@@ -61,3 +43,32 @@ class UrbanLandUse(Layer):
             data = data.where(data == self.ulu_class, np.nan)
 
         return data
+
+    def get_ee_image(self, bbox: GeoExtent, spatial_resolution:int=DEFAULT_SPATIAL_RESOLUTION):
+        spatial_resolution = self.resolution or spatial_resolution or DEFAULT_SPATIAL_RESOLUTION
+
+        ee_rectangle = bbox.to_ee_rectangle()
+        ulu_img = self._get_ulu_image(ee_rectangle, spatial_resolution)
+        if self.ulu_class:
+            ulu_img = ulu_img.updateMask(ulu_img.eq(self.ulu_class))
+
+        return ulu_img, ee_rectangle, spatial_resolution
+
+    def _get_ulu_image(self, ee_rectangle, spatial_resolution):
+        ulu = (ee.ImageCollection("projects/wri-datalab/cities/urban_land_use/V1")
+               .filterBounds(ee_rectangle['ee_geometry']))
+
+        # ImageCollection didn't cover the global. The check is evaluated server-side so that no getInfo request
+        # is made per tile
+        ulu_img = ee.Image(ee.Algorithms.If(
+            ulu.size().eq(0),
+            ee.Image.constant(0).clip(ee_rectangle['ee_geometry']).rename('lulc'),
+            ulu.select(self.band).reduce(ee.Reducer.firstNonNull()).rename('lulc')
+        ))
+        if spatial_resolution > DEFAULT_SPATIAL_RESOLUTION:
+            ulu_img = (ulu_img
+                       .setDefaultProjection(crs=ulu_img.projection().crs(), scale=DEFAULT_SPATIAL_RESOLUTION)
+                       .reduceResolution(ee.Reducer.mode(), bestEffort=False, maxPixels=800)
+                       .reproject(crs=ulu_img.projection().crs(), scale=spatial_resolution))
+
+        return ulu_img
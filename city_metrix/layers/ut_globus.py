@@ -4,6 +4,7 @@ import pandas as pd
 import geopandas as gpd
 from shapely.geometry import Polygon, MultiPolygon
 
+from city_metrix import initialize_ee
 from city_metrix.metrix_model import Layer, WGS_CRS, GeoExtent
 from ..constants import GEOJSON_FILE_EXTENSION
 from ..ut_globus_city_handler.ut_globus_city_handler import search_for_ut_globus_city_by_contained_polygon
@@ -32,6 +33,7 @@ class UtGlobus(Layer):
             bbox_polygon = bbox.as_geographic_bbox().polygon
             self.city = search_for_ut_globus_city_by_contained_polygon(bbox_polygon, utm_crs)
 
+        initialize_ee()
         dataset = ee.FeatureCollection(f"projects/sat-io/open-datasets/UT-GLOBUS/{self.city}")
         ee_rectangle = bbox.to_ee_rectangle()
         ut_globus = dataset.filterBounds(ee_rectangle["ee_geometry"])
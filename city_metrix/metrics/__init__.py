@@ -1,33 +1,117 @@
-from .air_pollutant_annual_daily_statistic import AirPollutantAnnualDailyMean__Tonnes, AirPollutantAnnualDailyMax__Tonnes, AirPollutantAnnualTotalSocialCost__USD
-from .air_pollutant_who_exceedance_days import AirPollutantWhoExceedance__Days
-from .area_fracveg_exceeds_threshold import AreaFractionalVegetationExceedsThreshold__Percent
-from .built_area_without_tree_cover import BuiltAreaWithoutTreeCover__Percent
-from .built_land_with_high_land_surface_temperature import BuiltLandWithHighLST__Percent
-from .built_land_with_low_surface_reflectivity import BuiltLandWithLowSurfaceReflectivity__Percent
-from .built_land_with_vegetation import BuiltLandWithVegetation__Percent
-from .canopy_area_per_resident import *
-from .canopy_covered_population import *
-from .era5_met_preprocessing_umep_gee import Era5MetPreprocessingUmep
-from .era5_met_preprocessing_upenn_gee import Era5MetPreprocessingUPenn
-from .future_climate_hazard import *
-from .ghg_emissions import GhgEmissions__Tonnes
-from .habitat_connectivity import HabitatConnectivityEffectiveMeshSize__Hectares, HabitatConnectivityCoherence__Percent
-from .habitat_types_restored import HabitatTypesRestored__CoverTypes
-from .hospitals_per_ten_thousand_residents import HospitalsPerTenThousandResidents__Hospitals
-from .impervious_area import ImperviousArea__Percent
-from .impervious_surface_on_urbanized_land import ImperviousSurfaceOnUrbanizedLand__Percent
-from .key_biodiversity_area import KeyBiodiversityAreaProtected__Percent, KeyBiodiversityAreaUndeveloped__Percent
-from .land_near_natural_drainage import LandNearNaturalDrainage__Percent
-from .mean_pm2p5_exposure import *
-from .mean_tree_cover import MeanTreeCover__Percent
-from .natural_areas import NaturalAreas__Percent
-from .number_species import *
-from .protected_area import ProtectedArea__Percent
-from .recreational_space_per_thousand import RecreationalSpacePerThousand__HectaresPerThousandPersons
-from .riparian_land_with_vegetation_or_water import RiparianLandWithVegetationOrWater__Percent
-from .riverine_or_coastal_flood_risk_area import RiverineOrCoastalFloodRiskArea__Percent
-from .steeply_sloped_land_with_vegetation import SteeplySlopedLandWithVegetation__Percent
-from .tree_carbon_flux import TreeCarbonFlux__Tonnes
-from .urban_open_space import UrbanOpenSpace__Percent
-from .vegetation_water_change import *
-from .water_cover import WaterCover__Percent
+import importlib
+import importlib.util
+
+# Classes are imported from their modules on first access (PEP 562), so that importing the package does not
+# pull in the dependencies of every module.
+_LAZY_IMPORTS = {
+    "AirPollutantAnnualDailyMean__Tonnes": ".air_pollutant_annual_daily_statistic",
+    "AirPollutantAnnualDailyMax__Tonnes": ".air_pollutant_annual_daily_statistic",
+    "AirPollutantAnnualTotalSocialCost__USD": ".air_pollutant_annual_daily_statistic",
+    "AirPollutantWhoExceedance__Days": ".air_pollutant_who_exceedance_days",
+    "AreaFractionalVegetationExceedsThreshold__Percent": ".area_fracveg_exceeds_threshold",
+    "BuiltAreaWithoutTreeCover__Percent": ".built_area_without_tree_cover",
+    "BuiltLandWithHighLST__Percent": ".built_land_with_high_land_surface_temperature",
+    "BuiltLandWithLowSurfaceReflectivity__Percent": ".built_land_with_low_surface_reflectivity",
+    "BuiltLandWithVegetation__Percent": ".built_land_with_vegetation",
+    "CanopyAreaPerResident__SquareMeters": ".canopy_area_per_resident",
+    "CanopyAreaPerResidentChildren__SquareMeters": ".canopy_area_per_resident",
+    "CanopyAreaPerResidentElderly__SquareMeters": ".canopy_area_per_resident",
+    "CanopyAreaPerResidentFemale__SquareMeters": ".canopy_area_per_resident",
+    "CanopyAreaPerResidentInformal__SquareMeters": ".canopy_area_per_resident",
+    "CanopyCoveredPopulation__Percent": ".canopy_covered_population",
+    "CanopyCoveredPopulationChildren__Percent": ".canopy_covered_population",
+    "CanopyCoveredPopulationElderly__Percent": ".canopy_covered_population",
+    "CanopyCoveredPopulationFemale__Percent": ".canopy_covered_population",
+    "CanopyCoveredPopulationInformal__Percent": ".canopy_covered_population",
+    "Era5MetPreprocessingUmep": ".era5_met_preprocessing_umep_gee",
+    "Era5MetPreprocessingUPenn": ".era5_met_preprocessing_upenn_gee",
+    "Hazard": ".future_climate_hazard",
+    "TempwaveCount": ".future_climate_hazard",
+    "TempwaveDuration": ".future_climate_hazard",
+    "ThresholdDays": ".future_climate_hazard",
+    "AnnualVal": ".future_climate_hazard",
+    "FutureHeatwaveFrequency__Heatwaves": ".future_climate_hazard",
+    "FutureHeatwaveMaxDuration__Days": ".future_climate_hazard",
+    "FutureDaysAbove35__Days": ".future_climate_hazard",
+    "FutureAnnualMaxTemp__DegreesCelsius": ".future_climate_hazard",
+    "FutureExtremePrecipitationDays__Days": ".future_climate_hazard",
+    "GhgEmissions__Tonnes": ".ghg_emissions",
+    "HabitatConnectivityEffectiveMeshSize__Hectares": ".habitat_connectivity",
+    "HabitatConnectivityCoherence__Percent": ".habitat_connectivity",
+    "HabitatTypesRestored__CoverTypes": ".habitat_types_restored",
+    "HospitalsPerTenThousandResidents__Hospitals": ".hospitals_per_ten_thousand_residents",
+    "ImperviousArea__Percent": ".impervious_area",
+    "ImperviousSurfaceOnUrbanizedLand__Percent": ".impervious_surface_on_urbanized_land",
+    "KeyBiodiversityAreaProtected__Percent": ".key_biodiversity_area",
+    "KeyBiodiversityAreaUndeveloped__Percent": ".key_biodiversity_area",
+    "LandNearNaturalDrainage__Percent": ".land_near_natural_drainage",
+    "MeanPM2P5Exposure__MicrogramsPerCubicMeter": ".mean_pm2p5_exposure",
+    "MeanPM2P5ExposurePopWeighted__MicrogramsPerCubicMeter": ".mean_pm2p5_exposure",
+    "MeanPM2P5ExposurePopWeightedChildren__MicrogramsPerCubicMeter": ".mean_pm2p5_exposure",
+    "MeanPM2P5ExposurePopWeightedElderly__MicrogramsPerCubicMeter": ".mean_pm2p5_exposure",
+    "MeanPM2P5ExposurePopWeightedFemale__MicrogramsPerCubicMeter": ".mean_pm2p5_exposure",
+    "MeanPM2P5ExposurePopWeightedInformal__MicrogramsPerCubicMeter": ".mean_pm2p5_exposure",
+    "MeanTreeCover__Percent": ".mean_tree_cover",
+    "NaturalAreas__Percent": ".natural_areas",
+    "BirdRichness__Species": ".number_species",
+    "ArthropodRichness__Species": ".number_species",
+    "VascularPlantRichness__Species": ".number_species",
+    "BirdRichnessInBuiltUpArea__Species": ".number_species",
+    "ProtectedArea__Percent": ".protected_area",
+    "RecreationalSpacePerThousand__HectaresPerThousandPersons": ".recreational_space_per_thousand",
+    "RiparianLandWithVegetationOrWater__Percent": ".riparian_land_with_vegetation_or_water",
+    "RiverineOrCoastalFloodRiskArea__Percent": ".riverine_or_coastal_flood_risk_area",
+    "SteeplySlopedLandWithVegetation__Percent": ".steeply_sloped_land_with_vegetation",
+    "TreeCarbonFlux__Tonnes": ".tree_carbon_flux",
+    "UrbanOpenSpace__Percent": ".urban_open_space",
+    "VegetationWaterChangeGainArea__SquareMeters": ".vegetation_water_change",
+    "VegetationWaterChangeLossArea__SquareMeters": ".vegetation_water_change",
+    "VegetationWaterChangeGainLoss__Ratio": ".vegetation_water_change",
+    "WaterCover__Percent": ".water_cover",
+}
+# Modules whose public names were re-exported with star imports
+_STAR_IMPORT_MODULES = [
+    ".canopy_area_per_resident",
+    ".canopy_covered_population",
+    ".future_climate_hazard",
+    ".mean_pm2p5_exposure",
+    ".number_species",
+    ".vegetation_water_change",
+]
+
+
+def _build_star_export_names():
+    # `from city_metrix.metrics import *` exports the same names as the star imports it replaced, including
+    # the public names of the star-imported modules and the imported submodules
+    names = dict.fromkeys(_LAZY_IMPORTS)
+    names.update(dict.fromkeys(module_name.lstrip(".") for module_name in _LAZY_IMPORTS.values()))
+    for module_name in _STAR_IMPORT_MODULES:
+        module = importlib.import_module(module_name, __name__)
+        names.update(dict.fromkeys(name for name in vars(module) if not name.startswith("_")))
+    return list(names)
+
+
+def __getattr__(name):
+    if name == "__all__":
+        # built on first star import, since it imports the modules
+        value = _build_star_export_names()
+        globals()[name] = value
+        return value
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    if not name.startswith("_"):
+        # later star imports took precedence over earlier ones
+        for module_name in reversed(_STAR_IMPORT_MODULES):
+            module = importlib.import_module(module_name, __name__)
+            if hasattr(module, name):
+                return getattr(module, name)
+    if not name.startswith("_") and importlib.util.find_spec(f"{__name__}.{name}") is not None:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
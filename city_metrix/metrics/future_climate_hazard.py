@@ -3,6 +3,7 @@ import numpy as np
 import pandas as pd
 from typing import Union
 
+from city_metrix import initialize_ee
 from city_metrix.constants import CSV_FILE_EXTENSION
 from city_metrix.metrix_model import Metric, GeoExtent, GeoZone
 from city_metrix.layers import NexGddpCmip6, NexGddpCmip6Variables
@@ -11,6 +12,11 @@ HIST_START = 1980
 HIST_END = 2014
 MIN_HEATWAVE_DURATION = 3
 HEATWAVE_INTENSITY_PERCENTILE = 90
+# Predictive samples drawn per expected value, in batches so that memory stays bounded for large sample counts
+NUM_PREDICTIVE_SAMPLES = 10000
+PREDICTIVE_SAMPLE_BATCH_SIZE = 2000
+# Seed of the predictive samples, so that a metric gives the same value each time it is computed
+PREDICTIVE_SAMPLE_SEED = 0
 
 
 def summeronly(arr_noleap, southern_hem):
@@ -30,6 +36,7 @@ def summeronly(arr_noleap, southern_hem):
 def percentile(latlon, varname, pctl, want_summer_only=True):
     # Returns 90th percentile tasmax over 1980-2014 for June-July_Aug or Dec-Jan_Feb (if SH) for given latlon
     southern_hem = latlon[0] < 0
+    initialize_ee()
     dataset = ee.ImageCollection("ECMWF/ERA5/DAILY")
     era_varname = NexGddpCmip6Variables[varname].value[0]['era_varname']
     gee_geom = ee.Geometry.Point((latlon[1], latlon[0]))
@@ -84,7 +91,9 @@ class Hazard:
     def __init__(self):
         self.hazname = None
 
-    def get_expectedval(self, latlon, calib_data, start_year, end_year):
+    def get_expectedval(self, latlon, calib_data, start_year, end_year,
+                        num_samples=NUM_PREDICTIVE_SAMPLES, seed=PREDICTIVE_SAMPLE_SEED,
+                        batch_size=PREDICTIVE_SAMPLE_BATCH_SIZE):
         # Take uncalibrated data, calibrate it, apply val_dist() to calibrated data, use resulting freq dist
         # to parameterize Dirichlet prior, take resulting vector to parameterize multinomial distribution,
         # sample from that multinomial to generate predictive distribution of freq distributions, and return statistics
@@ -99,38 +108,53 @@ class Hazard:
         countdist = self.val_dist(calib_data[[0, 152][int(not southern_hem)]:[
                                   len(calib_data), -213][int(not southern_hem)]])
         if countdist is None:
-            res = None
-        else:
-            observed_vals = np.array(list(countdist.keys()))
-            cdist = {}
-            minval = observed_vals[0]
-            maxval = observed_vals[-1]
-            D = (maxval - minval) / (numbins - 1)
-            for i in range(numbins):
-                centerval = minval + (i * D)
-                cdist[centerval] = 0
-            for count in countdist:
-                for centerval in cdist:
-                    if count >= centerval - (D/2) and count < centerval + (D/2):
-                        cdist[centerval] += 1
-            alpha = np.array(list(cdist.values())) + (1/numbins)
-            res = []
-            for i in range(10000):
-                dirich_samp = np.random.dirichlet(alpha, 1)
-                mult_samp = np.random.multinomial(
-                    end_year - start_year + 1, dirich_samp[0], 1)[0]
-                res.append(sum([list(cdist.keys())[j] * mult_samp[j]
-                           for j in range(len(list(cdist.keys())))]) / (end_year - start_year + 1))
-            res = np.array(res)
-
-        if res is None:
             result = -9999
         else:
-            result = np.mean(res)
+            observed_vals = np.array(list(countdist.keys()))
+            centervals, bincounts = bin_observed_values(observed_vals, numbins)
+            alpha = bincounts + (1/numbins)
+            result = sample_predictive_mean(centervals, alpha, numbins, num_samples, seed, batch_size)
 
         return result
 
 
+def bin_observed_values(observed_vals, numbins):
+    # Counts the distinct observed values falling in each of numbins equal-width bins centered between the
+    # smallest and largest observed value
+    minval = observed_vals[0]
+    maxval = observed_vals[-1]
+    D = (maxval - minval) / (numbins - 1) if numbins > 1 else 0
+    if D == 0:
+        # all bins share one center and have zero width
+        return np.array([minval]), np.zeros(1)
+
+    centervals = minval + np.arange(numbins) * D
+    lower_edges = centervals - (D/2)
+    bin_idx = np.digitize(observed_vals, lower_edges) - 1
+    in_bin = (bin_idx >= 0) & (observed_vals < centervals[np.maximum(bin_idx, 0)] + (D/2))
+    bincounts = np.bincount(bin_idx[in_bin], minlength=numbins).astype(float)
+
+    return centervals, bincounts
+
+
+def sample_predictive_mean(centervals, alpha, num_draws, num_samples=NUM_PREDICTIVE_SAMPLES,
+                           seed=PREDICTIVE_SAMPLE_SEED, batch_size=PREDICTIVE_SAMPLE_BATCH_SIZE):
+    # Mean over num_samples of the per-draw average center value, where each sample draws bin probabilities from
+    # Dirichlet(alpha) and then num_draws values from the resulting multinomial. Samples are generated in batches
+    # and only a running sum is kept.
+    rng = np.random.default_rng(seed)
+    total = 0.0
+    remaining = num_samples
+    while remaining > 0:
+        batch = min(batch_size, remaining)
+        dirich_samp = rng.dirichlet(alpha, batch)
+        mult_samp = rng.multinomial(num_draws, dirich_samp)
+        total += np.sum(mult_samp @ centervals) / num_draws
+        remaining -= batch
+
+    return total / num_samples
+
+
 class TempwaveCount(Hazard):
     def __init__(self, min_duration, threshold):
         super().__init__()
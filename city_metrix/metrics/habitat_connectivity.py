@@ -1,14 +1,17 @@
+import numpy as np
 import pandas as pd
-import geopandas as gpd
 from typing import Union
 import rasterio
+import rasterio.features
 import shapely
-import networkx as nx
 
 from city_metrix.constants import CSV_FILE_EXTENSION
 from city_metrix.metrix_model import Metric, GeoZone, GeoExtent, WGS_CRS
 from city_metrix.layers import NaturalAreas
 
+CONNECTIVITY_DISTANCE = 100  # Max distance two patches can be apart and be considered connected (meter)
+MIN_PATCHSIZE = 1000  # Min patch size to be included in analysis (sq meter)
+
 
 class _HabitatConnectivity(Metric):
     OUTPUT_FILE_FORMAT = CSV_FILE_EXTENSION
@@ -23,52 +26,24 @@ class _HabitatConnectivity(Metric):
                    geo_zone: GeoZone,
                    spatial_resolution: int = None) -> Union[pd.DataFrame | pd.Series]:
 
-        CONNECTIVITY_DISTANCE = 100  # Max distance two patches can be apart and be considered connected (meter)
-        MIN_PATCHSIZE = 1000  # Min patch size to be included in analysis (sq meter)
-        
         zones = geo_zone.zones
         worldcover_layer = NaturalAreas().retrieve_data(GeoExtent(geo_zone))
-        
-        def within_distance(idx, gdf):
-            connecteds = gdf.loc[[idx]].buffer(CONNECTIVITY_DISTANCE)[idx].intersects(gdf.geometry)
-            return [i for i in list(connecteds.index[connecteds == True]) if not i == idx]
 
-        result_values = []
         # Reproject polygon if needed
         if zones.crs != worldcover_layer.rio.crs:
             zones = zones.to_crs(worldcover_layer.rio.crs)
-        for rownum in range(len(zones)):
-            zone = zones.iloc[[rownum]]
-            natarea_dataarray = worldcover_layer.rio.clip(zone.geometry, zone.crs)
-            natarea_shapes = rasterio.features.shapes(natarea_dataarray, connectivity=8, transform=natarea_dataarray.rio.transform())  # Polygonize the natural-areas raster
-            natarea_shapes = list(natarea_shapes)
-            na_geoms = [i[0] for i in natarea_shapes if i[1] == 1]  # Only want the natural areas
-            na_gdf = gpd.GeoDataFrame({'id': range(len(na_geoms)), 'geometry': [shapely.Polygon(j['coordinates'][0]) for j in na_geoms]})
-            na_gdf = na_gdf.loc[na_gdf.area > MIN_PATCHSIZE]
-
-            connected = {
-                i: within_distance(i, na_gdf) for i in na_gdf.index
-            }
-
-            # Find clusters from connected pairs
-            edges = []
-            for k in connected:
-                for i in connected[k]:
-                    edges.append((k, i))
-            G = nx.Graph()
-            G.add_nodes_from(list(na_gdf.index))
-            G.add_edges_from(edges)
-            clusters = nx.connected_components(G)
+
+        result_values = []
+        for zone_patches in get_zone_patches(worldcover_layer, zones.geometry):
+            zone_patches = zone_patches[shapely.area(zone_patches) > MIN_PATCHSIZE]
+            cluster_areas = get_cluster_areas(zone_patches, CONNECTIVITY_DISTANCE)
             # Calculate indicator
-            total_area = na_gdf.area.sum()
-            cluster_areas = []
-            for i in clusters:
-                cluster_areas.append(sum([na_gdf.loc[[j]]['geometry'].area[j] for j in i]))
+            total_area = cluster_areas.sum()
             if total_area > 0:
                 if self.indicator_name == 'EMS':
-                    result_values.append((sum([i**2 for i in cluster_areas]) / total_area) / 10000)
+                    result_values.append((np.sum(cluster_areas**2) / total_area) / 10000)
                 else:  # self.indicator_name == 'coherence'
-                    result_values.append((sum([i**2 for i in cluster_areas]) / (total_area**2)) * 100)
+                    result_values.append((np.sum(cluster_areas**2) / (total_area**2)) * 100)
             else:
                 result_values.append(0)
 
@@ -76,6 +51,78 @@ class _HabitatConnectivity(Metric):
         return result
 
 
+
+def get_zone_patches(natarea_dataarray, zone_geometries):
+    """
+    Polygonizes the natural areas of each zone. Non-overlapping zones are labeled into a single raster so the
+    whole city raster is polygonized once; overlapping zones are polygonized one at a time.
+
+    :param natarea_dataarray: natural-areas raster, where natural areas have value 1
+    :param zone_geometries: zone geometries in the CRS of the raster
+    :return: list with an array of patch polygons for each zone
+    """
+    zone_geometries = np.asarray(zone_geometries)
+    transform = natarea_dataarray.rio.transform()
+    is_natural = (natarea_dataarray.values == 1).squeeze()
+
+    left, right = shapely.STRtree(zone_geometries).query(zone_geometries, predicate='intersects')
+    is_pair = left != right
+    shared_areas = shapely.area(shapely.intersection(zone_geometries[left[is_pair]], zone_geometries[right[is_pair]]))
+    if np.any(shared_areas > 0):
+        zone_batches = [[zone_idx] for zone_idx in range(len(zone_geometries))]
+    else:
+        zone_batches = [list(range(len(zone_geometries)))]
+
+    zone_patches = [[] for _ in range(len(zone_geometries))]
+    for zone_batch in zone_batches:
+        # pixels are assigned to a zone by their centers, as when clipping the raster to the zone
+        zone_labels = rasterio.features.rasterize(
+            ((zone_geometries[zone_idx], zone_idx + 1) for zone_idx in zone_batch),
+            out_shape=is_natural.shape, transform=transform, fill=0, dtype='int32')
+        zone_labels[~is_natural] = 0
+        # Polygonize the natural-areas raster, keeping only the exterior ring of each patch
+        for shape, zone_label in rasterio.features.shapes(zone_labels, mask=zone_labels > 0, connectivity=8,
+                                                          transform=transform):
+            zone_patches[int(zone_label) - 1].append(shapely.Polygon(shape['coordinates'][0]))
+
+    return [np.array(patches, dtype=object) for patches in zone_patches]
+
+
+def get_cluster_areas(patches, connectivity_distance):
+    """
+    Groups patches into clusters of patches connected through chains of patches at most connectivity_distance
+    apart, and returns the total area of each cluster.
+
+    :param patches: array of patch polygons
+    :param connectivity_distance: max distance between two connected patches
+    :return: array of cluster areas, with zeros for labels that do not identify a cluster
+    """
+    areas = shapely.area(patches)
+    if len(patches) == 0:
+        return areas
+
+    left, right = shapely.STRtree(patches).query(patches, predicate='dwithin', distance=connectivity_distance)
+    cluster_labels = _get_connected_components(len(patches), left, right)
+    return np.bincount(cluster_labels, weights=areas, minlength=len(patches))
+
+
+def _get_connected_components(num_nodes, left, right):
+    # Union-find by repeatedly hooking every node to the smallest label among its neighbors and then compressing
+    # paths, until labels stop changing. Each component ends up labeled with its smallest node index.
+    labels = np.arange(num_nodes)
+    while True:
+        hooked = labels.copy()
+        np.minimum.at(hooked, left, labels[right])
+        np.minimum.at(hooked, right, labels[left])
+        while True:
+            compressed = hooked[hooked]
+            if np.array_equal(compressed, hooked):
+                break
+            hooked = compressed
+        if np.array_equal(hooked, labels):
+            return labels
+        labels = hooked
+
 class HabitatConnectivityCoherence__Percent(_HabitatConnectivity):
     OUTPUT_FILE_FORMAT = CSV_FILE_EXTENSION
     MAJOR_NAMING_ATTS = None
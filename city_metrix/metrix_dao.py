@@ -1,8 +1,12 @@
 import gc
+import io
 import json
 import os
 import shutil
 import tempfile
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from threading import Lock
 from urllib.parse import urlparse
@@ -11,11 +15,13 @@ import geopandas as gpd
 import pandas as pd
 import requests
 import xarray as xr
+from boto3.s3.transfer import TransferConfig
 from dask.diagnostics import ProgressBar
 from rioxarray import rioxarray
 
-from city_metrix import s3_client
+from city_metrix import get_aws_session, get_s3_client
 from city_metrix.constants import (
+    CIF_CACHE_MANIFEST_TTL_SECONDS,
     CIF_DASHBOARD_LAYER_S3_BUCKET_URI,
     CITIES_DATA_API_URL,
     CSV_FILE_EXTENSION,
@@ -25,17 +31,44 @@ from city_metrix.constants import (
     LOCAL_CACHE_URI,
     MULTI_TILE_TILE_INDEX_FILE,
     NETCDF_FILE_EXTENSION,
+    S3_MULTIPART_CHUNK_SIZE_BYTES,
+    S3_MULTIPART_THRESHOLD_BYTES,
+    S3_UPLOAD_MAX_CONCURRENCY,
 )
 from city_metrix.metrix_tools import (
     get_crs_from_data,
     standardize_y_dimension_direction,
 )
 
+# GeoTIFFs uploaded to the S3 cache are written internally tiled and compressed so that sub-areas can be read
+# with range requests
+GTIFF_CREATION_OPTIONS = {
+    "tiled": True,
+    "blockxsize": 512,
+    "blockysize": 512,
+    "compress": "DEFLATE",
+}
+# GDAL settings for reading only the overlapping blocks of remote GeoTIFFs through /vsis3/
+GDAL_RANGE_READ_OPTIONS = {
+    "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+    "CPL_VSIL_CURL_ALLOWED_EXTENSIONS": ".tif",
+    "GDAL_HTTP_MERGE_CONSECUTIVE_RANGES": "YES",
+    "GDAL_HTTP_MULTIPLEX": "YES",
+    "VSI_CACHE": "TRUE",
+}
+MAX_CONCURRENT_TILE_READS = 16
+S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=S3_MULTIPART_THRESHOLD_BYTES,
+    multipart_chunksize=S3_MULTIPART_CHUNK_SIZE_BYTES,
+    max_concurrency=S3_UPLOAD_MAX_CONCURRENCY,
+    use_threads=True,
+)
+
 
 def _read_geojson_from_s3(s3_bucket, file_key):
     with tempfile.TemporaryDirectory() as temp_dir:
         temp_file_path = os.path.join(temp_dir, "tempfile")
-        s3_client.download_file(s3_bucket, file_key, temp_file_path)
+        get_s3_client().download_file(s3_bucket, file_key, temp_file_path)
         result_data = gpd.read_file(temp_file_path)
     return result_data
 
@@ -49,10 +82,11 @@ def delete_s3_file_if_exists(uri):
         key = get_file_key_from_url(uri)
         try:
             # Check if the object exists
-            s3_client.head_object(Bucket=bucket_name, Key=key)
+            get_s3_client().head_object(Bucket=bucket_name, Key=key)
 
             # If no error, delete the object
-            s3_client.delete_object(Bucket=bucket_name, Key=key)
+            get_s3_client().delete_object(Bucket=bucket_name, Key=key)
+            invalidate_cache_manifest(uri)
         except ClientError as e:
             if e.response["Error"]["Code"] == "404":
                 print(f"File not found: {key}")
@@ -60,30 +94,238 @@ def delete_s3_file_if_exists(uri):
                 raise  # Re-raise other unexpected errors
 
 
-def delete_s3_folder_if_exists(uri):
+def delete_s3_folder_if_exists(uri, keep_names=None):
+    """
+    :param keep_names: names of files directly in the folder that are not deleted
+    """
+    keep_names = set() if keep_names is None else set(keep_names)
     if get_uri_scheme(uri) == "s3":
         bucket_name = get_bucket_name_from_s3_uri(uri)
         folder = get_file_key_from_url(uri)
+        kept_keys = {f"{folder.rstrip('/')}/{name}" for name in keep_names}
 
         # List objects under the prefix
-        response = s3_client.list_objects_v2(Bucket=bucket_name, Prefix=folder)
+        response = get_s3_client().list_objects_v2(Bucket=bucket_name, Prefix=folder)
 
         if "Contents" in response:
-            objects_to_delete = [{"Key": obj["Key"]} for obj in response["Contents"]]
+            objects_to_delete = [
+                {"Key": obj["Key"]} for obj in response["Contents"] if obj["Key"] not in kept_keys
+            ]
 
             # Delete objects in one batch (up to 1000)
-            s3_client.delete_objects(
-                Bucket=bucket_name, Delete={"Objects": objects_to_delete}
-            )
+            if objects_to_delete:
+                get_s3_client().delete_objects(
+                    Bucket=bucket_name, Delete={"Objects": objects_to_delete}
+                )
+            invalidate_cache_manifest(uri)
     else:
         path = get_file_path_from_uri(uri)
         if os.path.exists(path):
             if os.path.isfile(path):
                 os.remove(path)
+            elif os.path.isdir(path) and keep_names:
+                for name in os.listdir(path):
+                    if name in keep_names:
+                        continue
+                    entry_path = os.path.join(path, name)
+                    if os.path.isdir(entry_path):
+                        shutil.rmtree(entry_path)
+                    else:
+                        os.remove(entry_path)
             elif os.path.isdir(path):
                 shutil.rmtree(path)
 
 
+def list_folder_objects(uri):
+    """
+    Lists all objects below a folder URI, following S3 pagination.
+    :return: dict of object name (relative to the folder) to a dict with "size" and "etag" values
+    """
+    objects = {}
+    if get_uri_scheme(uri) == "s3":
+        bucket_name = get_bucket_name_from_s3_uri(uri)
+        folder = get_file_key_from_url(uri)
+        folder = folder if folder.endswith("/") else folder + "/"
+
+        paginator = get_s3_client().get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=folder):
+            for obj in page.get("Contents", []):
+                name = obj["Key"][len(folder):]
+                if name:
+                    objects[name] = {
+                        "size": obj["Size"],
+                        "etag": obj.get("ETag", "").strip('"'),
+                    }
+    else:
+        path = get_file_path_from_uri(uri)
+        if os.path.isdir(path):
+            for name in os.listdir(path):
+                file_path = os.path.join(path, name)
+                if os.path.isfile(file_path):
+                    objects[name] = {"size": os.path.getsize(file_path), "etag": None}
+
+    return objects
+
+
+# ============ S3 cache manifest ================================
+# Memoized listings of cache folders, keyed by (bucket, folder prefix), so that existence checks for many
+# cached objects in the same folder cost a single paginated listing.
+_cache_manifest = {}
+_cache_manifest_lock = Lock()
+
+
+def get_cache_manifest_prefix(file_key):
+    """
+    Returns the folder prefix that is listed for a cache key. Layers are listed per
+    data/<env>/layers/<feature>/ folder and metrics per data/<env>/metrics/<city>/ folder.
+    """
+    parts = file_key.split("/")
+    if len(parts) > 4 and parts[0] == "data" and parts[2] in ("layers", "metrics"):
+        return "/".join(parts[:4]) + "/"
+    elif len(parts) > 1:
+        return "/".join(parts[:-1]) + "/"
+    else:
+        return ""
+
+
+def _get_cache_manifest_keys(s3_bucket, prefix):
+    with _cache_manifest_lock:
+        entry = _cache_manifest.get((s3_bucket, prefix))
+    if entry is not None and time.monotonic() - entry[0] < CIF_CACHE_MANIFEST_TTL_SECONDS:
+        return entry[1]
+
+    listed_at = time.monotonic()
+    keys = []
+    paginator = get_s3_client().get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=s3_bucket, Prefix=prefix):
+        keys.extend(obj["Key"] for obj in page.get("Contents", []))
+    keys.sort()
+
+    with _cache_manifest_lock:
+        _cache_manifest[(s3_bucket, prefix)] = (listed_at, keys)
+    return keys
+
+
+def is_s3_key_in_cache_manifest(s3_bucket, file_key, match_prefix=False):
+    """
+    Checks the memoized folder listing for an S3 key.
+    :param match_prefix: when True, any key starting with file_key is a match (i.e. a file or a folder)
+    """
+    keys = _get_cache_manifest_keys(s3_bucket, get_cache_manifest_prefix(file_key))
+    index = bisect_left(keys, file_key)
+    if index == len(keys):
+        return False
+    if match_prefix:
+        return keys[index].startswith(file_key)
+    else:
+        return keys[index] == file_key
+
+
+def invalidate_cache_manifest(uri=None):
+    """
+    Drops memoized listings that cover the URI, or all listings if no URI is given. Must be called after
+    writing or deleting cached objects outside of the write/delete functions in this module.
+    """
+    with _cache_manifest_lock:
+        if uri is None:
+            _cache_manifest.clear()
+            return
+        if get_uri_scheme(uri) != "s3":
+            return
+
+        s3_bucket = get_bucket_name_from_s3_uri(uri)
+        file_key = get_file_key_from_url(uri)
+        stale_entries = [
+            (bucket, prefix)
+            for bucket, prefix in _cache_manifest
+            if bucket == s3_bucket
+            and (file_key.startswith(prefix) or prefix.startswith(file_key))
+        ]
+        for entry in stale_entries:
+            del _cache_manifest[entry]
+
+
+def get_uri_last_modified(uri):
+    """
+    Returns the last-modified time of a file as a timezone-aware UTC datetime, or None if the file does not exist.
+    """
+    object_state = get_uri_object_state(uri)
+    return None if object_state is None else object_state["last_modified"]
+
+
+def get_uri_object_state(uri):
+    """
+    Returns the last-modified time (timezone-aware UTC) and ETag of a file, or None if the file does not exist.
+    The ETag of a local file is its modification time in nanoseconds.
+    """
+    from datetime import datetime, timezone
+
+    if get_uri_scheme(uri) == "s3":
+        bucket_name = get_bucket_name_from_s3_uri(uri)
+        key = get_file_key_from_url(uri)
+        try:
+            response = get_s3_client().head_object(Bucket=bucket_name, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                return None
+            raise
+        return {"last_modified": response["LastModified"], "etag": response["ETag"]}
+    else:
+        path = get_file_path_from_uri(uri)
+        if not os.path.exists(path):
+            return None
+        modified_ns = os.stat(path).st_mtime_ns
+        return {
+            "last_modified": datetime.fromtimestamp(modified_ns / 1e9, tz=timezone.utc),
+            "etag": str(modified_ns),
+        }
+
+
+def put_bytes_if_unchanged(body, uri, etag=None):
+    """
+    Writes bytes only if the file is still in the state the caller read: absent when etag is None, otherwise
+    unchanged since its ETag was read. On S3 this is a conditional put, so of several concurrent writers only
+    one succeeds.
+    :return: ETag of the written file, or None if the file had changed and nothing was written
+    """
+    if get_uri_scheme(uri) == "s3":
+        conditions = {"IfNoneMatch": "*"} if etag is None else {"IfMatch": etag}
+        try:
+            response = get_s3_client().put_object(
+                Bucket=get_bucket_name_from_s3_uri(uri),
+                Key=get_file_key_from_url(uri),
+                Body=body,
+                ACL="public-read",
+                **conditions,
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("PreconditionFailed", "ConditionalRequestConflict", "412", "409"):
+                return None
+            raise
+        invalidate_cache_manifest(uri)
+        return response["ETag"]
+
+    path = get_file_path_from_uri(uri)
+    _create_local_target_folder(path)
+    if etag is None:
+        try:
+            file_descriptor = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return None
+        with os.fdopen(file_descriptor, "wb") as target_file:
+            target_file.write(body)
+        return get_uri_object_state(uri)["etag"]
+
+    object_state = get_uri_object_state(uri)
+    if object_state is None or object_state["etag"] != etag:
+        return None
+    partial_path = f"{path}.{os.getpid()}.partial"
+    with open(partial_path, "wb") as partial_file:
+        partial_file.write(body)
+    os.replace(partial_path, path)
+    return get_uri_object_state(uri)["etag"]
+
+
 def create_uri_target_folder(uri):
     if get_uri_scheme(uri) == "s3":
         s3_bucket = get_bucket_name_from_s3_uri(uri)
@@ -92,7 +334,8 @@ def create_uri_target_folder(uri):
         if not folder.endswith("/"):
             folder += "/"
 
-        s3_client.put_object(Bucket=s3_bucket, Key=folder)
+        get_s3_client().put_object(Bucket=s3_bucket, Key=folder)
+        invalidate_cache_manifest(uri)
     else:
         file_path = get_file_path_from_uri(uri)
         os.makedirs(file_path, exist_ok=True)
@@ -154,17 +397,11 @@ def _is_s3_folder_or_file(uri):
     folder_path = file_key if file_key.endswith("/") else file_key + "/"
 
     # Check for folder
-    folder_response = s3_client.list_objects_v2(
-        Bucket=s3_bucket, Prefix=folder_path, MaxKeys=1
-    )
-    if "Contents" in folder_response:
+    if is_s3_key_in_cache_manifest(s3_bucket, folder_path, match_prefix=True):
         return "folder"
 
     # Check for file
-    file_response = s3_client.list_objects_v2(
-        Bucket=s3_bucket, Prefix=file_key, MaxKeys=1
-    )
-    if "Contents" in file_response:
+    if is_s3_key_in_cache_manifest(s3_bucket, file_key, match_prefix=True):
         return "file"
 
     return None
@@ -189,7 +426,7 @@ def read_geotiff_subarea_from_cache(file_uri, city_aoi_subarea, utm_crs):
     else:  # for a folder, process all files
         # Load geotiff_index.json from S3
         index_key = f"{file_key}/{MULTI_TILE_TILE_INDEX_FILE}"
-        index_obj = s3_client.get_object(Bucket=s3_bucket, Key=index_key)
+        index_obj = get_s3_client().get_object(Bucket=s3_bucket, Key=index_key)
         metadata = json.loads(index_obj["Body"].read().decode("utf-8"))
 
         # Access top-level CRS and tile list
@@ -205,72 +442,94 @@ def read_geotiff_subarea_from_cache(file_uri, city_aoi_subarea, utm_crs):
         if not matching_items:
             raise ValueError("No overlapping GeoTIFFs found.")
 
-        # Read and extract overlapping data
-        data_arrays = []
-        for item in matching_items:
-            tile_name = item["tile_name"]
-            tile_uri = f"{file_uri}/{tile_name}"
+        # Read and extract overlapping data, reading the tiles concurrently
+        def _read_tile_sub_area(item):
+            tile_uri = f"{file_uri}/{item['tile_name']}"
             tile_key = _get_uri_parts(tile_uri)[1]
-            da = _process_geotiff_sub_area(
+            return _process_geotiff_sub_area(
                 s3_bucket, tile_key, city_aoi_subarea, 0, crs_str
             )
-            data_arrays.append(da)
+
+        max_workers = min(len(matching_items), MAX_CONCURRENT_TILE_READS)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            data_arrays = list(executor.map(_read_tile_sub_area, matching_items))
 
         # Merge into a single DataArray using outer join
         subarea_da = xr.concat(data_arrays, dim="tile", join="outer").max(
             "tile", skipna=True
         )
-        subarea_da.rio.write_crs(da.rio.crs, inplace=True)
-        subarea_da.rio.write_transform(da.rio.transform(), inplace=True)
+        subarea_da.rio.write_crs(data_arrays[-1].rio.crs, inplace=True)
+        # the transform is derived from the merged coordinates, since each tile has its own origin
+        subarea_da.rio.write_transform(subarea_da.rio.transform(recalc=True), inplace=True)
         subarea_da.attrs["crs"] = utm_crs
 
     return subarea_da
 
 
 def _process_geotiff_sub_area(s3_bucket, key, bbox, pad, utm_crs):
-    # function uses rasterio.windows to get geotiff sub=area
+    # function uses rasterio.windows to get geotiff sub-area. The file is opened through GDAL /vsis3/ so that
+    # only the blocks overlapping the window are transferred.
     import numpy as np
+    import rasterio
+    from rasterio.errors import RasterioIOError
     from rasterio.io import MemoryFile
+    from rasterio.session import AWSSession
     from rasterio.transform import xy
-    from rasterio.windows import Window, from_bounds
 
-    obj = s3_client.get_object(Bucket=s3_bucket, Key=key)
-    with MemoryFile(obj["Body"].read()) as memfile:
-        with memfile.open() as src:
-            # Compute and pad the window
-            window = from_bounds(*bbox, transform=src.transform)
-            window = window.round_offsets().round_lengths()
-            padded_window = Window(
-                col_off=window.col_off,
-                row_off=window.row_off,
-                width=window.width + pad,
-                height=window.height + pad,
-            )
-
-            data = src.read(1, window=padded_window, boundless=True, fill_value=np.nan)
-            transform = src.window_transform(padded_window)
-
-            # Compute accurate x/y coordinates
-            rows, cols = np.meshgrid(
-                np.arange(data.shape[0]), np.arange(data.shape[1]), indexing="ij"
-            )
-            xs, ys = xy(transform, rows, cols, offset="center")
-            x_coords = np.unique(xs)
-            y_coords = np.unique(ys)
-            if np.diff(y_coords).mean() > 0:
-                y_coords = y_coords[::-1]  # Flip to descending
-
-            da = xr.DataArray(
-                data,
-                dims=("y", "x"),
-                coords={"y": y_coords, "x": x_coords},
-                name="tile",
-            )
+    try:
+        with rasterio.Env(
+            session=AWSSession(session=get_aws_session(), requester_pays=True),
+            **GDAL_RANGE_READ_OPTIONS,
+        ):
+            with rasterio.open(f"s3://{s3_bucket}/{key}") as src:
+                data, transform = _read_padded_window(src, bbox, pad)
+    except RasterioIOError:
+        # fall back to downloading the whole file
+        obj = get_s3_client().get_object(Bucket=s3_bucket, Key=key)
+        with MemoryFile(obj["Body"].read()) as memfile:
+            with memfile.open() as src:
+                data, transform = _read_padded_window(src, bbox, pad)
+
+    # Compute accurate x/y coordinates of the pixel centers
+    rows = np.arange(data.shape[0])
+    cols = np.arange(data.shape[1])
+    x_coords, _ = xy(transform, np.zeros_like(cols), cols, offset="center")
+    _, y_coords = xy(transform, rows, np.zeros_like(rows), offset="center")
+    x_coords = np.asarray(x_coords)
+    y_coords = np.asarray(y_coords)
+    if np.diff(y_coords).mean() > 0:
+        y_coords = y_coords[::-1]  # Flip to descending
+
+    da = xr.DataArray(
+        data,
+        dims=("y", "x"),
+        coords={"y": y_coords, "x": x_coords},
+        name="tile",
+    )
 
     da.attrs["crs"] = utm_crs
     return da
 
 
+def _read_padded_window(src, bbox, pad):
+    import numpy as np
+    from rasterio.windows import Window, from_bounds
+
+    # Compute and pad the window
+    window = from_bounds(*bbox, transform=src.transform)
+    window = window.round_offsets().round_lengths()
+    padded_window = Window(
+        col_off=window.col_off,
+        row_off=window.row_off,
+        width=window.width + pad,
+        height=window.height + pad,
+    )
+
+    data = src.read(1, window=padded_window, boundless=True, fill_value=np.nan)
+    transform = src.window_transform(padded_window)
+    return data, transform
+
+
 def read_netcdf_from_cache(file_uri):
     if get_uri_scheme(file_uri) == "s3":
         s3_bucket = get_bucket_name_from_s3_uri(file_uri)
@@ -278,7 +537,7 @@ def read_netcdf_from_cache(file_uri):
 
         with tempfile.TemporaryDirectory() as temp_dir:
             temp_file_path = os.path.join(temp_dir, "tempfile")
-            s3_client.download_file(s3_bucket, file_key, temp_file_path)
+            get_s3_client().download_file(s3_bucket, file_key, temp_file_path)
             result_data = xr.open_dataarray(temp_file_path).load()
     else:
         file_path = os.path.normpath(get_file_path_from_uri(file_uri))
@@ -293,7 +552,7 @@ def read_csv_from_s3(file_uri):
     result_data = None
     with tempfile.TemporaryDirectory() as temp_dir:
         temp_file_path = os.path.join(temp_dir, "tempfile.csv")
-        s3_client.download_file(s3_bucket, file_key, temp_file_path)
+        get_s3_client().download_file(s3_bucket, file_key, temp_file_path)
         result_data = pd.read_csv(temp_file_path)
     return result_data
 
@@ -337,43 +596,81 @@ def write_layer(data, uri, file_format):
 
 
 def write_file_to_s3(data, uri, file_extension, keep_index: bool = False):
-    import shutil
-
     s3_bucket = get_bucket_name_from_s3_uri(uri)
     file_key = get_file_key_from_url(uri)
     try:
-        temp_dir = tempfile.mkdtemp()
-        temp_file = os.path.join(temp_dir, "tempfile")
-
-        if file_extension == GEOJSON_FILE_EXTENSION:
-            data.to_file(temp_file, driver="GeoJSON")
-        elif file_extension == GTIFF_FILE_EXTENSION:
-            data.rio.to_raster(raster_path=temp_file, driver="GTiff")
-        elif file_extension == NETCDF_FILE_EXTENSION:
-            data.to_netcdf(temp_file)
+        if file_extension == GTIFF_FILE_EXTENSION:
+            upload_bytes_to_s3(serialize_geotiff(data), uri)
         elif file_extension == CSV_FILE_EXTENSION:
+            buffer = io.BytesIO()
             if keep_index:
-                data.to_csv(temp_file, header=True, index=True, index_label="index")
+                data.to_csv(buffer, header=True, index=True, index_label="index")
             else:
-                data.to_csv(temp_file, header=True, index=False)
+                data.to_csv(buffer, header=True, index=False)
+            upload_bytes_to_s3(buffer.getvalue(), uri)
         elif file_extension == JSON_FILE_EXTENSION:
             combined_json = json.dumps(data, indent=4)
-            with open(temp_file, "w") as file:
-                file.write(combined_json)
+            upload_bytes_to_s3(combined_json.encode("utf-8"), uri)
+        elif file_extension in (GEOJSON_FILE_EXTENSION, NETCDF_FILE_EXTENSION):
+            # these drivers need a file path, so the file is staged locally and sent as a multipart upload
+            with tempfile.TemporaryDirectory() as temp_dir:
+                temp_file = os.path.join(temp_dir, "tempfile")
+                if file_extension == GEOJSON_FILE_EXTENSION:
+                    data.to_file(temp_file, driver="GeoJSON")
+                else:
+                    data.to_netcdf(temp_file)
+                get_s3_client().upload_file(
+                    temp_file,
+                    s3_bucket,
+                    file_key,
+                    ExtraArgs={"ACL": "public-read"},
+                    Config=S3_TRANSFER_CONFIG,
+                )
+            invalidate_cache_manifest(uri)
         else:
             raise Exception(
                 f"File extension{file_extension} currently not handled for writing to S3"
             )
 
-        s3_client.upload_file(
-            temp_file, s3_bucket, file_key, ExtraArgs={"ACL": "public-read"}
-        )
-
     except Exception:
         print(f"Error writing to {file_key}")
 
     gc.collect()
-    shutil.rmtree(temp_dir)
+
+
+def serialize_geotiff(data):
+    """
+    Encodes a DataArray as GeoTIFF bytes in memory, tiled and compressed for range reads from the S3 cache.
+    """
+    from rasterio.io import MemoryFile
+
+    with MemoryFile() as memfile:
+        data.rio.to_raster(
+            raster_path=memfile.name, driver="GTiff", **GTIFF_CREATION_OPTIONS
+        )
+        return memfile.read()
+
+
+def upload_bytes_to_s3(body, uri, metadata=None):
+    """
+    Streams bytes to S3 through the shared client. Objects above the multipart threshold are uploaded
+    in concurrent parts.
+    :param metadata: optional user metadata to store with the object
+    """
+    s3_bucket = get_bucket_name_from_s3_uri(uri)
+    file_key = get_file_key_from_url(uri)
+    extra_args = {"ACL": "public-read"}
+    if metadata is not None:
+        extra_args["Metadata"] = metadata
+
+    get_s3_client().upload_fileobj(
+        io.BytesIO(body),
+        s3_bucket,
+        file_key,
+        ExtraArgs=extra_args,
+        Config=S3_TRANSFER_CONFIG,
+    )
+    invalidate_cache_manifest(uri)
 
 
 def write_csv(data, uri):
@@ -672,6 +969,9 @@ def extract_bbox_aoi(tif_da, bbox, resampling="nearest"):
     chosen to fully cover the bbox by rounding up to whole pixels, so the right/top edges may
     extend beyond (xmax, ymax), but the lower-left is exact.
 
+    The regrid is done in memory. When the target grid is pixel-aligned with the source grid
+    and lies fully inside it, the result is a slice (view) of the input without resampling.
+
     Parameters
     ----------
     tif_da : xarray.DataArray
@@ -690,95 +990,124 @@ def extract_bbox_aoi(tif_da, bbox, resampling="nearest"):
     import math
 
     import numpy as np
-    import rasterio
     from rasterio.transform import Affine
     from rasterio.warp import Resampling, reproject
 
-    with tempfile.TemporaryDirectory() as temp_dir:
-        # Persist tif_da to a temporary GeoTIFF that rasterio can open
-        src_path = os.path.join(temp_dir, "tempfile.tif")
-        write_layer(tif_da, f"file://{src_path}", GTIFF_FILE_EXTENSION)
-
-        with rasterio.open(src_path) as src:
-            # Read bbox in source CRS (you used UTM)
-            xmin, ymin, xmax, ymax = bbox.as_utm_bbox().bounds
-
-            # Pixel sizes (assumes north-up; i.e., no rotation/skew)
-            xres = abs(src.transform.a)
-            yres = abs(src.transform.e)
-
-            # Compute output pixel dimensions to cover the bbox
-            width = int(math.ceil((xmax - xmin) / xres))
-            height = int(math.ceil((ymax - ymin) / yres))
-
-            # Construct a transform whose lower-left is exactly (xmin, ymin).
-            # Rasterio transforms are defined at the *upper-left* of the top-left pixel:
-            # top-left Y must be ymin + height*yres to make the bottom-left equal to ymin.
-            dst_transform = Affine(xres, 0.0, xmin, 0.0, -yres, ymin + height * yres)
-
-            # Prepare destination array and NODATA
-            dtype = src.dtypes[0]
-            src_nodata = src.nodatavals[0]
-            if src_nodata is None:
-                # If nodata is missing, pick a safe default
-                # BE CAREFUL lest src_nodata be set to a value that legitimately appears,
-                # like zero if dtype is uint.
-                if np.issubdtype(np.dtype(dtype), np.integer):
-                    src_nodata = np.iinfo(dtype).min
-                else:
-                    src_nodata = np.nan
-
-            # Single-band destination (match your original function behavior)
-            dst_arr = np.full((height, width), src_nodata, dtype=dtype)
-
-            resampling_map = {
-                "nearest": Resampling.nearest,
-                "bilinear": Resampling.bilinear,
-                "cubic": Resampling.cubic,
-                "average": Resampling.average,
-                "mode": Resampling.mode,
-                "max": Resampling.max,
-                "min": Resampling.min,
-                "med": Resampling.med,
-                "q1": Resampling.q1,
-                "q3": Resampling.q3,
+    if "band" in tif_da.dims:
+        tif_da = tif_da.isel(band=0, drop=True)
+    _, src_da = standardize_y_dimension_direction(tif_da)
+
+    src_crs = src_da.rio.crs
+    if src_crs is None:
+        src_crs = src_da.attrs.get("crs")
+    src_transform = src_da.rio.transform()
+
+    # Read bbox in source CRS (you used UTM)
+    xmin, ymin, xmax, ymax = bbox.as_utm_bbox().bounds
+
+    # Pixel sizes (assumes north-up; i.e., no rotation/skew)
+    xres = abs(src_transform.a)
+    yres = abs(src_transform.e)
+
+    # Compute output pixel dimensions to cover the bbox
+    width = int(math.ceil((xmax - xmin) / xres))
+    height = int(math.ceil((ymax - ymin) / yres))
+    top = ymin + height * yres
+
+    # Fast path: the target grid shares pixel edges with the source and lies inside it
+    col_off = (xmin - src_transform.c) / xres
+    row_off = (src_transform.f - top) / yres
+    src_height, src_width = src_da.shape
+    if (
+        _is_whole_pixel_offset(col_off)
+        and _is_whole_pixel_offset(row_off)
+        and round(col_off) >= 0
+        and round(row_off) >= 0
+        and round(col_off) + width <= src_width
+        and round(row_off) + height <= src_height
+    ):
+        col_start = int(round(col_off))
+        row_start = int(round(row_off))
+        query_da = src_da.isel(
+            {
+                src_da.rio.y_dim: slice(row_start, row_start + height),
+                src_da.rio.x_dim: slice(col_start, col_start + width),
             }
-            resamp = resampling_map.get(resampling, Resampling.nearest)
-
-            # Reproject onto the new grid anchored at (xmin, ymin)
-            reproject(
-                source=rasterio.band(src, 1),
-                destination=dst_arr,
-                src_transform=src.transform,
-                src_crs=src.crs,
-                dst_transform=dst_transform,
-                dst_crs=src.crs,
-                resampling=resamp,
-                src_nodata=src_nodata,
-                dst_nodata=src_nodata,
-                num_threads=2,
-            )
+        )
+        return _finalize_bbox_aoi(query_da, src_crs, src_da.rio.nodata)
+
+    # Construct a transform whose lower-left is exactly (xmin, ymin).
+    # Rasterio transforms are defined at the *upper-left* of the top-left pixel:
+    # top-left Y must be ymin + height*yres to make the bottom-left equal to ymin.
+    dst_transform = Affine(xres, 0.0, xmin, 0.0, -yres, top)
+
+    # Prepare destination array and NODATA
+    dtype = src_da.dtype
+    src_nodata = src_da.rio.nodata
+    if src_nodata is None:
+        # If nodata is missing, pick a safe default
+        # BE CAREFUL lest src_nodata be set to a value that legitimately appears,
+        # like zero if dtype is uint.
+        if np.issubdtype(dtype, np.integer):
+            src_nodata = np.iinfo(dtype).min
+        else:
+            src_nodata = np.nan
+
+    # Single-band destination (match your original function behavior)
+    dst_arr = np.full((height, width), src_nodata, dtype=dtype)
+
+    resampling_map = {
+        "nearest": Resampling.nearest,
+        "bilinear": Resampling.bilinear,
+        "cubic": Resampling.cubic,
+        "average": Resampling.average,
+        "mode": Resampling.mode,
+        "max": Resampling.max,
+        "min": Resampling.min,
+        "med": Resampling.med,
+        "q1": Resampling.q1,
+        "q3": Resampling.q3,
+    }
+    resamp = resampling_map.get(resampling, Resampling.nearest)
+
+    # Reproject onto the new grid anchored at (xmin, ymin)
+    reproject(
+        source=np.asarray(src_da.values),
+        destination=dst_arr,
+        src_transform=src_transform,
+        src_crs=src_crs,
+        dst_transform=dst_transform,
+        dst_crs=src_crs,
+        resampling=resamp,
+        src_nodata=src_nodata,
+        dst_nodata=src_nodata,
+        num_threads=2,
+    )
 
-            # Write the result
-            meta = src.meta.copy()
-            meta.update(
-                {
-                    "driver": "GTiff",
-                    "height": height,
-                    "width": width,
-                    "transform": dst_transform,
-                    "count": 1,
-                    "dtype": dtype,
-                    "nodata": src_nodata,
-                    "crs": src.crs,
-                }
-            )
+    # Pixel-center coordinates of the new grid
+    x_coords = xmin + (np.arange(width) + 0.5) * xres
+    y_coords = top - (np.arange(height) + 0.5) * yres
+    query_da = xr.DataArray(
+        dst_arr,
+        dims=("y", "x"),
+        coords={"y": y_coords, "x": x_coords},
+        name=src_da.name,
+        attrs=src_da.attrs,
+    )
+
+    return _finalize_bbox_aoi(query_da, src_crs, src_nodata)
+
+
+def _is_whole_pixel_offset(offset, tolerance=1e-6):
+    return abs(offset - round(offset)) <= tolerance
 
-            out_path = os.path.join(temp_dir, "tempfile2.tif")
-            with rasterio.open(out_path, "w", **meta) as dst:
-                dst.write(dst_arr, 1)
 
-            # Load back into your working DA
-            query_da = read_geotiff_from_cache(f"file://{out_path}")
+def _finalize_bbox_aoi(query_da, crs, nodata):
+    # Match the georeferencing of a raster read back with read_geotiff_from_cache
+    query_da = query_da.rio.write_crs(crs)
+    if nodata is not None:
+        query_da = query_da.rio.write_nodata(nodata, encoded=False)
+    if "crs" not in query_da.attrs:
+        query_da = query_da.assign_attrs(crs=get_crs_from_data(query_da))
 
-        return query_da
+    return query_da
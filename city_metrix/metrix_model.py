@@ -1,9 +1,14 @@
+import functools
 import gc
+import hashlib
+import json
 import math
+import multiprocessing
 import os
 import random
 import shutil
 import tempfile
+import threading
 import time
 from abc import abstractmethod
 from pathlib import Path
@@ -19,19 +24,24 @@ import xarray as xr
 from ee import ImageCollection
 from geopandas import GeoDataFrame
 from pandas import Series
-from shapely import geometry
 from shapely.geometry import box
-from xrspatial import zonal_stats
 
-from city_metrix import s3_client
+from city_metrix import get_s3_client, initialize_ee
 from city_metrix.cache_manager import (
+    ImageCollectionCache,
     build_file_key,
+    build_tile_cache_key,
+    get_active_tile_cache,
     get_file_name,
+    get_image_collection_cache,
+    get_zone_pixel_index_cache,
     is_cache_usable,
     retrieve_city_cache,
+    tile_cache_scope,
 )
 from city_metrix.constants import (
     CIF_ACTIVE_PROCESSING_FILE_NAME,
+    CIF_ACTIVE_PROCESSING_LEASE_SECONDS,
     CIF_CACHE_S3_BUCKET_URI,
     CSV_FILE_EXTENSION,
     DEFAULT_DEVELOPMENT_ENV,
@@ -40,11 +50,14 @@ from city_metrix.constants import (
     GTIFF_FILE_EXTENSION,
     MULTI_TILE_TILE_INDEX_FILE,
     PROCESSING_KNOWN_ISSUE_FLAG,
+    PUSH_DOWN_EE_REQUESTS,
+    USE_LOCAL_EE_CACHE,
     WGS_CRS,
     GeoType,
     ProjectionType,
 )
 from city_metrix.metrix_dao import (
+    MAX_CONCURRENT_TILE_READS,
     create_uri_target_folder,
     delete_s3_file_if_exists,
     delete_s3_folder_if_exists,
@@ -54,6 +67,12 @@ from city_metrix.metrix_dao import (
     get_city_boundaries,
     get_file_key_from_url,
     get_file_path_from_uri,
+    get_uri_object_state,
+    invalidate_cache_manifest,
+    list_folder_objects,
+    put_bytes_if_unchanged,
+    serialize_geotiff,
+    upload_bytes_to_s3,
     write_file_to_s3,
     write_json,
     write_layer,
@@ -283,6 +302,7 @@ class GeoExtent:
         buf_maxx = maxx + buffer_distance_m
         buf_maxy = maxy + buffer_distance_m
 
+        initialize_ee()
         ee_rectangle = ee.Geometry.Rectangle(
             [buf_minx, buf_miny, buf_maxx, buf_maxy], crs, geodesic=False
         )
@@ -444,36 +464,38 @@ def _get_bounding_coords(bbox, output_as):
     return start_x_coord, start_y_coord, end_x_coord, end_y_coord
 
 
-def _build_tile_geometry(
-    x_coord,
-    y_coord,
+def _get_tile_start_coords(start_coord, end_coord, tile_side_units):
+    # Accumulate the offsets sequentially so that the coordinates match stepping through the grid one tile at a time
+    step_count = int(math.floor((end_coord - start_coord) / tile_side_units)) + 2
+    steps = np.full(max(step_count, 1), tile_side_units, dtype="float64")
+    steps[0] = start_coord
+    coords = np.cumsum(steps)
+    return coords[coords < end_coord]
+
+
+def _build_tile_bounds(
+    start_x_coord,
+    start_y_coord,
     end_x_coord,
     end_y_coord,
     x_tile_side_units,
     y_tile_side_units,
     tile_buffer_units,
 ):
-    cell_min_x = x_coord - tile_buffer_units
-    cell_min_y = y_coord - tile_buffer_units
-
-    tile_max_x = x_coord + x_tile_side_units
-    cell_max_x = tile_max_x if tile_max_x < end_x_coord else end_x_coord
-    cell_max_x = cell_max_x + tile_buffer_units
-
-    tile_max_y = y_coord + y_tile_side_units
-    cell_max_y = tile_max_y if tile_max_y < end_y_coord else end_y_coord
-    cell_max_y = cell_max_y + tile_buffer_units
-
-    geom = geometry.Polygon(
-        [
-            (cell_min_x, cell_min_y),
-            (cell_min_x, cell_max_y),
-            (cell_max_x, cell_max_y),
-            (cell_max_x, cell_min_y),
-            (cell_min_x, cell_min_y),
-        ]
-    )
-    return geom
+    x_coords = _get_tile_start_coords(start_x_coord, end_x_coord, x_tile_side_units)
+    y_coords = _get_tile_start_coords(start_y_coord, end_y_coord, y_tile_side_units)
+
+    # tiles are ordered row by row from the lower-left corner
+    x_grid, y_grid = np.meshgrid(x_coords, y_coords)
+    x_grid = x_grid.ravel()
+    y_grid = y_grid.ravel()
+
+    cell_min_x = x_grid - tile_buffer_units
+    cell_min_y = y_grid - tile_buffer_units
+    cell_max_x = np.minimum(x_grid + x_tile_side_units, end_x_coord) + tile_buffer_units
+    cell_max_y = np.minimum(y_grid + y_tile_side_units, end_y_coord) + tile_buffer_units
+
+    return np.column_stack([cell_min_x, cell_min_y, cell_max_x, cell_max_y])
 
 
 def create_fishnet_grid(
@@ -483,7 +505,8 @@ def create_fishnet_grid(
     length_units: str = "meters",
     spatial_resolution: int = 1,
     output_as: ProjectionType = ProjectionType.UTM,
-) -> gpd.GeoDataFrame:
+    bounds_only: bool = False,
+) -> Union[gpd.GeoDataFrame, np.ndarray]:
     """
     Constructs a grid of tiled areas in either geographic or utm space.
     :param bbox: bounding dimensions of the enclosing box around the grid.
@@ -492,7 +515,8 @@ def create_fishnet_grid(
     :param length_units: units for tile_side_length and tile_buffer_size in either "meters" or "degrees".
     :param spatial_resolution: distance in meters for incremental spacing of the tile size.
     :param output_as: reference system in which the grid is constructed as a ProjectionType.
-    :return: GeoDataFrame
+    :param bounds_only: whether to return only an (n, 4) array of tile bounds (minx, miny, maxx, maxy) in grid order.
+    :return: GeoDataFrame, or ndarray if bounds_only
     """
     # NOTE: the AOI can be specified in either WGS or UTM, but the generated tile grid is always in UTM
     tile_side_length = 0 if tile_side_length is None else tile_side_length
@@ -548,25 +572,17 @@ def create_fishnet_grid(
     if y_cell_count > maximum_grid_side_count:
         raise ValueError("Failure. Grid would have too many cells along the y axis.")
 
-    geom_array = []
-    x_coord = start_x_coord
-    y_coord = start_y_coord
-    while y_coord < end_y_coord:
-        while x_coord < end_x_coord:
-            geom = _build_tile_geometry(
-                x_coord,
-                y_coord,
-                end_x_coord,
-                end_y_coord,
-                x_tile_side_units,
-                y_tile_side_units,
-                tile_buffer_units,
-            )
-            geom_array.append(geom)
-            x_coord += x_tile_side_units
-        x_coord = start_x_coord
-
-        y_coord += y_tile_side_units
+    tile_bounds = _build_tile_bounds(
+        start_x_coord,
+        start_y_coord,
+        end_x_coord,
+        end_y_coord,
+        x_tile_side_units,
+        y_tile_side_units,
+        tile_buffer_units,
+    )
+    if bounds_only:
+        return tile_bounds
 
     if (
         bbox.projection_type == ProjectionType.GEOGRAPHIC
@@ -581,7 +597,10 @@ def create_fishnet_grid(
     else:
         grid_crs = bbox.crs
 
-    fishnet = gpd.GeoDataFrame(geom_array, columns=["geometry"]).set_crs(grid_crs)
+    geom_array = shapely.box(
+        tile_bounds[:, 0], tile_bounds[:, 1], tile_bounds[:, 2], tile_bounds[:, 3]
+    )
+    fishnet = gpd.GeoDataFrame(geometry=geom_array, crs=grid_crs)
     # Make a copy of the geometry to preserve the full extent of the tile as immutable_fishnet_geometry, since the geometry
     # column is modified in other processing.
     fishnet["immutable_fishnet_geometry"] = fishnet["geometry"]
@@ -590,6 +609,423 @@ def create_fishnet_grid(
 
 # ================= LayerGroupBy ==============
 DEFAULT_MAX_TILE_SIZE_M = 15000
+# Executor modes for fishnetted zonal statistics. "serial" processes one tile at a time; "threads" runs tile
+# retrieval and zonal statistics in a thread pool; "processes" retrieves tiles in threads and hands the
+# rasterize/zonal statistics step to a pool of spawned processes.
+ZONAL_STATS_EXECUTOR_MODES = ["serial", "threads", "processes"]
+DEFAULT_ZONAL_STATS_EXECUTOR_MODE = "serial"
+# Approximate memory held by one in-flight tile, used to bound the number of concurrent tiles
+ZONAL_STATS_TILE_TARGET_GB = 2
+# Statistics computed by the zonal kernel; percentiles are requested as "p<q>", e.g. "p90"
+ZONAL_STATS_FUNCS = ["count", "sum", "mean", "min", "max", "variance", "std", "median"]
+# The single-pass numba kernel is used for moments when numba is installed, unless CIF_ZONAL_STATS_NUMBA=0
+USE_NUMBA_ZONAL_KERNEL = os.environ.get("CIF_ZONAL_STATS_NUMBA", "1").lower() in ("1", "true", "yes")
+# Tile statistic holding the sorted finite values of each group, so that medians and percentiles of zones split
+# across fishnet tiles are exact
+SEGMENT_VALUES_FUNC = "values"
+# Tolerance, in pixels, for treating two grids as sharing a resolution ratio and origin
+GRID_ALIGNMENT_TOLERANCE = 1e-6
+# Layer values are offset into the low 32 bits of the keys that pair zones and layer values
+LAYER_KEY_OFFSET = 2**31
+
+
+class ZonalStatsAccumulator:
+    """
+    Running per-zone partial statistics (count, sum, sum of squared deviations from the mean, min, max) for
+    fishnetted zonal statistics.
+    Each tile's statistics are folded in as the tile completes and can then be dropped, so memory stays flat
+    with the number of tiles. Medians and percentiles are not decomposable, so for those the finite values of
+    each zone are kept until the result is computed.
+    """
+
+    def __init__(self):
+        self.zone_ids = np.empty(0, dtype="int64")
+        self.has_layer = False
+        self.count = np.empty(0, dtype="float64")
+        self.sum = np.empty(0, dtype="float64")
+        self.m2 = np.empty(0, dtype="float64")
+        self.min = np.empty(0, dtype="float64")
+        self.max = np.empty(0, dtype="float64")
+        self.segment_values = {}
+
+    def add(self, tile_stats: pd.DataFrame):
+        if tile_stats is None or len(tile_stats) == 0:
+            return
+
+        tile_zone_ids = tile_stats["zone"].to_numpy(dtype="int64")
+        if "layer" in tile_stats.columns:
+            # zone and layer value pairs share one sortable key
+            self.has_layer = True
+            tile_layer_values = tile_stats["layer"].to_numpy(dtype="int64")
+            tile_zone_ids = (tile_zone_ids << 32) | (tile_layer_values + LAYER_KEY_OFFSET)
+        self._expand_to(tile_zone_ids)
+        positions = np.searchsorted(self.zone_ids, tile_zone_ids)
+
+        tile_count = np.nan_to_num(tile_stats["count"].to_numpy(dtype="float64"))
+        if "sum" in tile_stats.columns:
+            tile_sum = np.nan_to_num(tile_stats["sum"].to_numpy(dtype="float64"))
+            if "variance" in tile_stats.columns:
+                # M2 = n * variance
+                tile_variance = np.nan_to_num(
+                    tile_stats["variance"].to_numpy(dtype="float64")
+                )
+                tile_m2 = tile_count * tile_variance
+            else:
+                tile_m2 = np.zeros_like(tile_count)
+            self._merge_moments(positions, tile_count, tile_sum, tile_m2)
+        else:
+            np.add.at(self.count, positions, tile_count)
+
+        if "min" in tile_stats.columns:
+            np.fmin.at(self.min, positions, tile_stats["min"].to_numpy(dtype="float64"))
+        if "max" in tile_stats.columns:
+            np.fmax.at(self.max, positions, tile_stats["max"].to_numpy(dtype="float64"))
+        if SEGMENT_VALUES_FUNC in tile_stats.columns:
+            for key, values in zip(tile_zone_ids, tile_stats[SEGMENT_VALUES_FUNC]):
+                self.segment_values.setdefault(key, []).append(values)
+
+    def result(self, stats_func) -> pd.DataFrame:
+        """
+        :param stats_func: a statistic, or a list of statistics
+        :return: DataFrame with a zone column, a layer column when grouping by layer values, and a column per
+            statistic
+        """
+        stats_funcs = [stats_func] if isinstance(stats_func, str) else list(stats_func)
+        has_values = self.count > 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.where(has_values, self.sum / self.count, np.nan)
+            variance = np.where(has_values, self.m2 / self.count, np.nan)
+
+        order_stats = {}
+        order_funcs = [func for func in stats_funcs if func not in ZONAL_STATS_FUNCS or func == "median"]
+        if order_funcs:
+            zone_values = [np.concatenate(self.segment_values.get(key, [[]])) for key in self.zone_ids]
+            order_stats = compute_grouped_stats(
+                np.repeat(np.arange(len(zone_values)), [len(values) for values in zone_values]),
+                np.concatenate(zone_values + [np.empty(0)]).astype("float64"),
+                len(zone_values),
+                order_funcs,
+            )
+
+        if self.has_layer:
+            results = {
+                "zone": (self.zone_ids >> 32).astype("float64"),
+                "layer": (self.zone_ids & 0xFFFFFFFF) - LAYER_KEY_OFFSET,
+            }
+        else:
+            results = {"zone": self.zone_ids.astype("float64")}
+
+        for func in stats_funcs:
+            if func == "count":
+                results[func] = self.count
+            elif func == "sum":
+                results[func] = self.sum
+            elif func == "mean":
+                results[func] = mean
+            elif func == "min":
+                results[func] = np.where(has_values, self.min, np.nan)
+            elif func == "max":
+                results[func] = np.where(has_values, self.max, np.nan)
+            elif func == "variance":
+                results[func] = variance
+            elif func == "std":
+                results[func] = np.sqrt(variance)
+            elif func in order_stats:
+                results[func] = order_stats[func]
+            else:
+                raise ValueError(f"Unsupported statistic ('{func}')")
+
+        return pd.DataFrame(results)
+
+    def _merge_moments(self, positions, tile_count, tile_sum, tile_m2):
+        """
+        Folds the count, sum and M2 of each tile into the running values with the parallel update of Chan et al.,
+        which avoids the cancellation of recovering the variance from sums of squares.
+        """
+        if len(np.unique(positions)) < len(positions):
+            # keys repeated within a tile are folded in one row at a time
+            for row in range(len(positions)):
+                self._merge_moments(
+                    positions[row : row + 1],
+                    tile_count[row : row + 1],
+                    tile_sum[row : row + 1],
+                    tile_m2[row : row + 1],
+                )
+            return
+
+        count = self.count[positions]
+        merged_count = count + tile_count
+        with np.errstate(divide="ignore", invalid="ignore"):
+            delta = np.where(tile_count > 0, tile_sum / tile_count, 0) - np.where(
+                count > 0, self.sum[positions] / count, 0
+            )
+            correction = np.where(
+                merged_count > 0, delta**2 * count * tile_count / merged_count, 0
+            )
+        self.m2[positions] += tile_m2 + correction
+        self.count[positions] = merged_count
+        self.sum[positions] += tile_sum
+
+    def _expand_to(self, tile_zone_ids):
+        all_zone_ids = np.union1d(self.zone_ids, tile_zone_ids)
+        if len(all_zone_ids) == len(self.zone_ids):
+            return
+
+        positions = np.searchsorted(all_zone_ids, self.zone_ids)
+        size = len(all_zone_ids)
+        self.count = _scatter_into(self.count, positions, size, 0)
+        self.sum = _scatter_into(self.sum, positions, size, 0)
+        self.m2 = _scatter_into(self.m2, positions, size, 0)
+        self.min = _scatter_into(self.min, positions, size, np.inf)
+        self.max = _scatter_into(self.max, positions, size, -np.inf)
+        self.zone_ids = all_zone_ids
+
+
+def _scatter_into(values, positions, size, fill_value):
+    expanded = np.full(size, fill_value, dtype="float64")
+    expanded[positions] = values
+    return expanded
+
+
+class ZonePixelIndex:
+    """
+    Zone-to-pixel index of a rasterized set of zones in CSR layout. The flattened positions of the pixels of zone
+    zone_ids[i] are pixel_positions[offsets[i]:offsets[i + 1]], so statistics of any raster on the same grid are
+    a gather followed by np.bincount and segment reductions, without rasterizing the zones again.
+    """
+
+    def __init__(self, zone_ids, offsets, pixel_positions, shape):
+        self.zone_ids = zone_ids
+        self.offsets = offsets
+        self.pixel_positions = pixel_positions
+        self.shape = tuple(shape)
+
+    @classmethod
+    def from_zone_raster(cls, zone_raster):
+        """
+        :param zone_raster: 2-D array of integer zone ids, negative outside all zones
+        """
+        zone_raster = np.asarray(zone_raster)
+        flat_zones = zone_raster.reshape(-1)
+        positions = np.flatnonzero(flat_zones >= 0)
+        order = np.argsort(flat_zones[positions], kind="stable")
+        zone_ids, pixel_counts = np.unique(flat_zones[positions[order]], return_counts=True)
+
+        position_dtype = "int32" if flat_zones.size < np.iinfo("int32").max else "int64"
+        return cls(
+            zone_ids.astype("int64"),
+            np.concatenate([[0], np.cumsum(pixel_counts)]).astype("int64"),
+            positions[order].astype(position_dtype),
+            zone_raster.shape,
+        )
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays["zone_ids"].astype("int64"), arrays["offsets"], arrays["pixel_positions"], arrays["shape"])
+
+    def to_arrays(self):
+        return {
+            "zone_ids": self.zone_ids,
+            "offsets": self.offsets,
+            "pixel_positions": self.pixel_positions,
+            "shape": np.asarray(self.shape, dtype="int64"),
+        }
+
+    def to_raster(self):
+        zone_raster = np.full(int(np.prod(self.shape)), -1, dtype="int64")
+        zone_raster[self.pixel_positions] = np.repeat(self.zone_ids, np.diff(self.offsets))
+        return zone_raster.reshape(self.shape)
+
+    def gather(self, values):
+        # values of a raster on the grid of the index, ordered by zone
+        return np.asarray(values).reshape(-1)[self.pixel_positions]
+
+    def zonal_stats(self, values, stats_funcs, group_by_values=None) -> pd.DataFrame:
+        """
+        Computes statistics of the finite values of each zone, or of each zone and group-by value pair. As with
+        xrspatial, groups without finite values get NaN for every statistic, including the count.
+
+        :param values: raster on the grid of the index
+        :param stats_funcs: statistics among ZONAL_STATS_FUNCS and percentiles named "p<q>"
+        :param group_by_values: optional raster of integer categories on the same grid; pixels where it is not
+            finite are left out
+        :return: DataFrame with a zone column, a layer column when grouping by values, and one column per statistic
+        """
+        zone_positions = np.repeat(np.arange(len(self.zone_ids)), np.diff(self.offsets))
+        zone_values = self.gather(values).astype("float64", copy=False)
+
+        if group_by_values is None:
+            group_stats = compute_grouped_stats(zone_positions, zone_values, len(self.zone_ids), stats_funcs)
+            return pd.DataFrame({"zone": self.zone_ids.astype("float64"), **group_stats})
+
+        layer_values = self.gather(group_by_values).astype("float64", copy=False)
+        has_layer_value = np.isfinite(layer_values)
+        layer_ids, layer_codes = np.unique(layer_values[has_layer_value].astype("int64"), return_inverse=True)
+        # compact codes of the zone and layer value pairs present in the tile
+        pair_ids, pair_codes = np.unique(
+            zone_positions[has_layer_value] * len(layer_ids) + layer_codes.reshape(-1), return_inverse=True
+        )
+        group_stats = compute_grouped_stats(
+            pair_codes.reshape(-1), zone_values[has_layer_value], len(pair_ids), stats_funcs
+        )
+        return pd.DataFrame(
+            {
+                "zone": self.zone_ids[pair_ids // max(len(layer_ids), 1)].astype("float64"),
+                "layer": layer_ids[pair_ids % max(len(layer_ids), 1)],
+                **group_stats,
+            }
+        )
+
+
+def compute_grouped_stats(group_codes, values, group_count, stats_funcs):
+    """
+    Zonal statistics kernel. Moments come from NaN-aware np.bincount reductions, or from a single-pass numba
+    kernel when numba is installed. Order statistics come from one sort of the values by group.
+
+    :param group_codes: group of each value, from 0 to group_count - 1
+    :param values: float64 values; non-finite values are ignored
+    :param group_count: number of groups
+    :param stats_funcs: statistics among ZONAL_STATS_FUNCS, percentiles named "p<q>" and SEGMENT_VALUES_FUNC
+    :return: dictionary of arrays of length group_count, NaN for groups without finite values
+    """
+    percentiles = {
+        func: _get_percentile(func)
+        for func in stats_funcs
+        if func not in ZONAL_STATS_FUNCS and func != SEGMENT_VALUES_FUNC
+    }
+    needs_variance = "variance" in stats_funcs or "std" in stats_funcs
+    needs_sort = bool(percentiles) or "median" in stats_funcs or SEGMENT_VALUES_FUNC in stats_funcs
+
+    numba_kernel = _get_numba_moments_kernel() if USE_NUMBA_ZONAL_KERNEL else None
+    if numba_kernel is not None:
+        count, total, squared_deviations, minimum, maximum = numba_kernel(
+            np.ascontiguousarray(group_codes, dtype="int64"),
+            np.ascontiguousarray(values, dtype="float64"),
+            group_count,
+        )
+    else:
+        needs_sort = needs_sort or "min" in stats_funcs or "max" in stats_funcs
+
+    if numba_kernel is None or needs_sort:
+        is_finite = np.isfinite(values)
+        group_codes = group_codes[is_finite]
+        values = values[is_finite]
+
+    if numba_kernel is None:
+        count = np.bincount(group_codes, minlength=group_count).astype("float64")
+        total = np.bincount(group_codes, weights=values, minlength=group_count)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / count
+        if needs_variance:
+            if numba_kernel is None:
+                squared_deviations = np.bincount(
+                    group_codes, weights=(values - mean[group_codes]) ** 2, minlength=group_count
+                )
+            variance = squared_deviations / count
+
+    if needs_sort:
+        # values sorted by group and value, so that each group is a sorted segment
+        sorted_values = values[np.lexsort((values, group_codes))]
+        group_ends = np.cumsum(count).astype("int64")
+        group_starts = group_ends - count.astype("int64")
+        if numba_kernel is None:
+            minimum = _take_or_nan(sorted_values, group_starts, count > 0)
+            maximum = _take_or_nan(sorted_values, group_ends - 1, count > 0)
+
+    group_stats = {}
+    for func in stats_funcs:
+        if func == "count":
+            func_values = count
+        elif func == "sum":
+            func_values = total
+        elif func == "mean":
+            func_values = mean
+        elif func == "variance":
+            func_values = variance
+        elif func == "std":
+            func_values = np.sqrt(variance)
+        elif func == "min":
+            func_values = minimum
+        elif func == "max":
+            func_values = maximum
+        elif func == SEGMENT_VALUES_FUNC:
+            group_stats[func] = np.empty(group_count, dtype=object)
+            for group, segment in enumerate(np.split(sorted_values, group_ends[:-1])):
+                group_stats[func][group] = segment
+            continue
+        else:
+            percentile = 50 if func == "median" else percentiles[func]
+            func_values = _get_segment_percentile(sorted_values, group_starts, count, percentile)
+        group_stats[func] = np.where(count > 0, func_values, np.nan)
+
+    return group_stats
+
+
+def validate_stats_funcs(stats_funcs):
+    for stats_func in stats_funcs:
+        if stats_func not in ZONAL_STATS_FUNCS:
+            _get_percentile(stats_func)
+
+
+def _get_percentile(stats_func):
+    try:
+        if stats_func.startswith("p"):
+            percentile = float(stats_func[1:])
+            if 0 <= percentile <= 100:
+                return percentile
+    except ValueError:
+        pass
+    raise ValueError(f"Unsupported statistic ('{stats_func}')")
+
+
+def _take_or_nan(values, positions, has_values):
+    return np.where(has_values, values[np.where(has_values, positions, 0)] if len(values) else np.nan, np.nan)
+
+
+def _get_segment_percentile(sorted_values, group_starts, count, percentile):
+    # linear interpolation between the closest ranks, as np.percentile does by default
+    has_values = count > 0
+    rank = (count - 1) * percentile / 100
+    lower_rank = np.floor(rank)
+    lower = _take_or_nan(sorted_values, group_starts + lower_rank.astype("int64"), has_values)
+    upper = _take_or_nan(sorted_values, group_starts + np.ceil(rank).astype("int64"), has_values)
+    return lower + (upper - lower) * (rank - lower_rank)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_numba_moments_kernel():
+    try:
+        import numba
+    except ImportError:
+        return None
+
+    @numba.njit(nogil=True)
+    def moments_kernel(group_codes, values, group_count):
+        # one pass over the pixels with Welford updates for the squared deviations
+        count = np.zeros(group_count)
+        total = np.zeros(group_count)
+        mean = np.zeros(group_count)
+        squared_deviations = np.zeros(group_count)
+        minimum = np.full(group_count, np.nan)
+        maximum = np.full(group_count, np.nan)
+        for i in range(values.size):
+            value = values[i]
+            if not np.isfinite(value):
+                continue
+            group = group_codes[i]
+            count[group] += 1
+            total[group] += value
+            delta = value - mean[group]
+            mean[group] += delta / count[group]
+            squared_deviations[group] += delta * (value - mean[group])
+            if count[group] == 1 or value < minimum[group]:
+                minimum[group] = value
+            if count[group] == 1 or value > maximum[group]:
+                maximum[group] = value
+        return count, total, squared_deviations, minimum, maximum
+
+    return moments_kernel
 
 
 class LayerGroupBy:
@@ -601,6 +1037,8 @@ class LayerGroupBy:
         layer=None,
         custom_tile_size_m=None,
         masks=None,
+        executor_mode=None,
+        max_in_flight_tiles=None,
     ):
         self.aggregate = aggregate
         self.masks = [] if masks is None else masks
@@ -608,6 +1046,15 @@ class LayerGroupBy:
         self.custom_tile_size_m = custom_tile_size_m
         self.spatial_resolution = spatial_resolution
         self.layer = layer
+        self.executor_mode = (
+            DEFAULT_ZONAL_STATS_EXECUTOR_MODE if executor_mode is None else executor_mode
+        )
+        if self.executor_mode not in ZONAL_STATS_EXECUTOR_MODES:
+            raise ValueError(
+                f"Invalid executor_mode ('{executor_mode}'). "
+                f"Valid modes: {ZONAL_STATS_EXECUTOR_MODES}"
+            )
+        self.max_in_flight_tiles = max_in_flight_tiles
 
     def mean(self):
         return self._compute_statistic("mean")
@@ -618,16 +1065,49 @@ class LayerGroupBy:
     def sum(self):
         return self._compute_statistic("sum")
 
+    def min(self):
+        return self._compute_statistic("min")
+
+    def max(self):
+        return self._compute_statistic("max")
+
+    def std(self):
+        return self._compute_statistic("std")
+
+    def variance(self):
+        return self._compute_statistic("variance")
+
+    def median(self):
+        return self._compute_statistic("median")
+
+    def agg(self, stats_funcs):
+        """
+        Computes several statistics in one pass, retrieving and aligning the data of each tile once.
+
+        :param stats_funcs: list of statistics among ZONAL_STATS_FUNCS and percentiles named "p<q>", e.g. "p90"
+        :return: DataFrame with one column per statistic. With geo levels the DataFrame also has a zone column.
+            When grouping by a layer, each value is a dictionary of the statistic per layer value.
+        """
+        stats_funcs = list(dict.fromkeys(stats_funcs))
+        if not stats_funcs:
+            raise ValueError("At least one statistic is required")
+        validate_stats_funcs(stats_funcs)
+        return self._compute_statistic(stats_funcs)
+
     def _compute_statistic(self, stats_func):
-        return self._zonal_stats(
-            stats_func,
-            self.geo_zone,
-            self.aggregate,
-            self.layer,
-            self.masks,
-            self.custom_tile_size_m,
-            self.spatial_resolution,
-        )
+        # share retrieved tiles between the aggregate, masks and group-by layer
+        with tile_cache_scope():
+            return self._zonal_stats(
+                stats_func,
+                self.geo_zone,
+                self.aggregate,
+                self.layer,
+                self.masks,
+                self.custom_tile_size_m,
+                self.spatial_resolution,
+                self.executor_mode,
+                self.max_in_flight_tiles,
+            )
 
     @staticmethod
     def _zonal_stats(
@@ -638,6 +1118,8 @@ class LayerGroupBy:
         masks,
         custom_tile_size_m,
         spatial_resolution,
+        executor_mode=DEFAULT_ZONAL_STATS_EXECUTOR_MODE,
+        max_in_flight_tiles=None,
     ):
         zones = geo_zone.zones.reset_index(drop=True)
         # Get area of zone in square degrees
@@ -649,18 +1131,24 @@ class LayerGroupBy:
             else DEFAULT_MAX_TILE_SIZE_M
         )
 
+        stats_funcs = [stats_func] if isinstance(stats_func, str) else stats_func
+
         # if area of zone is within tolerance, then query as a single tile, otherwise sub-tile
         if box_area <= tile_size_meters**2:
+            push_down = LayerGroupBy._can_push_down(GeoExtent(geo_zone), aggregate, layer, masks)
             stats = LayerGroupBy._zonal_stats_tile(
-                [stats_func],
+                stats_funcs,
                 geo_zone,
                 zones,
                 aggregate,
                 layer,
                 masks,
                 spatial_resolution,
+                push_down,
             )
         else:
+            # fishnet tiles are not city extents, so none of them is read from the S3 cache
+            push_down = LayerGroupBy._can_push_down(GeoExtent(zones), aggregate, layer, masks)
             stats = LayerGroupBy._zonal_stats_fishnet(
                 stats_func,
                 geo_zone,
@@ -670,22 +1158,26 @@ class LayerGroupBy:
                 masks,
                 tile_size_meters,
                 spatial_resolution,
+                executor_mode,
+                max_in_flight_tiles,
+                push_down,
             )
 
         if layer is not None:
-            # decode zone and layer value using bit operations
-            stats["layer"] = stats["zone"].astype("uint32").values >> 16
-            stats["zone"] = stats["zone"].astype("uint32").values & 65535
+            stats["zone"] = stats["zone"].astype("int64")
 
             # group layer values together into a dictionary per zone
-            def group_layer_values(df):
+            def group_layer_values(df, func):
                 layer_values = df.drop(columns="zone").groupby("layer").sum()
                 layer_dicts = layer_values.to_dict()
-                return layer_dicts[stats_func]
+                return layer_dicts[func]
 
-            stats = stats.groupby("zone").apply(group_layer_values)
+            if isinstance(stats_func, str):
+                return stats.groupby("zone").apply(group_layer_values, stats_func)
 
-            return stats
+            return pd.DataFrame(
+                {func: stats.groupby("zone").apply(group_layer_values, func) for func in stats_funcs}
+            )
 
         # # Ensure all zones are represented, even those that produced no raster pixels
         # # (e.g. polygons too small to capture a pixel center, or dropped as degenerate
@@ -693,7 +1185,9 @@ class LayerGroupBy:
         # all_zone_ids = pd.DataFrame({"zone": np.arange(len(zones), dtype=float)})
         # stats = pd.merge(all_zone_ids, stats, on="zone", how="left")
 
-        if "geo_level" in zones.columns:
+        if not isinstance(stats_func, str):
+            result_stats = stats[["zone", *stats_funcs]] if "geo_level" in zones.columns else stats[stats_funcs]
+        elif "geo_level" in zones.columns:
             result_stats = stats[["zone", stats_func]]
             result_stats = result_stats.rename(columns={stats_func: "value"})
         else:
@@ -711,6 +1205,9 @@ class LayerGroupBy:
         masks,
         tile_size_m,
         spatial_resolution,
+        executor_mode=DEFAULT_ZONAL_STATS_EXECUTOR_MODE,
+        max_in_flight_tiles=None,
+        push_down=False,
     ):
         # fishnet GeoDataFrame into smaller tiles
         crs = zones.crs.srs
@@ -746,55 +1243,177 @@ class LayerGroupBy:
 
         # separate out zones intersecting to tiles in their own data frames
         tile_gdfs = [
-            tile[["index", "geometry"]].copy() for _, tile in gdf.groupby("index_right")
+            LayerGroupBy._merge_tile_geometry_into_query_gdf(
+                tile[["index", "geometry"]].copy(), zones
+            )
+            for _, tile in gdf.groupby("index_right")
         ]
         tile_funcs = LayerGroupBy.get_stats_funcs(stats_func)
 
-        # run zonal stats per tiled data frame
+        # run zonal stats per tiled data frame and fold partial results in as tiles complete
         print(f"Input covers too much area, splitting into {len(tile_gdfs)} tiles")
-        tile_stats = pd.concat(
-            [
-                LayerGroupBy._zonal_stats_tile(
-                    tile_funcs,
-                    LayerGroupBy._merge_tile_geometry_into_query_gdf(tile_gdf, zones),
-                    zones,
-                    aggregate,
-                    layer,
-                    masks,
-                    spatial_resolution,
+        accumulator = ZonalStatsAccumulator()
+        for tile_stats in LayerGroupBy._iterate_tile_stats(
+            tile_funcs,
+            tile_gdfs,
+            zones,
+            aggregate,
+            layer,
+            masks,
+            spatial_resolution,
+            executor_mode,
+            max_in_flight_tiles,
+            push_down,
+        ):
+            accumulator.add(tile_stats)
+
+        return accumulator.result(stats_func)
+
+    @staticmethod
+    def _iterate_tile_stats(
+        tile_funcs,
+        tile_gdfs,
+        zones,
+        aggregate,
+        layer,
+        masks,
+        spatial_resolution,
+        executor_mode,
+        max_in_flight_tiles,
+        push_down=False,
+    ):
+        """
+        Yields the zonal statistics of each tile as soon as the tile completes. Retrieval of tile data runs in a
+        thread pool since it is bound by GEE/S3 I/O. In "processes" mode the rasterize and zonal statistics step
+        is handed to a process pool. The number of tiles held in memory is bounded by max_in_flight_tiles.
+        """
+        if executor_mode == "serial" or len(tile_gdfs) <= 1:
+            for tile_gdf in tile_gdfs:
+                yield LayerGroupBy._zonal_stats_tile(
+                    tile_funcs, tile_gdf, zones, aggregate, layer, masks, spatial_resolution, push_down
                 )
-                for tile_gdf in tile_gdfs
-            ]
-        )
+            return
 
-        # Aggregate values by zone column
-        aggregated = tile_stats.groupby("zone", as_index=False).apply(
-            LayerGroupBy._aggregate_stats, stats_func
+        from concurrent.futures import (
+            FIRST_COMPLETED,
+            ProcessPoolExecutor,
+            ThreadPoolExecutor,
+            wait,
         )
+        from contextvars import copy_context
 
-        # Rename column to statistical function
-        if None in aggregated.columns:
-            aggregated.rename(columns={None: stats_func}, inplace=True)
+        if max_in_flight_tiles is None:
+            max_in_flight_tiles = _get_worker_count(ZONAL_STATS_TILE_TARGET_GB)
+        max_in_flight_tiles = max(1, min(max_in_flight_tiles, len(tile_gdfs)))
 
-        return aggregated.reset_index()
+        geo_levels = (
+            zones["geo_level"].unique() if "geo_level" in zones.columns else None
+        )
+        has_layer = layer is not None
+
+        fetch_pool = ThreadPoolExecutor(max_workers=max_in_flight_tiles)
+        compute_pool = (
+            # workers are spawned rather than forked, since the fetch threads and the boto3 and Earth Engine
+            # clients are already running
+            ProcessPoolExecutor(
+                max_workers=max_in_flight_tiles,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            if executor_mode == "processes"
+            else None
+        )
+        try:
+            pending_tiles = list(tile_gdfs)
+            fetch_futures = {}
+            compute_futures = set()
+            while pending_tiles or fetch_futures or compute_futures:
+                # keep the number of tiles in flight within the memory budget
+                while (
+                    pending_tiles
+                    and len(fetch_futures) + len(compute_futures) < max_in_flight_tiles
+                ):
+                    tile_gdf = pending_tiles.pop(0)
+                    if compute_pool is None:
+                        task = (
+                            LayerGroupBy._zonal_stats_tile,
+                            tile_funcs,
+                            tile_gdf,
+                            zones,
+                            aggregate,
+                            layer,
+                            masks,
+                            spatial_resolution,
+                            push_down,
+                        )
+                    else:
+                        task = (
+                            LayerGroupBy._retrieve_aligned_tile_data,
+                            tile_gdf,
+                            aggregate,
+                            layer,
+                            masks,
+                            spatial_resolution,
+                            push_down,
+                        )
+                    # run in a copy of the current context so that the active tile cache is shared
+                    future = fetch_pool.submit(copy_context().run, *task)
+                    fetch_futures[future] = tile_gdf
 
-    @staticmethod
-    def _aggregate_stats(df, stats_func):
-        if stats_func == "count":
-            return df["count"].sum()
-        elif stats_func == "mean":
-            # mean must weight by number of pixels used for each tile
-            return (df["mean"] * df["count"]).sum() / df["count"].sum()
-        elif stats_func == "sum":
-            return df["sum"].sum()
+                done, _ = wait(
+                    set(fetch_futures) | compute_futures, return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    if future in compute_futures:
+                        compute_futures.remove(future)
+                        yield future.result()
+                        continue
+
+                    tile_gdf = fetch_futures.pop(future)
+                    if compute_pool is None:
+                        yield future.result()
+                    else:
+                        aligned_data = future.result()
+                        if aligned_data is None:
+                            continue
+                        align_to, aligned_layer_data, aligned_aggregate_data = aligned_data
+                        compute_futures.add(
+                            compute_pool.submit(
+                                LayerGroupBy._compute_tile_stats,
+                                tile_funcs,
+                                has_layer,
+                                tile_gdf,
+                                geo_levels,
+                                align_to,
+                                aligned_layer_data,
+                                aligned_aggregate_data,
+                            )
+                        )
+        finally:
+            fetch_pool.shutdown(wait=True, cancel_futures=True)
+            if compute_pool is not None:
+                compute_pool.shutdown(wait=True, cancel_futures=True)
 
     @staticmethod
     def get_stats_funcs(stats_func):
-        if stats_func == "mean":
-            # mean requires both count and mean to get weighted mean across tiles
-            return ["count", "mean"]
+        # count is always included so that zones without valid pixels can be identified across tiles
+        if not isinstance(stats_func, str):
+            return list(
+                dict.fromkeys(
+                    tile_func for func in stats_func for tile_func in LayerGroupBy.get_stats_funcs(func)
+                )
+            )
+        if stats_func in ["mean", "sum"]:
+            return ["count", "sum"]
+        elif stats_func in ["std", "variance"]:
+            # variance is required to recover the sum of squares for each tile
+            return ["count", "sum", "variance"]
+        elif stats_func == "count":
+            return ["count"]
+        elif stats_func not in ZONAL_STATS_FUNCS or stats_func == "median":
+            # order statistics are computed from the values of all tiles
+            return ["count", SEGMENT_VALUES_FUNC]
         else:
-            return [stats_func]
+            return ["count", stats_func]
 
     @staticmethod
     def _merge_tile_geometry_into_query_gdf(tile_gdf, zones):
@@ -805,8 +1424,42 @@ class LayerGroupBy:
 
     @staticmethod
     def _zonal_stats_tile(
-        stats_func, tile_gdf, zones, aggregate, layer, masks, spatial_resolution
+        stats_func, tile_gdf, zones, aggregate, layer, masks, spatial_resolution, push_down=False
     ):
+        aligned_data = LayerGroupBy._retrieve_aligned_tile_data(
+            tile_gdf, aggregate, layer, masks, spatial_resolution, push_down
+        )
+        if aligned_data is None:
+            return None
+
+        align_to, aligned_layer_data, aligned_aggregate_data = aligned_data
+
+        # Get zones differently for single or multiple tiles
+        if not isinstance(tile_gdf, GeoDataFrame):
+            tile_gdf = tile_gdf.zones
+
+        geo_levels = zones["geo_level"].unique() if "geo_level" in zones.columns else None
+
+        return LayerGroupBy._compute_tile_stats(
+            stats_func,
+            layer is not None,
+            tile_gdf,
+            geo_levels,
+            align_to,
+            aligned_layer_data,
+            aligned_aggregate_data,
+        )
+
+    @staticmethod
+    def _retrieve_aligned_tile_data(tile_gdf, aggregate, layer, masks, spatial_resolution, push_down=False):
+        if push_down:
+            pushed_down_data = LayerGroupBy._retrieve_pushed_down_tile_data(
+                tile_gdf, aggregate, layer, masks, spatial_resolution
+            )
+            if pushed_down_data is not None:
+                _, _, aggregate_data = pushed_down_data
+                return pushed_down_data if aggregate_data.size > 0 else None
+
         bbox = GeoExtent(tile_gdf)
 
         aggregate_data = aggregate.retrieve_data(
@@ -818,119 +1471,229 @@ class LayerGroupBy:
 
         if isinstance(aggregate_data, xr.DataArray) and aggregate_data.data.size == 0:
             return None
+
+        mask_datum = [
+            mask.retrieve_data(
+                bbox=bbox,
+                s3_bucket=CIF_CACHE_S3_BUCKET_URI,
+                s3_env=DEFAULT_PRODUCTION_ENV,
+                spatial_resolution=spatial_resolution,
+            )
+            for mask in masks
+        ]
+
+        if layer is not None:
+            layer_data = layer.retrieve_data(
+                bbox=bbox,
+                s3_bucket=CIF_CACHE_S3_BUCKET_URI,
+                s3_env=DEFAULT_PRODUCTION_ENV,
+                spatial_resolution=spatial_resolution,
+            )
         else:
-            mask_datum = [
-                mask.retrieve_data(
-                    bbox=bbox,
-                    s3_bucket=CIF_CACHE_S3_BUCKET_URI,
-                    s3_env=DEFAULT_PRODUCTION_ENV,
-                    spatial_resolution=spatial_resolution,
-                )
-                for mask in masks
-            ]
+            layer_data = None
+
+        # align to highest resolution raster, which should be the largest raster
+        # since all are clipped to the extent
+        raster_data = [
+            data
+            for data in mask_datum + [aggregate_data] + [layer_data]
+            if isinstance(data, xr.DataArray)
+        ]
+        align_to = sorted(raster_data, key=lambda data: data.size, reverse=True).pop()
+        aligned_aggregate_data = LayerGroupBy._align(aggregate_data, align_to)
+        aligned_mask_datum = [LayerGroupBy._align(data, align_to) for data in mask_datum]
 
-            if layer is not None:
-                layer_data = layer.retrieve_data(
-                    bbox=bbox,
-                    s3_bucket=CIF_CACHE_S3_BUCKET_URI,
-                    s3_env=DEFAULT_PRODUCTION_ENV,
-                    spatial_resolution=spatial_resolution,
+        if layer is not None:
+            aligned_layer_data = LayerGroupBy._align(layer_data, align_to)
+        else:
+            aligned_layer_data = None
+
+        if aligned_mask_datum:
+            # combine the masks into one boolean buffer and copy the aggregate once
+            is_masked = np.isnan(aligned_mask_datum[0].values)
+            for mask in aligned_mask_datum[1:]:
+                np.logical_or(is_masked, np.isnan(mask.values), out=is_masked)
+            aligned_aggregate_data = aligned_aggregate_data.where(~is_masked)
+
+        return align_to, aligned_layer_data, aligned_aggregate_data
+
+    @staticmethod
+    def _can_push_down(bbox, aggregate, layer, masks):
+        """
+        Checks once per zonal statistic whether the tiles can be retrieved by _retrieve_pushed_down_tile_data. This
+        requires push-down to be enabled, every layer to have a server-side form from get_ee_image without masks
+        of its own, and no layer to be read from the S3 cache for the extent.
+        :param bbox: GeoExtent of the zones, as used to retrieve the layers
+        :return: True if the tiles are retrieved in one Earth Engine request each
+        """
+        data_layers = [aggregate, *masks] + ([] if layer is None else [layer])
+        if not PUSH_DOWN_EE_REQUESTS or len(data_layers) == 1:
+            return False
+        # masks of a mask or group-by layer are not applied by retrieve_data either, so only plain layers qualify
+        if any(data_layer.masks or data_layer.aggregate is not data_layer for data_layer in data_layers):
+            return False
+        if any(type(data_layer).get_ee_image is Layer.get_ee_image for data_layer in data_layers):
+            return False
+
+        standard_env = standardize_s3_env(DEFAULT_PRODUCTION_ENV)
+        return not any(
+            is_cache_usable(CIF_CACHE_S3_BUCKET_URI, standard_env, data_layer, bbox)
+            for data_layer in data_layers
+        )
+
+    @staticmethod
+    def _retrieve_pushed_down_tile_data(tile_gdf, aggregate, layer, masks, spatial_resolution):
+        """
+        Retrieves the masked aggregate, and the group-by layer as a second band, in one Earth Engine request. The
+        layers must have been checked with _can_push_down. The result is kept in the active tile cache, and tiles
+        whose layers are all in the tile cache already are retrieved layer by layer from there.
+        :return: tuple as returned by _retrieve_aligned_tile_data, or None if the tile is retrieved layer by layer
+        """
+        data_layers = [aggregate, *masks] + ([] if layer is None else [layer])
+        bbox = GeoExtent(tile_gdf)
+
+        tile_cache = get_active_tile_cache()
+        if tile_cache is not None:
+            # use the same keys as retrieve_data from _retrieve_aligned_tile_data
+            layer_cache_keys = [
+                build_tile_cache_key(
+                    data_layer,
+                    bbox,
+                    spatial_resolution,
+                    None,
+                    None,
+                    CIF_CACHE_S3_BUCKET_URI,
+                    DEFAULT_PRODUCTION_ENV,
                 )
-            else:
-                layer_data = None
-
-            # align to highest resolution raster, which should be the largest raster
-            # since all are clipped to the extent
-            raster_data = [
-                data
-                for data in mask_datum + [aggregate_data] + [layer_data]
-                if isinstance(data, xr.DataArray)
-            ]
-            align_to = sorted(
-                raster_data, key=lambda data: data.size, reverse=True
-            ).pop()
-            aligned_aggregate_data = LayerGroupBy._align(aggregate_data, align_to)
-            aligned_mask_datum = [
-                LayerGroupBy._align(data, align_to) for data in mask_datum
+                for data_layer in data_layers
             ]
+            if all(key in tile_cache for key in layer_cache_keys):
+                return None
+            tile_cache_key = ("pushed down", len(masks), *layer_cache_keys)
+            data = tile_cache.get(tile_cache_key)
+        else:
+            data = None
+
+        if data is None:
+            initialize_ee()
+            ee_images = []
+            for data_layer in data_layers:
+                ee_image = data_layer.get_ee_image(bbox, spatial_resolution)
+                if ee_image is None:
+                    return None
+                ee_images.append(ee_image)
+
+            # the request is made on the grid of the aggregate, which the masks and layer must share
+            aggregate_image, ee_rectangle, scale = ee_images[0]
+            if any(
+                image_rectangle["crs"] != ee_rectangle["crs"] or image_scale != scale
+                for _, image_rectangle, image_scale in ee_images[1:]
+            ):
+                return None
 
+            combined_image = aggregate_image.toFloat().rename("aggregate")
+            for mask_image, _, _ in ee_images[1 : len(masks) + 1]:
+                combined_image = combined_image.updateMask(mask_image.mask())
             if layer is not None:
-                aligned_layer_data = LayerGroupBy._align(layer_data, align_to)
-            else:
-                aligned_layer_data = None
+                layer_image, _, _ = ee_images[-1]
+                combined_image = combined_image.addBands(layer_image.toFloat().rename("layer"))
 
-            for mask in aligned_mask_datum:
-                aligned_aggregate_data = aligned_aggregate_data.where(~np.isnan(mask))
+            data = get_image_collection(
+                ee.ImageCollection(combined_image), ee_rectangle, scale, "masked aggregate"
+            )
+            data = data.rio.write_crs(ee_rectangle["crs"]).load()
+            if tile_cache is not None:
+                data = tile_cache.put(tile_cache_key, data)
 
-            # Get zones differently for single or multiple tiles
-            if isinstance(tile_gdf, GeoDataFrame):
-                tile_gdf = tile_gdf
-            else:
-                tile_gdf = tile_gdf.zones
+        aggregate_data = data.aggregate
+        layer_data = None if layer is None else data.layer
+
+        return aggregate_data, layer_data, aggregate_data
+
+    @staticmethod
+    def _compute_tile_stats(
+        stats_func,
+        has_layer,
+        tile_gdf,
+        geo_levels,
+        align_to,
+        aligned_layer_data,
+        aligned_aggregate_data,
+    ):
+        result_stats = None
+        if geo_levels is None:
+            result_stats = LayerGroupBy._compute_zonal_stats(
+                stats_func,
+                has_layer,
+                tile_gdf,
+                align_to,
+                aligned_layer_data,
+                aligned_aggregate_data,
+            )
+        else:
+            for level in geo_levels:
+                level_gdf = tile_gdf[tile_gdf["geo_level"] == level].copy()
 
-            result_stats = None
-            if "geo_level" not in zones.columns:
-                result_stats = LayerGroupBy._compute_zonal_stats(
+                stats = LayerGroupBy._compute_zonal_stats(
                     stats_func,
-                    layer,
-                    tile_gdf,
+                    has_layer,
+                    level_gdf,
                     align_to,
                     aligned_layer_data,
                     aligned_aggregate_data,
                 )
-            else:
-                geo_levels = zones["geo_level"].unique()
-                for index, level in enumerate(geo_levels):
-                    level_gdf = tile_gdf[tile_gdf["geo_level"] == level].copy()
-
-                    stats = LayerGroupBy._compute_zonal_stats(
-                        stats_func,
-                        layer,
-                        level_gdf,
-                        align_to,
-                        aligned_layer_data,
-                        aligned_aggregate_data,
-                    )
 
-                    # combine stats from each geo_level
-                    if result_stats is None:
-                        result_stats = stats
-                    else:
-                        # if metric values for a prior level are already in the results data, then merge in the new stats,
-                        # then combine them into a single column.
-                        merged_df = pd.merge(
-                            result_stats, stats, on="zone", how="outer"
+                # combine stats from each geo_level
+                if result_stats is None:
+                    result_stats = stats
+                else:
+                    # if metric values for a prior level are already in the results data, then merge in the new stats,
+                    # then combine them into a single column.
+                    merge_columns = ["zone", "layer"] if has_layer else "zone"
+                    merged_df = pd.merge(result_stats, stats, on=merge_columns, how="outer")
+
+                    for func in stats_func:
+                        func_x_col = f"{func}_x"
+                        func_y_col = f"{func}_y"
+                        merged_df[func] = merged_df[func_x_col].combine_first(
+                            merged_df[func_y_col]
                         )
 
-                        for func in stats_func:
-                            func_x_col = f"{func}_x"
-                            func_y_col = f"{func}_y"
-                            merged_df[func] = merged_df[func_x_col].combine_first(
-                                merged_df[func_y_col]
-                            )
-
-                            merged_df = merged_df.drop(columns=[func_x_col, func_y_col])
-                        result_stats = merged_df
+                        merged_df = merged_df.drop(columns=[func_x_col, func_y_col])
+                    result_stats = merged_df
 
-            return result_stats
+        return result_stats
 
     @staticmethod
     def _compute_zonal_stats(
-        stats_func, layer, tile_gdf, align_to, layer_data, aggregate_data
+        stats_func, has_layer, tile_gdf, align_to, layer_data, aggregate_data
     ):
-        zones = LayerGroupBy._rasterize(tile_gdf, align_to)
-
-        if layer is not None:
-            # encode layer into zones by bitshifting
-            zones = zones + (layer_data.astype("uint32") << 16)
+        zone_index = LayerGroupBy._get_zone_pixel_index(tile_gdf, align_to)
+        group_by_values = layer_data.values if has_layer else None
 
-        stats = zonal_stats(zones, aggregate_data, stats_funcs=stats_func)
+        return zone_index.zonal_stats(aggregate_data.values, stats_func, group_by_values)
 
-        return stats
+    @staticmethod
+    def _get_zone_pixel_index(gdf, snap_to: xr.DataArray):
+        # zones are rasterized once per set of zones and grid, and reused by later statistics and metrics
+        grid_shape = (snap_to.rio.height, snap_to.rio.width)
+        zone_index_cache = get_zone_pixel_index_cache()
+        key = zone_index_cache.build_key(gdf, snap_to.rio.transform(), grid_shape, snap_to.rio.crs)
+        cached_arrays = zone_index_cache.get(key)
+        if cached_arrays is not None:
+            return ZonePixelIndex.from_arrays(cached_arrays)
+
+        zone_raster = LayerGroupBy._rasterize(gdf, snap_to, fill=-1, dtype="int32").values.reshape(grid_shape)
+        zone_index = ZonePixelIndex.from_zone_raster(zone_raster)
+        zone_index_cache.put(key, zone_index.to_arrays())
+        return zone_index
 
     @staticmethod
     def _align(data_layer, align_to):
         if isinstance(data_layer, xr.DataArray):
+            aligned_data = LayerGroupBy._align_on_shared_grid(data_layer, align_to)
+            if aligned_data is not None:
+                return aligned_data
             try:
                 return data_layer.rio.reproject_match(align_to).assign_coords(
                     {
@@ -947,15 +1710,72 @@ class LayerGroupBy:
             raise NotImplementedError("Can only align DataArray or GeoDataFrame")
 
     @staticmethod
-    def _rasterize(gdf, snap_to: xr.DataArray):
+    def _align_on_shared_grid(data_layer: xr.DataArray, align_to: xr.DataArray):
+        """
+        Aligns without reprojection when data_layer has the grid of align_to, or a grid coarser by an integer
+        factor (e.g. 30 m onto 10 m) whose origin falls on a pixel corner of align_to and which covers align_to.
+        Nearest-neighbour resampling then reduces to repeating rows and columns, which matches reproject_match.
+
+        :return: the aligned data, or None when the grids require reprojection
+        """
+        if data_layer.dims != ("y", "x") or 0 in align_to.shape or data_layer.rio.crs != align_to.rio.crs:
+            return None
+
+        source_transform = data_layer.rio.transform()
+        target_transform = align_to.rio.transform()
+        if source_transform.b != 0 or source_transform.d != 0 or target_transform.b != 0 or target_transform.d != 0:
+            return None
+
+        target_shape = (align_to.rio.height, align_to.rio.width)
+        if data_layer.shape == target_shape and source_transform.almost_equals(
+            target_transform, precision=GRID_ALIGNMENT_TOLERANCE * abs(target_transform.a)
+        ):
+            return data_layer.assign_coords({"x": align_to.x, "y": align_to.y})
+
+        # resolution ratios and origin offsets in pixels of align_to, all of which must be integers
+        grid_ratios = [
+            source_transform.e / target_transform.e,
+            source_transform.a / target_transform.a,
+            (target_transform.f - source_transform.f) / target_transform.e,
+            (target_transform.c - source_transform.c) / target_transform.a,
+        ]
+        rounded_ratios = [round(ratio) for ratio in grid_ratios]
+        if any(abs(ratio - rounded) > GRID_ALIGNMENT_TOLERANCE for ratio, rounded in zip(grid_ratios, rounded_ratios)):
+            return None
+        row_factor, column_factor, row_offset, column_offset = rounded_ratios
+        if row_factor < 1 or column_factor < 1:
+            return None
+
+        row_positions = (row_offset + np.arange(target_shape[0])) // row_factor
+        column_positions = (column_offset + np.arange(target_shape[1])) // column_factor
+        if (
+            row_positions[0] < 0
+            or column_positions[0] < 0
+            or row_positions[-1] >= data_layer.shape[0]
+            or column_positions[-1] >= data_layer.shape[1]
+        ):
+            return None
+
+        aligned_data = xr.DataArray(
+            data_layer.values[np.ix_(row_positions, column_positions)],
+            dims=("y", "x"),
+            coords={"y": align_to.y, "x": align_to.x},
+            attrs=data_layer.attrs,
+        ).rio.write_crs(align_to.rio.crs)
+        if data_layer.rio.nodata is not None:
+            aligned_data = aligned_data.rio.write_nodata(data_layer.rio.nodata)
+        return aligned_data
+
+    @staticmethod
+    def _rasterize(gdf, snap_to: xr.DataArray, fill=np.nan, dtype="float32"):
         from rasterio.features import rasterize
         from shapely.validation import make_valid
 
-        gdf["geometry"] = gdf["geometry"].apply(make_valid)
+        # the GeoDataFrame may be shared through the tile cache, so it is not modified in place
+        gdf = gdf.assign(geometry=gdf["geometry"].apply(make_valid))
         if gdf.empty:
-            nan_array = np.full(snap_to.shape, np.nan, dtype=float)
-            raster = snap_to.copy(data=nan_array)
-            raster_da = raster.rio.reproject_match(snap_to)
+            fill_array = np.full(snap_to.shape, fill, dtype=dtype)
+            raster_da = snap_to.copy(data=fill_array)
         else:
             crs = snap_to.rio.crs
             reproj_gdf = gdf.to_crs(crs)
@@ -975,8 +1795,8 @@ class LayerGroupBy:
                 shapes=shapes,
                 out_shape=out_shape,
                 transform=transform,
-                fill=np.nan,  # Fill value for areas outside polygons
-                dtype="float32",
+                fill=fill,  # Fill value for areas outside polygons
+                dtype=dtype,
             )
 
             raster_da = xr.DataArray(
@@ -986,8 +1806,6 @@ class LayerGroupBy:
                 attrs={"name": "index"},
             ).rio.write_crs(reproj_gdf.crs)
 
-            raster_da = raster_da.rio.reproject_match(snap_to)
-
         return raster_da
 
 
@@ -1017,6 +1835,18 @@ class Layer:
         """
         ...
 
+    def get_ee_image(self, bbox: GeoExtent, spatial_resolution: int = None):
+        """
+        Server-side form of get_data for layers read from a single Earth Engine image, with value filters such as
+        thresholds applied by updateMask. LayerGroupBy uses it to combine the aggregate, masks and group-by layer
+        of a tile into a single Earth Engine request.
+        :param bbox: a GeoExtent object
+        :param spatial_resolution: resolution of continuous raster data in meters
+        :return: tuple of the single-band ee.Image, the ee_rectangle and the scale that get_data would request, or
+            None if the layer has no server-side form
+        """
+        return None
+
     def filename(self, bbox: GeoExtent) -> tuple:
         return get_file_name(geo_extent=bbox, class_obj=self.aggregate)
 
@@ -1128,6 +1958,7 @@ class Layer:
         aoi_buffer_m: int = None,
         spatial_resolution: int = None,
         force_data_refresh: bool = False,
+        resume: bool = False,
     ):
         """
         Gets data values from source and writes to an S3 bucket if the target does not already exist.
@@ -1137,6 +1968,7 @@ class Layer:
         :param aoi_buffer_m: AOI buffering size in meters used for writting to S3
         :param spatial_resolution: resolution of continuous raster data in meters
         :param force_data_refresh: whether to force data refresh from source
+        :param resume: whether to resume an interrupted tiled cache build, only fetching missing or failed tiles
         """
 
         if (
@@ -1158,11 +1990,13 @@ class Layer:
                 aoi_buffer_m,
             )
 
-        if not has_usable_cache:
+        if not has_usable_cache or resume:
             target_uri, _, _, _ = build_file_key(
                 s3_bucket, standard_env, self.aggregate, bbox, aoi_buffer_m
             )
-            self._build_city_cache(bbox, spatial_resolution, target_uri, aoi_buffer_m)
+            self._build_city_cache(
+                bbox, spatial_resolution, target_uri, aoi_buffer_m, resume
+            )
         else:
             print(f">>>Layer {self.aggregate.__class__.__name__} is already cached ..")
 
@@ -1186,6 +2020,22 @@ class Layer:
         :param spatial_resolution: resolution of continuous raster data in meters
         """
 
+        # Reuse data already retrieved within the active metric run
+        tile_cache = get_active_tile_cache()
+        if tile_cache is not None:
+            tile_cache_key = build_tile_cache_key(
+                self.aggregate,
+                bbox,
+                spatial_resolution,
+                aoi_buffer_m,
+                city_aoi_subarea,
+                s3_bucket,
+                s3_env,
+            )
+            cached_data = tile_cache.get(tile_cache_key)
+            if cached_data is not None:
+                return cached_data
+
         if s3_bucket is None or s3_env is None:
             standard_env = None
             has_usable_cache = False
@@ -1223,14 +2073,26 @@ class Layer:
                 target_uri, _, _, _ = build_file_key(
                     s3_bucket, standard_env, self.aggregate, bbox, aoi_buffer_m
                 )
-                self._build_city_cache(
-                    bbox, spatial_resolution, target_uri, aoi_buffer_m
-                )
+                try:
+                    self._build_city_cache(
+                        bbox, spatial_resolution, target_uri, aoi_buffer_m
+                    )
+                except CacheFolderLockedError as e:
+                    # the data was already retrieved, so the run continues and leaves caching to the lease holder
+                    print(f"Skipped caching {self.aggregate.__class__.__name__}: {e}")
+
+        if tile_cache is not None:
+            result_data = tile_cache.put(tile_cache_key, result_data)
 
         return result_data
 
     def _build_city_cache(
-        self, bbox, spatial_resolution, target_uri, aoi_buffer_m: int = None
+        self,
+        bbox,
+        spatial_resolution,
+        target_uri,
+        aoi_buffer_m: int = None,
+        resume: bool = False,
     ):
         if bbox.geo_type == GeoType.CITY_AREA or bbox.geo_type == GeoType.CITY_CENTROID:
             if hasattr(self.aggregate, "PROCESSING_TILE_SIDE_M"):
@@ -1260,6 +2122,7 @@ class Layer:
                         tile_side_m=tile_side_m,
                         spatial_resolution=spatial_resolution,
                         target_uri=target_uri,
+                        resume=resume,
                     )
                 else:
                     result_data = self.aggregate.get_data(
@@ -1279,6 +2142,8 @@ class Layer:
         results = []
         for path in file_paths:
             filename = os.path.basename(path)
+            if "_processing_failed" in filename:
+                continue
             id = int(filename.split("_", 1)[1].replace(".tif", ""))
             results.append(id)
         return results
@@ -1287,22 +2152,11 @@ class Layer:
         bbox.polygon.area
 
     def _cache_data_by_fishnet_tiles(
-        self, bbox, tile_side_m, spatial_resolution, target_uri
+        self, bbox, tile_side_m, spatial_resolution, target_uri, resume: bool = False
     ):
         # TODO: Code currently only handles raster data
-        # Write individual tiles to cache
-        delete_s3_file_if_exists(target_uri)
-        delete_s3_folder_if_exists(target_uri)
-        create_uri_target_folder(target_uri)
-
-        # Add notice file to folder
         processing_notice_file_uri = f"{target_uri}/{CIF_ACTIVE_PROCESSING_FILE_NAME}"
-        write_file_to_s3(
-            pd.DataFrame(),
-            processing_notice_file_uri,
-            CSV_FILE_EXTENSION,
-            keep_index=False,
-        )
+        grid_file_uri = f"{target_uri}/fishnet_grid.json"
 
         output_as = ProjectionType.UTM
         utm_box = bbox.as_utm_bbox()
@@ -1316,130 +2170,199 @@ class Layer:
             output_as=output_as,
         )
         fishnet["index"] = fishnet.index
-        fishnet["download_failed"] = "unknow"
         fishnet = fishnet[["index", "geometry"]].copy()
 
         # Temporary hack for testing
         # fishnet = fishnet.iloc[:6]
 
-        # Write grid to S3
         fishnet["tile_name"] = "tile_" + fishnet["index"].astype(str).str.zfill(
             TILE_NUMBER_PADCOUNT
         )
         fishnet["success"] = "unknown"
         fishnet = fishnet[["index", "tile_name", "success", "geometry"]].copy()
-        grid_file_uri = f"{target_uri}/fishnet_grid.json"
-        write_file_to_s3(fishnet, grid_file_uri, GEOJSON_FILE_EXTENSION)
 
-        # Write index
-        _write_grid_index_to_cache(fishnet, target_uri, crs)
+        # Honor an active lease held by another process before touching the folder
+        lease = _acquire_processing_lease(processing_notice_file_uri)
+        try:
+            can_resume = False
+            if resume:
+                can_resume = _is_cached_grid_resumable(target_uri, fishnet, crs)
+                if not can_resume:
+                    print(f"Existing tile grid for {target_uri} cannot be resumed. Rebuilding all tiles.")
+
+            if can_resume:
+                cached_objects = list_folder_objects(target_uri)
+                completed_tile_ids = self._get_intact_tile_ids(target_uri, cached_objects)
+                unretrieved_tiles = fishnet.drop(
+                    [tile_id for tile_id in completed_tile_ids if tile_id in fishnet.index]
+                )
+                # Remove placeholders of failed tiles since they will be re-fetched
+                for tile_id in unretrieved_tiles.index:
+                    failed_tile_name = construct_tile_name(tile_id, processing_had_failure=True)
+                    if failed_tile_name in cached_objects:
+                        delete_s3_file_if_exists(f"{target_uri}/{failed_tile_name}")
+                print(
+                    f"Resuming {target_uri}: {len(completed_tile_ids)} tiles already cached, "
+                    f"{len(unretrieved_tiles)} tiles remaining."
+                )
+            else:
+                # Write individual tiles to cache, keeping the notice file that holds the lease
+                delete_s3_file_if_exists(target_uri)
+                delete_s3_folder_if_exists(
+                    target_uri, keep_names=[CIF_ACTIVE_PROCESSING_FILE_NAME]
+                )
+                create_uri_target_folder(target_uri)
 
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Read from source and write to local temp directory
-            retry_count = 0
-            unretrieved_tiles = fishnet
-            while len(unretrieved_tiles) > 0 and retry_count < 3:
-                tasks = []
+                # Write grid to S3
+                write_file_to_s3(fishnet, grid_file_uri, GEOJSON_FILE_EXTENSION)
 
-                for index, tile in unretrieved_tiles.iterrows():
-                    task = dask.delayed(self._process_fishnet_tile)(
-                        index, tile, crs, spatial_resolution, temp_dir, target_uri
-                    )
-                    tasks.append(task)
+                # Write index
+                _write_grid_index_to_cache(fishnet, target_uri, crs)
 
-                # run them all in parallel with threads
-                target_gb = 3
-                retrieval_errors = []
-                try:
-                    retrieval_errors = self._run_tasks(tasks, target_gb)
-                except Exception as e:
-                    print(f"Failed to process a tile fo {target_uri}: {e}. Retrying.")
-
-                # Note this check only accounts for tiles that were missed due to dask failures and not download errors
-                unretrieved_tile_records = [
-                    (k, v)
-                    for error in retrieval_errors
-                    for k, v in error.items()
-                    if v is not None
-                ]
-                if len(unretrieved_tile_records) == 0:
-                    unretrieved_tiles = gpd.GeoDataFrame(geometry=[])
-                else:
-                    file_paths = self._list_all_tiff_filepaths_in_s3_folder(target_uri)
-                    completed_tile_ids = self._get_completed_tile_ids(file_paths)
-                    unretrieved_tiles = fishnet.drop(completed_tile_ids)
+                unretrieved_tiles = fishnet
 
-                retry_count += 1
+            unretrieved_tile_records = []
+            with tempfile.TemporaryDirectory() as temp_dir:
+                # Read from source and write to local temp directory
+                retry_count = 0
+                while len(unretrieved_tiles) > 0 and retry_count < 3:
+                    tasks = []
 
-        # Write unretrieved tiles with error and geometry to file in cache
-        if len(unretrieved_tile_records) > 0:
-            errors_df = pd.DataFrame(
-                unretrieved_tile_records, columns=["index", "error"]
-            )
-            errors_df.set_index("index", inplace=True)
-            errors_df.reset_index(inplace=True)
+                    for index, tile in unretrieved_tiles.iterrows():
+                        task = dask.delayed(self._process_fishnet_tile)(
+                            index, tile, crs, spatial_resolution, temp_dir, target_uri, lease
+                        )
+                        tasks.append(task)
+
+                    # run them all in parallel with threads
+                    target_gb = 3
+                    retrieval_errors = []
+                    try:
+                        retrieval_errors = self._run_tasks(tasks, target_gb)
+                    except CacheFolderLockedError:
+                        raise
+                    except Exception as e:
+                        print(f"Failed to process a tile fo {target_uri}: {e}. Retrying.")
+
+                    # Note this check only accounts for tiles that were missed due to dask failures and not download errors
+                    unretrieved_tile_records = [
+                        (k, v)
+                        for error in retrieval_errors
+                        for k, v in error.items()
+                        if v is not None
+                    ]
+                    if len(unretrieved_tile_records) == 0:
+                        unretrieved_tiles = gpd.GeoDataFrame(geometry=[])
+                    else:
+                        file_paths = self._list_all_tiff_filepaths_in_s3_folder(target_uri)
+                        completed_tile_ids = self._get_completed_tile_ids(file_paths)
+                        unretrieved_tiles = fishnet.drop(completed_tile_ids)
 
-            incomplete_tile_geometry = unretrieved_tiles.reset_index(drop=True)
+                    retry_count += 1
 
-            df_joined = pd.merge(
-                errors_df, incomplete_tile_geometry, on="index", how="left"
-            ).reset_index(drop=True)
-            df_joined = df_joined[["tile_name", "error", "geometry"]].reset_index(
-                drop=True
-            )
+            # Write unretrieved tiles with error and geometry to file in cache
+            lease.check()
+            if len(unretrieved_tile_records) > 0:
+                errors_df = pd.DataFrame(
+                    unretrieved_tile_records, columns=["index", "error"]
+                )
+                errors_df.set_index("index", inplace=True)
+                errors_df.reset_index(inplace=True)
 
-            # write failures
-            uri = f"{target_uri}/failed_downloads.csv"
-            write_file_to_s3(df_joined, uri, CSV_FILE_EXTENSION, keep_index=False)
+                incomplete_tile_geometry = unretrieved_tiles.reset_index(drop=True)
 
-            # create updated fishnet grid showing download failures
-            new_fishnet_grid = fishnet.merge(
-                errors_df, on="index", how="left", indicator=True
-            )
+                df_joined = pd.merge(
+                    errors_df, incomplete_tile_geometry, on="index", how="left"
+                ).reset_index(drop=True)
+                df_joined = df_joined[["tile_name", "error", "geometry"]].reset_index(
+                    drop=True
+                )
 
-            # Add 'failed' column: True if match found, else False
-            new_fishnet_grid["success"] = new_fishnet_grid["_merge"] != "both"
+                # write failures
+                uri = f"{target_uri}/failed_downloads.csv"
+                write_file_to_s3(df_joined, uri, CSV_FILE_EXTENSION, keep_index=False)
 
-            # Drop the merge indicator column if not needed
-            new_fishnet_grid.drop(columns=["error", "_merge"], inplace=True)
-            result_df = new_fishnet_grid[
-                ["tile_name", "success", "geometry"]
-            ].reset_index(drop=True)
-            write_file_to_s3(result_df, grid_file_uri, GEOJSON_FILE_EXTENSION)
+                # create updated fishnet grid showing download failures
+                new_fishnet_grid = fishnet.merge(
+                    errors_df, on="index", how="left", indicator=True
+                )
 
-        # remove the notice file
-        delete_s3_file_if_exists(processing_notice_file_uri)
+                # Add 'failed' column: True if match found, else False
+                new_fishnet_grid["success"] = new_fishnet_grid["_merge"] != "both"
+
+                # Drop the merge indicator column if not needed
+                new_fishnet_grid.drop(columns=["error", "_merge"], inplace=True)
+                result_df = new_fishnet_grid[
+                    ["tile_name", "success", "geometry"]
+                ].reset_index(drop=True)
+                write_file_to_s3(result_df, grid_file_uri, GEOJSON_FILE_EXTENSION)
+            elif can_resume:
+                # a resumed run completed all tiles, so clear failure reports from prior runs
+                delete_s3_file_if_exists(f"{target_uri}/failed_downloads.csv")
+                write_file_to_s3(fishnet, grid_file_uri, GEOJSON_FILE_EXTENSION)
+
+        finally:
+            # remove the notice file
+            lease.release()
+
+    def _get_intact_tile_ids(self, target_uri, cached_objects):
+        """
+        Returns ids of tiles already in the cache folder whose size and checksum match the values recorded
+        when the tile was written. Tiles written without recorded values are accepted if they are non-empty.
+        """
+        candidate_tiles = {
+            name: info
+            for name, info in cached_objects.items()
+            if name.startswith("tile_")
+            and name.endswith(f".{GTIFF_FILE_EXTENSION}")
+            and "_processing_failed" not in name
+            and info["size"] > 0
+        }
+
+        if not candidate_tiles:
+            return []
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        # the tiles are verified concurrently, since each check on S3 is a HEAD request
+        def _is_candidate_intact(item):
+            name, info = item
+            return _is_cached_tile_intact(f"{target_uri}/{name}", info)
+
+        max_workers = min(len(candidate_tiles), MAX_CONCURRENT_TILE_READS)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            is_intact = list(executor.map(_is_candidate_intact, candidate_tiles.items()))
+
+        return [
+            int(name.split("_", 1)[1].replace(".tif", ""))
+            for name, tile_is_intact in zip(candidate_tiles, is_intact)
+            if tile_is_intact
+        ]
 
-    def _write_data_to_cache(self, source_file_path, target_tile_uri):
+    def _write_data_to_cache(self, tile_data, temp_dir, target_tile_uri):
         if target_tile_uri.startswith("s3://"):
-            file_key = get_file_key_from_url(target_tile_uri)
-            bucket = get_bucket_name_from_s3_uri(target_tile_uri)
-
-            s3_client.upload_file(
-                source_file_path, bucket, file_key, ExtraArgs={"ACL": "public-read"}
-            )
+            # stream the encoded tile from memory, recording size and checksum so that resumed cache
+            # builds can verify the tile
+            tile_bytes = serialize_geotiff(tile_data)
+            metadata = {
+                TILE_SIZE_METADATA_KEY: str(len(tile_bytes)),
+                TILE_MD5_METADATA_KEY: hashlib.md5(tile_bytes).hexdigest(),
+            }
+            upload_bytes_to_s3(tile_bytes, target_tile_uri, metadata=metadata)
         else:
+            temp_file_path = os.path.join(temp_dir, os.path.basename(target_tile_uri))
+            write_layer(tile_data, temp_file_path, GTIFF_FILE_EXTENSION)
+
+            # move into place atomically so that a partially-copied tile is never mistaken for a complete one
             target_file_path = get_file_path_from_uri(target_tile_uri)
-            shutil.move(source_file_path, target_file_path)
+            partial_file_path = f"{target_file_path}.partial"
+            shutil.move(temp_file_path, partial_file_path)
+            os.replace(partial_file_path, target_file_path)
 
     def _run_tasks(self, tasks, target_gb: int):
-        import multiprocessing as mp
-
-        import psutil
         from dask import compute
 
-        memory_info = psutil.virtual_memory()
-        available_memory = memory_info.available  # Available memory in bytes
-        available_memory_gb = available_memory / (1024**3)
-        max_workers_by_memory = int(available_memory_gb / target_gb)
-
-        max_workers_by_cpu_availability = int(mp.cpu_count() - 1)
-
-        num_workers = (
-            max_workers_by_memory
-            if max_workers_by_memory < max_workers_by_cpu_availability
-            else max_workers_by_cpu_availability
-        )
+        num_workers = _get_worker_count(target_gb)
 
         memory_limit = f"{target_gb}GB"
 
@@ -1459,7 +2382,7 @@ class Layer:
         s3_bucket = get_bucket_name_from_s3_uri(target_uri)
 
         # List objects in the specified bucket and prefix
-        response = s3_client.list_objects_v2(Bucket=s3_bucket, Prefix=file_key)
+        response = get_s3_client().list_objects_v2(Bucket=s3_bucket, Prefix=file_key)
 
         # Extract filenames with .tif extension
         tif_files = [
@@ -1479,7 +2402,7 @@ class Layer:
         return tif_files
 
     def _process_fishnet_tile(
-        self, index, tile, crs, spatial_resolution, temp_dir, target_uri
+        self, index, tile, crs, spatial_resolution, temp_dir, target_uri, lease=None
     ):
         tile_bounds = tile["geometry"].bounds
         geo_extent = GeoExtent(tile_bounds, crs)
@@ -1515,6 +2438,10 @@ class Layer:
 
             retry_count += 1
 
+        # stop writing to the folder once another run has taken it over
+        if lease is not None:
+            lease.check()
+
         if tile_data is not None:
             _, tile_data = standardize_y_dimension_direction(tile_data)
 
@@ -1522,19 +2449,16 @@ class Layer:
             clipped_tile = extract_bbox_aoi(tile_data, geo_extent)
 
             file_name = construct_tile_name(index)
-            temp_file_path = os.path.join(temp_dir, file_name)
-            write_layer(clipped_tile, temp_file_path, GTIFF_FILE_EXTENSION)
 
-            # Cache the tile to S3 and remove temporary file
+            # Cache the tile
             target_tile_uri = f"{target_uri}/{file_name}"
             try:
                 print(f"\nWriting tile to {target_uri}")
-                self._write_data_to_cache(temp_file_path, target_tile_uri)
+                self._write_data_to_cache(clipped_tile, temp_dir, target_tile_uri)
             except Exception as e:
                 raise Exception(f"Failed to process {target_tile_uri}: {e}")
 
             gc.collect()
-            os.remove(temp_file_path)
 
             retrieval_errors = {index: None}
         else:
@@ -1544,7 +2468,8 @@ class Layer:
             # write empty placeholder file to s3
             bucket = get_bucket_name_from_s3_uri(target_tile_uri)
             file_key = get_file_key_from_url(target_tile_uri)
-            s3_client.put_object(Bucket=bucket, Key=file_key, Body="")
+            get_s3_client().put_object(Bucket=bucket, Key=file_key, Body="")
+            invalidate_cache_manifest(target_tile_uri)
 
             retrieval_errors = {index: failure_message}
 
@@ -1559,13 +2484,22 @@ class Layer:
         return Layer(aggregate=self, masks=self.masks + list(layers))
 
     def groupby(
-        self, geo_zone, spatial_resolution=None, layer=None, custom_tile_size_m=None
+        self,
+        geo_zone,
+        spatial_resolution=None,
+        layer=None,
+        custom_tile_size_m=None,
+        executor_mode=None,
+        max_in_flight_tiles=None,
     ):
         """
         Group layers by zones.
         :param geo_zone: GeoZone containing geometries to group by.
         :param spatial_resolution: resolution of continuous raster layers in meters
         :param layer: Additional categorical layer to group by
+        :param custom_tile_size_m: tile size in meters used for fishnetting large zones
+        :param executor_mode: how fishnet tiles are processed ("serial", "threads", "processes"). Defaults to "serial".
+        :param max_in_flight_tiles: maximum number of fishnet tiles processed concurrently. Defaults to a memory-based limit.
         :return: LayerGroupBy object that can be aggregated.
         """
         return LayerGroupBy(
@@ -1575,6 +2509,8 @@ class Layer:
             layer,
             custom_tile_size_m,
             self.masks,
+            executor_mode,
+            max_in_flight_tiles,
         )
 
     @staticmethod
@@ -1638,13 +2574,18 @@ def set_resampling_for_continuous_raster(
 
 
 def get_image_collection(
-    image_collection: ImageCollection, ee_rectangle, scale: int, name: str = None
+    image_collection: ImageCollection,
+    ee_rectangle,
+    scale: int,
+    name: str = None,
+    use_local_cache: bool = None,
 ) -> xr.DataArray:
     """
     Read an ImageCollection from Google Earth Engine into an xarray DataArray
     :param image_collection: the ee.ImageCollection to read
     :param bbox: the bounding box (min x, min y, max x, max y) to read the data from
     :param name: optional name to print while reporting progress
+    :param use_local_cache: whether to reuse downloads from the local on-disk cache. Defaults to USE_LOCAL_EE_CACHE.
     :return:
     """
     if scale is None:
@@ -1657,6 +2598,17 @@ def get_image_collection(
             "Output in geographic units is currently not supported for raster layers."
         )
 
+    initialize_ee()
+    use_local_cache = USE_LOCAL_EE_CACHE if use_local_cache is None else use_local_cache
+    if use_local_cache:
+        local_cache = get_image_collection_cache()
+        local_cache_key = ImageCollectionCache.build_key(
+            image_collection.serialize(), scale, crs, ee_rectangle["bounds"]
+        )
+        cached_data = local_cache.get(local_cache_key)
+        if cached_data is not None:
+            return cached_data
+
     try:
         data = xr.open_dataset(
             image_collection,
@@ -1687,6 +2639,10 @@ def get_image_collection(
     latitude_range = slice(south, north)
     result_data = data.sel(x=longitude_range, y=latitude_range)
 
+    if use_local_cache:
+        result_data = result_data.load()
+        local_cache.put(local_cache_key, result_data)
+
     return result_data
 
 
@@ -1842,9 +2798,10 @@ class Metric:
             target_uri, _, feature_id, _ = build_file_key(
                 s3_bucket, standard_env, self.metric, geo_zone, None
             )
-            result_metric = self.metric.get_metric(
-                geo_zone=geo_zone, spatial_resolution=spatial_resolution
-            )
+            with tile_cache_scope():
+                result_metric = self.metric.get_metric(
+                    geo_zone=geo_zone, spatial_resolution=spatial_resolution
+                )
 
             zones = geo_zone.zones
             if (
@@ -1903,9 +2860,10 @@ class Metric:
             target_uri, _, feature_id, _ = build_file_key(
                 s3_bucket, standard_env, self.metric, geo_zone, None
             )
-            result_metric = self.get_metric(
-                geo_zone=geo_zone, spatial_resolution=spatial_resolution
-            )
+            with tile_cache_scope():
+                result_metric = self.get_metric(
+                    geo_zone=geo_zone, spatial_resolution=spatial_resolution
+                )
 
             zones = geo_zone.zones
             if (
@@ -2000,6 +2958,31 @@ def standardize_s3_env(output_env):
         return standard_env
 
 
+def _get_worker_count(target_gb: float):
+    """
+    Number of concurrent workers that fit in available memory when each worker holds about target_gb,
+    capped by the CPU count and at least one.
+    """
+    import multiprocessing as mp
+
+    import psutil
+
+    memory_info = psutil.virtual_memory()
+    available_memory = memory_info.available  # Available memory in bytes
+    available_memory_gb = available_memory / (1024**3)
+    max_workers_by_memory = int(available_memory_gb / target_gb)
+
+    max_workers_by_cpu_availability = int(mp.cpu_count() - 1)
+
+    num_workers = (
+        max_workers_by_memory
+        if max_workers_by_memory < max_workers_by_cpu_availability
+        else max_workers_by_cpu_availability
+    )
+
+    return max(1, num_workers)
+
+
 def get_folder_size(folder_path):
     total_size = 0
     for dirpath, dirnames, filenames in os.walk(folder_path):
@@ -2022,12 +3005,11 @@ def string_to_float_list(s, delimiter=","):
 
 
 def _write_grid_index_to_cache(fishnet, file_uri, crs):
-    tiles_metadata = []
-    for index, tile in fishnet.iterrows():
-        tile_bounds = tile.geometry.bounds
-        tile_file_name = construct_tile_name(index)
-        tile_row = {"tile_name": tile_file_name, "bbox": tile_bounds}
-        tiles_metadata.append(tile_row)
+    tile_bounds = fishnet.bounds.to_numpy().tolist()
+    tiles_metadata = [
+        {"tile_name": construct_tile_name(index), "bbox": bounds}
+        for index, bounds in zip(fishnet.index, tile_bounds)
+    ]
 
     # Store CRS and file_uri at the top level
     metadata = {"crs": crs, "file_uri": file_uri, "tiles": tiles_metadata}
@@ -2036,6 +3018,184 @@ def _write_grid_index_to_cache(fishnet, file_uri, crs):
     write_json(metadata, metadata_file)
 
 
+TILE_SIZE_METADATA_KEY = "cif-size"
+TILE_MD5_METADATA_KEY = "cif-md5"
+
+
+def _is_cached_tile_intact(tile_uri, object_info):
+    if not tile_uri.startswith("s3://"):
+        # local tiles are moved into place atomically, so a non-empty file is complete
+        return object_info["size"] > 0
+
+    bucket = get_bucket_name_from_s3_uri(tile_uri)
+    file_key = get_file_key_from_url(tile_uri)
+    response = get_s3_client().head_object(Bucket=bucket, Key=file_key)
+    metadata = response.get("Metadata", {})
+
+    recorded_size = metadata.get(TILE_SIZE_METADATA_KEY)
+    if recorded_size is not None and int(recorded_size) != response["ContentLength"]:
+        return False
+
+    # ETags of single-part uploads are the MD5 of the content; multipart ETags contain a '-'
+    recorded_md5 = metadata.get(TILE_MD5_METADATA_KEY)
+    etag = response.get("ETag", "").strip('"')
+    if recorded_md5 is not None and "-" not in etag and etag != recorded_md5:
+        return False
+
+    return True
+
+
+def _is_cached_grid_resumable(target_uri, fishnet, crs):
+    """
+    A cached folder can be resumed if its grid and tile index exist and the index matches the requested grid.
+    """
+    cached_objects = list_folder_objects(target_uri)
+    if (
+        "fishnet_grid.json" not in cached_objects
+        or MULTI_TILE_TILE_INDEX_FILE not in cached_objects
+    ):
+        return False
+
+    index_uri = f"{target_uri}/{MULTI_TILE_TILE_INDEX_FILE}"
+    if index_uri.startswith("s3://"):
+        index_obj = get_s3_client().get_object(
+            Bucket=get_bucket_name_from_s3_uri(index_uri),
+            Key=get_file_key_from_url(index_uri),
+        )
+        metadata = json.loads(index_obj["Body"].read().decode("utf-8"))
+    else:
+        with open(get_file_path_from_uri(index_uri), "r") as index_file:
+            metadata = json.load(index_file)
+
+    cached_tiles = metadata.get("tiles", [])
+    if metadata.get("crs") != crs or len(cached_tiles) != len(fishnet):
+        return False
+
+    cached_names = [cached_tile["tile_name"] for cached_tile in cached_tiles]
+    if cached_names != [construct_tile_name(index) for index in fishnet.index]:
+        return False
+    cached_bounds = np.array([cached_tile["bbox"] for cached_tile in cached_tiles])
+    return bool(np.allclose(fishnet.bounds.to_numpy(), cached_bounds))
+
+
+def _build_processing_notice():
+    import socket
+    from datetime import datetime, timezone
+
+    return pd.DataFrame(
+        {
+            "host": [socket.gethostname()],
+            "pid": [os.getpid()],
+            "lease_renewed_utc": [datetime.now(timezone.utc).isoformat()],
+        }
+    )
+
+
+class CacheFolderLockedError(Exception):
+    """
+    Raised when the processing notice of a cache folder is held by another processing run.
+    """
+
+
+class ProcessingLease:
+    """
+    Lease on a cache folder held through its processing notice. The notice is renewed on a timer with a
+    conditional put against the ETag this run last wrote, so a run whose lease was taken over stops renewing
+    the notice and, through check, stops writing to the folder.
+    """
+
+    def __init__(
+        self,
+        processing_notice_file_uri,
+        etag,
+        lease_seconds=CIF_ACTIVE_PROCESSING_LEASE_SECONDS,
+    ):
+        self.processing_notice_file_uri = processing_notice_file_uri
+        self.etag = etag
+        self.is_lost = False
+        # renew well within the lease period so that a slow tile does not let the lease lapse
+        self._renewal_seconds = max(lease_seconds / 4, 1)
+        self._stop_event = threading.Event()
+        self._renewal_thread = threading.Thread(target=self._renew_periodically, daemon=True)
+        self._renewal_thread.start()
+
+    def _renew_periodically(self):
+        while not self._stop_event.wait(self._renewal_seconds):
+            if not self.renew():
+                return
+
+    def renew(self):
+        """
+        :return: whether the lease is still held
+        """
+        if self.is_lost:
+            return False
+        notice_body = _build_processing_notice().to_csv(index=False).encode("utf-8")
+        try:
+            etag = put_bytes_if_unchanged(
+                notice_body, self.processing_notice_file_uri, etag=self.etag
+            )
+        except Exception as e:
+            # a failed request does not mean the lease was taken over, so it is retried at the next renewal
+            print(f"Failed to renew processing notice {self.processing_notice_file_uri}: {e}")
+            return True
+        if etag is None:
+            print(f"Processing notice was taken over by another run: {self.processing_notice_file_uri}")
+            self.is_lost = True
+            return False
+        self.etag = etag
+        return True
+
+    def check(self):
+        if self.is_lost:
+            raise CacheFolderLockedError(
+                f"Cache folder lease was taken over by another processing run: {self.processing_notice_file_uri}"
+            )
+
+    def release(self):
+        self._stop_event.set()
+        self._renewal_thread.join()
+        # a notice that was taken over belongs to the new holder
+        if not self.is_lost:
+            delete_s3_file_if_exists(self.processing_notice_file_uri)
+
+
+def _acquire_processing_lease(
+    processing_notice_file_uri, lease_seconds=CIF_ACTIVE_PROCESSING_LEASE_SECONDS
+):
+    """
+    Treats the processing notice as a lock. A notice renewed within the lease period means another process is
+    actively building the cache, otherwise the stale notice is taken over.
+    The notice is written with a conditional put against the state that was read, so when several processes
+    race for the same folder only one of them acquires the lease.
+    :return: ProcessingLease, which must be released once the folder is written
+    """
+    from datetime import datetime, timezone
+
+    notice_state = get_uri_object_state(processing_notice_file_uri)
+    expected_etag = None
+    if notice_state is not None:
+        lease_age_s = (
+            datetime.now(timezone.utc) - notice_state["last_modified"]
+        ).total_seconds()
+        if lease_age_s < lease_seconds:
+            raise CacheFolderLockedError(
+                f"Cache folder is locked by an active processing run (notice renewed {int(lease_age_s)}s ago): "
+                f"{processing_notice_file_uri}"
+            )
+        print(f"Taking over stale processing notice: {processing_notice_file_uri}")
+        expected_etag = notice_state["etag"]
+
+    notice_body = _build_processing_notice().to_csv(index=False).encode("utf-8")
+    etag = put_bytes_if_unchanged(notice_body, processing_notice_file_uri, etag=expected_etag)
+    if etag is None:
+        raise CacheFolderLockedError(
+            f"Cache folder lease was acquired by another processing run: {processing_notice_file_uri}"
+        )
+
+    return ProcessingLease(processing_notice_file_uri, etag, lease_seconds)
+
+
 def construct_tile_name(tile_index, processing_had_failure: bool = False):
     padded_index = str(tile_index).zfill(TILE_NUMBER_PADCOUNT)
     if processing_had_failure is False:
@@ -176,6 +176,9 @@ def is_openurban_available_for_city(city_id):
     import ee
     import xee
 
+    from city_metrix import initialize_ee
+
+    initialize_ee()
     ic = ee.ImageCollection("projects/wri-datalab/cities/OpenUrban/OpenUrban_LULC")
     store = xee.EarthEngineStore(ic, ee_init_if_necessary=True)
 
@@ -0,0 +1,55 @@
+import time
+
+import numpy as np
+import pytest
+import xarray as xr
+from xrspatial import zonal_stats
+
+from city_metrix import metrix_model
+from city_metrix.metrix_model import ZonePixelIndex
+from tests.resources.conftest import DUMP_RUN_LEVEL, DumpRunLevel
+
+# Synthetic 4000 x 4000 tile with about as many zones as a city-wide set of neighborhoods
+GRID_SIDE = 4000
+ZONE_COUNT = 2000
+STATS_FUNCS = ["count", "sum", "mean", "min", "max", "std"]
+
+
+def _create_test_grid():
+    rng = np.random.default_rng(0)
+    zone_raster = rng.integers(-1, ZONE_COUNT, (GRID_SIDE, GRID_SIDE), dtype="int32")
+    values = rng.normal(30, 5, (GRID_SIDE, GRID_SIDE))
+    values[rng.random((GRID_SIDE, GRID_SIDE)) < 0.05] = np.nan
+    return zone_raster, values
+
+
+def _time(func):
+    start_time = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start_time
+
+
+@pytest.mark.skipif(DUMP_RUN_LEVEL != DumpRunLevel.RUN_SLOW_ONLY, reason=f"Skipping since DUMP_RUN_LEVEL set to {DUMP_RUN_LEVEL}")
+def test_zonal_stats_kernel_against_xrspatial(monkeypatch):
+    zone_raster, values = _create_test_grid()
+    zones = xr.DataArray(np.where(zone_raster >= 0, zone_raster, np.nan).astype("float32"), dims=("y", "x"))
+    xrspatial_stats, xrspatial_seconds = _time(
+        lambda: zonal_stats(zones, xr.DataArray(values, dims=("y", "x")), stats_funcs=STATS_FUNCS)
+    )
+
+    zone_index, index_seconds = _time(lambda: ZonePixelIndex.from_zone_raster(zone_raster))
+    timings = {"xrspatial": xrspatial_seconds}
+    for use_numba in [False, True]:
+        if use_numba and metrix_model._get_numba_moments_kernel() is None:
+            continue
+        monkeypatch.setattr(metrix_model, "USE_NUMBA_ZONAL_KERNEL", use_numba)
+        zone_index.zonal_stats(values, STATS_FUNCS)  # warm up the numba kernel
+        native_stats, native_seconds = _time(lambda: zone_index.zonal_stats(values, STATS_FUNCS))
+        timings["numba" if use_numba else "numpy"] = native_seconds
+
+        for func in STATS_FUNCS:
+            assert np.allclose(native_stats[func], xrspatial_stats[func], equal_nan=True)
+
+    print(f"\nZone index built in {index_seconds:.2f}s")
+    for path, seconds in timings.items():
+        print(f"{path}: {seconds:.2f}s")
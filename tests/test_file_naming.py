@@ -1,5 +1,6 @@
 from city_metrix import BuiltLandWithLowSurfaceReflectivity__Percent
 from city_metrix.constants import CIF_TESTING_S3_BUCKET_URI
+from city_metrix.metrix_dao import get_cache_manifest_prefix
 from city_metrix.layers import Albedo, AcagPM2p5, LandCoverHabitatChangeGlad, EsaWorldCover, EsaWorldCoverClass, Cams, \
     AqueductFlood
 from tests.resources.bbox_constants import GEOEXTENT_TERESINA
@@ -71,3 +72,10 @@ def test_custom_name_for_layer_with_two_custom_minor_param():
 
     assert is_custom_layer == True
     assert layer_id == 'AqueductFlood__ReturnPeriodC_rp0002__ReturnPeriodR_rp00002__StartYear_2050_EndYear_2050.tif'
+
+def test_cache_manifest_prefix():
+    layer_key = 'data/published/layers/Albedo/tif/BRA-Teresina__urban_extent__Albedo.tif/tile_00001.tif'
+    metric_key = 'data/published/metrics/BRA-Teresina/BRA-Teresina__urban_extent__Metric.csv'
+    assert get_cache_manifest_prefix(layer_key) == 'data/published/layers/Albedo/'
+    assert get_cache_manifest_prefix(metric_key) == 'data/published/metrics/BRA-Teresina/'
+    assert get_cache_manifest_prefix('other/folder/file.tif') == 'other/folder/'
@@ -66,6 +66,20 @@ def test_fishnet_in_meters():
     expected_count = 48
     assert actual_count == expected_count
 
+def test_fishnet_tile_order_and_bounds_only():
+    bbox = GeoExtent(bbox=(10.0, 10, 11, 11.5), crs=WGS_CRS)
+    result_fishnet = create_fishnet_grid(bbox, tile_side_length=0.5, length_units="degrees",
+                                         output_as=ProjectionType.GEOGRAPHIC)
+    result_bounds = create_fishnet_grid(bbox, tile_side_length=0.5, length_units="degrees",
+                                        output_as=ProjectionType.GEOGRAPHIC, bounds_only=True)
+
+    expected_bounds = [(10.0, 10.0, 10.5, 10.5), (10.5, 10.0, 11.0, 10.5),
+                       (10.0, 10.5, 10.5, 11.0), (10.5, 10.5, 11.0, 11.0),
+                       (10.0, 11.0, 10.5, 11.5), (10.5, 11.0, 11.0, 11.5)]
+    assert [tuple(bounds) for bounds in result_fishnet.bounds.to_numpy()] == expected_bounds
+    assert [tuple(bounds) for bounds in result_bounds] == expected_bounds
+    assert list(result_fishnet["immutable_fishnet_geometry"]) == list(result_fishnet.geometry)
+
 def test_extreme_large_side():
     bbox_crs = WGS_CRS
     bbox = GeoExtent((100, 45, 100.5, 45.5), bbox_crs)
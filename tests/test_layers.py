@@ -1,10 +1,13 @@
 import math
+import ee
+import geopandas as gpd
 import pytest
 import numpy as np
-import random
+from shapely.geometry import box
 
 from city_metrix.constants import ProjectionType
 from city_metrix.layers import *
+from city_metrix.metrix_model import LayerGroupBy, get_image_collection
 from city_metrix.metrix_tools import get_projection_type
 from tests.conftest import EXECUTE_IGNORED_TESTS
 from tests.resources.bbox_constants import BBOX_USA_OR_PORTLAND_1, BBOX_ARG_BUENOS_AIRES, GEOEXTENT_DURBAN
@@ -195,6 +198,79 @@ def test_nex_gddp_cmip6():
     data = NexGddpCmip6().get_data(BBOX)
     assert np.size(data) > 0
 
+def test_nex_gddp_cmip6_series_cache(tmp_path, monkeypatch):
+    from city_metrix.layers import nex_gddp_cmip6
+
+    fetched = []
+    def fake_fetch_var(varname, model, latlon, *args):
+        fetched.append(model)
+        return np.arange(365.0)
+    monkeypatch.setattr(nex_gddp_cmip6, 'SERIES_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(nex_gddp_cmip6, '_fetch_var', fake_fetch_var)
+
+    first = nex_gddp_cmip6.get_var('tasmax', 'MIROC6', (-5.01, 105.01))
+    # a nearby point in the same grid cell reuses the cached series
+    second = nex_gddp_cmip6.get_var('tasmax', 'MIROC6', (-5.02, 105.02))
+    assert fetched == ['MIROC6']
+    assert np.array_equal(first, second)
+
+    # ERA5 cells are centered on multiples of 0.25 degrees, so these points share a NEX-GDDP cell but not an ERA5 cell
+    nex_gddp_cmip6.get_var('tasmax', 'ERA5', (-5.01, 105.01))
+    nex_gddp_cmip6.get_var('tasmax', 'ERA5', (-5.2, 105.01))
+    nex_gddp_cmip6.get_var('tasmax', 'MIROC6', (-5.2, 105.01))
+    assert fetched == ['MIROC6', 'ERA5', 'ERA5']
+
+def _loop_calibration_function(hist_obs, hist_mod):
+    # reference implementation of the quantile mapping before vectorization
+    source = np.sort(hist_obs.flatten())
+    target = np.sort(hist_mod.flatten())
+    new_indices = []
+    for target_idx, target_value in enumerate(target):
+        if target_idx < len(source):
+            source_value = source[target_idx]
+            if source_value > target[-1]:
+                new_indices.append(target.size - 1)
+            else:
+                new_indices.append(np.argmax(target >= source_value))
+    return np.array(new_indices) / source.size
+
+def _loop_calibrate_interval(uncalibrated_data, calibration_fxn):
+    N = len(uncalibrated_data)
+    sorted_uncalib = sorted([(i, idx) for idx, i in enumerate(uncalibrated_data)])
+    result = [0] * N
+    for j in range(N):
+        X_j = j / (N + 1)
+        Y_jprime = calibration_fxn[math.floor(X_j * len(calibration_fxn))]
+        jprime = math.floor(Y_jprime * (N + 1))
+        result[sorted_uncalib[j][1]] = sorted_uncalib[min(len(sorted_uncalib) - 1, jprime)][0]
+    return result
+
+def test_nex_gddp_cmip6_vectorized_calibration():
+    from city_metrix.layers import nex_gddp_cmip6
+
+    rng = np.random.default_rng(42)
+    day_count = 365 * 3
+    hist_obs = rng.gamma(2, 5, day_count).round(1)
+    # rounding produces ties, and two models run hotter and colder than all observations
+    hist_mods = np.array([rng.gamma(2, 5, day_count).round(1) for _ in range(3)] + [hist_obs + 100, hist_obs - 100])
+    fut_mods = np.array([rng.gamma(2, 6, day_count).round(1) for _ in range(len(hist_mods))])
+
+    season_masks = nex_gddp_cmip6.get_season_masks(day_count)
+    fxns = [[nex_gddp_cmip6.calibration_function(hist_obs[m], hist_mod[m]) for m in season_masks]
+            for hist_mod in hist_mods]
+    for model_fxns, hist_mod in zip(fxns, hist_mods):
+        for fxn, m in zip(model_fxns, season_masks):
+            assert np.array_equal(fxn, _loop_calibration_function(hist_obs[m], hist_mod[m]))
+
+    expected = np.zeros(fut_mods.shape)
+    for model_idx, fut_mod in enumerate(fut_mods):
+        for fxn, m in zip(fxns[model_idx], season_masks):
+            expected[model_idx, m] = _loop_calibrate_interval(fut_mod[m], fxn)
+
+    # all models at once, and one model at a time
+    assert np.array_equal(nex_gddp_cmip6.calibrate(fut_mods, fxns), expected)
+    assert np.array_equal(nex_gddp_cmip6.calibrate(fut_mods[0], fxns[0]), expected[0])
+
 def test_openbuildings():
     data = OpenBuildings(COUNTRY_CODE_FOR_BBOX).get_data(BBOX)
     assert np.size(data) > 0
@@ -225,12 +301,83 @@ def test_overture_buildings():
     assert_vector_stats(data, 'height', 1, 2.00, 12.50, 1069, 188)
     assert get_projection_type(data.crs.srs) == ProjectionType.UTM
 
+def test_read_overture_buildings_from_local_parquet(tmp_path):
+    import json
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import shapely
+    from city_metrix.layers.overture_buildings import read_overture_buildings
+
+    def write_part(file_name, ids, boxes):
+        table = pa.table({
+            "id": ids,
+            "bbox": [{"xmin": b[0], "ymin": b[1], "xmax": b[2], "ymax": b[3]} for b in boxes],
+            "height": [10.0] * len(ids),
+            "names": [{"primary": name} for name in ids],
+            "geometry": [shapely.to_wkb(shapely.box(*b)) for b in boxes],
+        })
+        pq.write_table(table, tmp_path / file_name, row_group_size=1)
+
+    write_part("part-0.parquet", ["a", "b"], [(0, 0, 1, 1), (5, 5, 6, 6)])
+    write_part("part-1.parquet", ["c"], [(0.5, 0.5, 2, 2)])
+
+    buildings = read_overture_buildings((0, 0, 1.5, 1.5), str(tmp_path))
+    assert sorted(buildings["id"]) == ["a", "c"]
+    assert "bbox" not in buildings.columns
+    assert buildings.crs == "EPSG:4326"
+    assert json.loads(buildings.set_index("id").loc["a", "names"]) == {"primary": "a"}
+
+    projected = read_overture_buildings((4, 4, 7, 7), str(tmp_path), columns=["id"])
+    assert list(projected.columns) == ["id", "geometry"]
+    assert list(projected["id"]) == ["b"]
+
 def test_overture_buildings_height():
     data = OvertureBuildingsHeight(CITY_CODE_FOR_BBOX).get_data(BBOX)
     assert np.size(data) > 0
     assert_vector_stats(data, 'overture_height', 1, 2.0, 12.5, 1069, 188)
     assert get_projection_type(data.crs.srs) == ProjectionType.UTM
 
+def test_overture_buildings_min_touched_cell_values():
+    import shapely
+    import xarray as xr
+    from city_metrix.layers.overture_buildings_w_height import _get_min_touched_cell_values
+
+    # 3x3 grid of 100 m cells with values 0..8, north-up
+    raster = xr.DataArray(np.arange(9.0).reshape(3, 3), dims=("y", "x"),
+                          coords={"y": [250.0, 150.0, 50.0], "x": [50.0, 150.0, 250.0]}).rio.write_crs("EPSG:32633")
+    geometries = np.array([
+        shapely.box(120, 120, 180, 180),  # inside the center cell
+        shapely.box(180, 20, 280, 80),  # across the two lower-right cells, sharing one with the next building
+        shapely.box(120, 20, 190, 80),  # inside the bottom-center cell
+        shapely.box(500, 500, 600, 600),  # outside the raster
+    ])
+    min_values, has_cells = _get_min_touched_cell_values(raster, geometries)
+    assert list(has_cells) == [True, True, True, False]
+    assert list(min_values[has_cells]) == [4, 7, 7]
+
+def test_overture_buildings_mode_or_median_by_id():
+    import pandas as pd
+    from city_metrix.layers.overture_buildings_w_height import _mode_or_median_by_id
+
+    def mode_or_median(series):
+        # reference per-group implementation
+        mode_values = series.mode()
+        if mode_values.size == 1:
+            return mode_values.iloc[0]
+        sorted_values = np.sort(series)
+        return sorted_values[(len(sorted_values) - 1) // 2]
+
+    rng = np.random.default_rng(3)
+    ids = rng.choice(["a", "b", "c", "d", "e"], 200)
+    heights = rng.integers(1, 6, 200).astype(float)
+    # single values, all-distinct values and tied modes
+    ids = np.r_[ids, ["f", "g", "g", "g", "h", "h", "h", "h"]]
+    heights = np.r_[heights, [7.0, 3.0, 1.0, 2.0, 4.0, 4.0, 2.0, 2.0]]
+
+    expected = pd.Series(heights).groupby(ids).apply(mode_or_median)
+    result = _mode_or_median_by_id(pd.Series(ids), heights)
+    assert result.sort_index().to_dict() == expected.to_dict()
+
 def test_overture_buildings_dsm():
     data = OvertureBuildingsDSM().get_data(BBOX)
     assert np.size(data) > 0
@@ -273,12 +420,87 @@ def test_slope():
 
 def test_species_richness():
     taxon = GBIFTaxonClass.BIRDS
-    random.seed(42)
     data = SpeciesRichness(taxon=taxon).get_data(BBOX)
     assert np.size(data) > 0
+    # compared with a relative tolerance of 0.1, which absorbs the choice of random orderings (see
+    # test_species_count_estimate_is_stable_across_seeds)
     assert_vector_stats(data, "species_count", 1, 59, 59, 1, 0)
     assert get_projection_type(data.crs.srs) == ProjectionType.UTM
 
+def test_species_count_estimate_is_stable_across_seeds():
+    from city_metrix.layers.species_richness import estimate_species_count
+
+    # observations of 80 species with uneven abundances
+    abundances = 1 / np.arange(1, 81)
+    species = list(np.random.default_rng(1).choice(
+        [f"species_{i}" for i in range(80)], size=300, p=abundances / abundances.sum()))
+    estimate = estimate_species_count(species, 200, 1000, seed=0)
+    assert estimate == estimate_species_count(species, 200, 1000, seed=0)
+    # the estimate averages 200 curve fits, so other orderings stay within the tolerance of test_species_richness
+    for seed in [1, 42]:
+        assert math.isclose(estimate_species_count(species, 200, 1000, seed=seed), estimate, rel_tol=0.1)
+
+def test_species_accumulation_curves():
+    from city_metrix.layers.species_richness import species_accumulation_curves
+
+    species_codes = np.array([3, 0, 1, 3, 2, 0, 0, 4, 1, 3])
+    rng = np.random.default_rng(0)
+    curves = species_accumulation_curves(species_codes, 50, rng)
+    assert curves.shape == (50, 9)
+
+    # each curve matches counting distinct species over every prefix of the ordering it was built from
+    permutations = np.random.default_rng(0).permuted(np.tile(species_codes, (50, 1)), axis=1)
+    for curve, permutation in zip(curves, permutations):
+        assert list(curve) == [len(set(permutation[:count])) for count in range(1, len(permutation))]
+
+def test_fetch_occurrence_pages_from_stub_server(tmp_path):
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlparse
+    from city_metrix.layers.species_richness import fetch_occurrence_pages
+
+    records = [{"species": f"species {i % 4}", "decimalLongitude": i, "decimalLatitude": i} for i in range(7)]
+    requested_offsets = []
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            offset, limit = int(query["offset"][0]), int(query["limit"][0])
+            requested_offsets.append(offset)
+            body = json.dumps({"offset": offset, "count": len(records), "endOfRecords": offset + limit >= len(records),
+                               "results": records[offset:offset + limit]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        api_url = f"http://127.0.0.1:{server.server_port}/"
+        pages = fetch_occurrence_pages(api_url, {"taxon_key": 212}, 3, str(tmp_path), min_request_interval=0)
+        assert [result for page in pages for result in page["results"]] == records
+        assert sorted(requested_offsets) == [0, 3, 6]
+
+        # a repeated query is served from the page cache
+        cached_pages = fetch_occurrence_pages(api_url, {"taxon_key": 212}, 3, str(tmp_path), min_request_interval=0,
+                                              cache_ttl_seconds=3600)
+        assert cached_pages == pages
+        assert len(requested_offsets) == 3
+
+        # an expired query is requested again
+        records.append({"species": "species 4", "decimalLongitude": 7, "decimalLatitude": 7})
+        refreshed_pages = fetch_occurrence_pages(api_url, {"taxon_key": 212}, 3, str(tmp_path),
+                                                 min_request_interval=0, cache_ttl_seconds=0)
+        assert [result for page in refreshed_pages for result in page["results"]] == records
+        assert len(requested_offsets) == 6
+    finally:
+        server.shutdown()
+
 def test_surface_water():
     data = SurfaceWater().get_data(BBOX)
     assert np.size(data) > 0
@@ -345,6 +567,49 @@ def test_world_pop():
     assert get_projection_type(data.crs) == ProjectionType.UTM
 
 
+@pytest.mark.parametrize("layer, spatial_resolution, bbox", [
+    (Albedo(threshold=0.1), None, BBOX),
+    (EsaWorldCover(land_cover_class=EsaWorldCoverClass.BUILT_UP), None, BBOX),
+    (UrbanLandUse(ulu_class=1), None, BBOX),
+    (UrbanLandUse(ulu_class=1), 10, BBOX),
+    (UrbanLandUse(ulu_class=1), None, BBOX_ARG_BUENOS_AIRES),
+    (UrbanLandUse(ulu_class=1), 10, BBOX_ARG_BUENOS_AIRES),
+    (TreeCanopyHeight(height=3), None, BBOX),
+])
+def test_ee_image_matches_get_data(layer, spatial_resolution, bbox):
+    # thresholds applied by updateMask in get_ee_image must give the NaN pattern of get_data
+    ee_image, ee_rectangle, scale = layer.get_ee_image(bbox, spatial_resolution)
+    ee_data = get_image_collection(
+        ee.ImageCollection(ee_image.toFloat().rename("ee_image")), ee_rectangle, scale, "ee image"
+    ).ee_image
+    data = layer.get_data(bbox, spatial_resolution=spatial_resolution)
+
+    assert ee_data.shape == data.shape
+    expected = data.values.astype(float)
+    np.testing.assert_array_equal(np.isnan(ee_data.values), np.isnan(expected))
+    np.testing.assert_allclose(ee_data.values, expected, rtol=1e-6, equal_nan=True)
+
+def test_pushed_down_tile_matches_layer_by_layer():
+    # masks applied by updateMask(mask_image.mask()) must give the result of the client-side NaN masking
+    tile_gdf = gpd.GeoDataFrame(geometry=[box(*BBOX.bbox)], crs=BBOX.crs)
+    aggregate = Albedo()
+    masks = [EsaWorldCover(land_cover_class=EsaWorldCoverClass.BUILT_UP)]
+    layer = UrbanLandUse()
+
+    _, pushed_down_layer, pushed_down_aggregate = LayerGroupBy._retrieve_pushed_down_tile_data(
+        tile_gdf, aggregate, layer, masks, 10
+    )
+    _, aligned_layer, aligned_aggregate = LayerGroupBy._retrieve_aligned_tile_data(
+        tile_gdf, aggregate, layer, masks, 10, push_down=False
+    )
+
+    assert pushed_down_aggregate.shape == aligned_aggregate.shape
+    is_unmasked = ~np.isnan(aligned_aggregate.values)
+    np.testing.assert_array_equal(~np.isnan(pushed_down_aggregate.values), is_unmasked)
+    np.testing.assert_allclose(pushed_down_aggregate.values, aligned_aggregate.values, rtol=1e-6, equal_nan=True)
+    np.testing.assert_array_equal(pushed_down_layer.values[is_unmasked], aligned_layer.values[is_unmasked])
+
+
 def _eval_numeric(sig_digits, data_min_notnull_val, data_max_notnull_val, data_notnull_count, data_null_count,
                   min_notnull_val, max_notnull_val, notnull_count, null_count):
     float_tol = (10 ** -sig_digits)
@@ -1,6 +1,46 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import geopandas as gpd
 import numpy as np
+import pandas as pd
+import pytest
+import shapely
+import xarray as xr
 
+from city_metrix.cache_manager import (
+    ImageCollectionCache,
+    TileCache,
+    ZonePixelIndexCache,
+    build_tile_cache_key,
+    tile_cache_scope,
+)
+from city_metrix import metrix_dao, metrix_model
+from city_metrix.layers import Albedo, EsaWorldCover, EsaWorldCoverClass
+from city_metrix.metrix_dao import (
+    extract_bbox_aoi,
+    get_uri_object_state,
+    put_bytes_if_unchanged,
+    read_geotiff_subarea_from_cache,
+    serialize_geotiff,
+)
+from city_metrix.constants import DEFAULT_DEVELOPMENT_ENV, GeoType
+from city_metrix.metrix_model import (
+    CacheFolderLockedError,
+    GeoExtent,
+    Layer,
+    LayerGroupBy,
+    ZonalStatsAccumulator,
+    ZonePixelIndex,
+    _acquire_processing_lease,
+    compute_grouped_stats,
+)
 from city_metrix.metrix_tools import is_openurban_available_for_city
+from city_metrix.metrics.future_climate_hazard import bin_observed_values, sample_predictive_mean
+from city_metrix.metrics.habitat_connectivity import get_cluster_areas
 from .conftest import (
     IDN_JAKARTA_TILED_LARGE_ZONES,
     IDN_JAKARTA_TILED_ZONES,
@@ -46,6 +86,96 @@ def test_fishnetted_mean():
     assert all([mean == i for i, mean in enumerate(means)])
 
 
+def test_fishnetted_mean_executor_modes():
+    serial_means = convert_to_series(
+        MockLargeLayer()
+        .groupby(IDN_JAKARTA_TILED_LARGE_ZONES, executor_mode="serial")
+        .mean()
+    )
+    threaded_means = convert_to_series(
+        MockLargeLayer()
+        .groupby(IDN_JAKARTA_TILED_LARGE_ZONES, executor_mode="threads", max_in_flight_tiles=2)
+        .mean()
+    )
+    process_means = convert_to_series(
+        MockLargeLayer()
+        .groupby(IDN_JAKARTA_TILED_LARGE_ZONES, executor_mode="processes", max_in_flight_tiles=2)
+        .mean()
+    )
+    assert serial_means.size == 100
+    assert all(serial_means.values == threaded_means.values)
+    assert all(serial_means.values == process_means.values)
+
+
+def test_fishnetted_min_max_std():
+    zones_layer = MockLargeLayer().groupby(IDN_JAKARTA_TILED_LARGE_ZONES)
+    mins = convert_to_series(zones_layer.min())
+    maxs = convert_to_series(zones_layer.max())
+    stds = convert_to_series(zones_layer.std())
+    assert mins.size == 100
+    assert all([value == i for i, value in enumerate(mins)])
+    assert all([value == i for i, value in enumerate(maxs)])
+    assert all([value == 0 for value in stds])
+
+
+def test_agg():
+    stats = (MockLayer()
+             .groupby(IDN_JAKARTA_TILED_ZONES)
+             .agg(["count", "mean", "median", "p90"]))
+    assert list(stats.columns) == ["count", "mean", "median", "p90"]
+    assert len(stats) == 100
+    assert all(stats["count"] == 100)
+    for func in ["mean", "median", "p90"]:
+        assert all([value == i for i, value in enumerate(stats[func])])
+
+
+def test_fishnetted_agg():
+    stats = (MockLargeLayer()
+             .groupby(IDN_JAKARTA_TILED_LARGE_ZONES)
+             .agg(["count", "max", "std", "median"]))
+    assert len(stats) == 100
+    assert all(stats["count"] == 100)
+    assert all(stats["std"] == 0)
+    assert all([value == i for i, value in enumerate(stats["max"])])
+    assert all([value == i for i, value in enumerate(stats["median"])])
+
+
+def test_zonal_stats_accumulator():
+    accumulator = ZonalStatsAccumulator()
+    accumulator.add(pd.DataFrame({"zone": [0.0, 1.0], "count": [2, 1], "sum": [4.0, 3.0],
+                                  "variance": [1.0, 0.0]}))
+    accumulator.add(pd.DataFrame({"zone": [1.0, 2.0], "count": [1, np.nan], "sum": [5.0, np.nan],
+                                  "variance": [0.0, np.nan]}))
+
+    assert list(accumulator.result("count")["count"]) == [2, 2, 0]
+    means = accumulator.result("mean")["mean"]
+    assert list(means[:2]) == [2, 4] and np.isnan(means[2])
+    variances = accumulator.result("variance")["variance"]
+    assert list(variances[:2]) == [1, 1] and np.isnan(variances[2])
+
+
+def test_zonal_stats_accumulator_variance_with_large_offset():
+    # values 1e9 + [0, 1] and 1e9 + [0, 1] in two tiles; recovering the variance from sums of squares loses it
+    accumulator = ZonalStatsAccumulator()
+    accumulator.add(pd.DataFrame({"zone": [0.0], "count": [2], "sum": [2e9 + 1], "variance": [0.25]}))
+    accumulator.add(pd.DataFrame({"zone": [0.0], "count": [2], "sum": [2e9 + 1], "variance": [0.25]}))
+
+    assert accumulator.result("variance")["variance"].tolist() == [0.25]
+
+
+def test_zonal_stats_accumulator_order_stats():
+    # zone 1 is split across both tiles, so its median needs the values of both
+    accumulator = ZonalStatsAccumulator()
+    accumulator.add(pd.DataFrame({"zone": [0.0, 1.0], "count": [2, 1],
+                                  "values": [np.array([1.0, 3.0]), np.array([10.0])]}))
+    accumulator.add(pd.DataFrame({"zone": [1.0], "count": [2], "values": [np.array([2.0, 4.0])]}))
+
+    stats = accumulator.result(["count", "median", "p100"])
+    assert list(stats.columns) == ["zone", "count", "median", "p100"]
+    assert stats["median"].tolist() == [2, 4]
+    assert stats["p100"].tolist() == [3, 10]
+
+
 def test_masks():
     counts = (MockLayer()
               .mask(MockMaskLayer())
@@ -60,6 +190,26 @@ def test_masks():
             assert count == 100
 
 
+def test_masks_without_server_side_form_are_not_pushed_down(monkeypatch):
+    # layers without get_ee_image are retrieved and masked client-side
+    monkeypatch.setattr(metrix_model, "PUSH_DOWN_EE_REQUESTS", True)
+    assert MockLayer.get_ee_image is Layer.get_ee_image
+    assert not LayerGroupBy._can_push_down(
+        GeoExtent(IDN_JAKARTA_TILED_ZONES.zones), MockLayer(), None, [MockMaskLayer()]
+    )
+
+
+def test_nested_masks_are_not_pushed_down(monkeypatch):
+    # push-down is opt-in
+    assert not metrix_model.PUSH_DOWN_EE_REQUESTS
+    monkeypatch.setattr(metrix_model, "PUSH_DOWN_EE_REQUESTS", True)
+    # the masks of a mask layer would otherwise be dropped from the server-side request
+    masked_mask = EsaWorldCover(land_cover_class=EsaWorldCoverClass.BUILT_UP).mask(Albedo(threshold=0.1))
+    assert not LayerGroupBy._can_push_down(
+        GeoExtent(IDN_JAKARTA_TILED_ZONES.zones), Albedo(), None, [masked_mask]
+    )
+
+
 def test_group_by_layer():
     counts = (MockLayer()
               .groupby(IDN_JAKARTA_TILED_ZONES, layer=MockGroupByLayer())
@@ -91,6 +241,336 @@ def test_group_by_large_layer():
     assert all([count == {1: 50.0, 2: 50.0} for count in counts])
 
 
+class CountingMockLayer(MockLayer):
+    get_data_calls = 0
+
+    def get_data(self, bbox, spatial_resolution=None, resampling_method=None, force_data_refresh=False):
+        CountingMockLayer.get_data_calls += 1
+        return super().get_data(bbox, spatial_resolution, resampling_method, force_data_refresh)
+
+
+def test_tile_cache_reuses_retrieved_data():
+    CountingMockLayer.get_data_calls = 0
+    bbox = GeoExtent(IDN_JAKARTA_TILED_ZONES)
+    with tile_cache_scope() as tile_cache:
+        first = CountingMockLayer().retrieve_data(bbox, s3_bucket=None)
+        second = CountingMockLayer().retrieve_data(bbox, s3_bucket=None)
+    assert CountingMockLayer.get_data_calls == 1
+    assert tile_cache.hits == 1
+    assert first is second
+
+
+def test_tile_cache_key_compares_nested_layers_by_value():
+    bbox = GeoExtent(IDN_JAKARTA_TILED_ZONES)
+    first, second = MockLayer(), MockLayer()
+    first.reference_layer, second.reference_layer = MockMaskLayer(), MockMaskLayer()
+    assert build_tile_cache_key(first, bbox, 10) == build_tile_cache_key(second, bbox, 10)
+
+    second.reference_layer.resolution = 30
+    assert build_tile_cache_key(first, bbox, 10) != build_tile_cache_key(second, bbox, 10)
+
+
+def test_tile_cache_evicts_least_recently_used():
+    frame = pd.DataFrame({"value": np.arange(1000, dtype="float64")})
+    frame_bytes = int(frame.memory_usage(deep=True).sum())
+    tile_cache = TileCache(max_bytes=frame_bytes * 2)
+    tile_cache.put("a", frame)
+    tile_cache.put("b", frame.copy())
+    tile_cache.get("a")
+    tile_cache.put("c", frame.copy())
+    assert tile_cache.get("a") is not None
+    assert tile_cache.get("b") is None
+    assert tile_cache.get("c") is not None
+
+
+def test_image_collection_cache_hits_and_evicts(tmp_path):
+    dataset = xr.Dataset({"band": (("y", "x"), np.ones((100, 100), dtype="float32"))})
+    image_cache = ImageCollectionCache(str(tmp_path))
+    key_a = ImageCollectionCache.build_key("expression_a", 10, "EPSG:32748", (0, 0, 100, 100))
+    key_b = ImageCollectionCache.build_key("expression_b", 10, "EPSG:32748", (0, 0, 100, 100))
+
+    assert image_cache.get(key_a) is None
+    image_cache.put(key_a, dataset)
+    cached = image_cache.get(key_a)
+    assert cached is not None and cached["band"].equals(dataset["band"])
+
+    # age the first entry and shrink the budget to a single entry
+    entry_a = tmp_path / f"{key_a}.nc"
+    os.utime(entry_a, (1, 1))
+    image_cache.max_bytes = entry_a.stat().st_size
+    image_cache.put(key_b, dataset)
+    assert image_cache.get(key_b) is not None
+    assert image_cache.get(key_a) is None
+    assert (image_cache.hits, image_cache.misses) == (2, 2)
+
+
+def test_processing_lease_is_acquired_by_one_run(tmp_path):
+    notice_uri = str(tmp_path / "notice.csv")
+    lease = _acquire_processing_lease(notice_uri)
+    with pytest.raises(CacheFolderLockedError, match="locked by an active processing run"):
+        _acquire_processing_lease(notice_uri)
+    assert lease.renew()
+
+    # a stale notice is taken over, after which the previous holder can neither renew nor write tiles
+    os.utime(notice_uri, (1, 1))
+    new_lease = _acquire_processing_lease(notice_uri)
+    assert not lease.renew()
+    with pytest.raises(CacheFolderLockedError, match="taken over"):
+        lease.check()
+    lease.release()
+    assert os.path.exists(notice_uri)
+    new_lease.check()
+    new_lease.release()
+    assert not os.path.exists(notice_uri)
+
+    # conditional writes fail once another writer has created or changed the notice
+    etag = put_bytes_if_unchanged(b"notice", notice_uri)
+    assert etag == get_uri_object_state(notice_uri)["etag"]
+    assert put_bytes_if_unchanged(b"other", notice_uri) is None
+    os.utime(notice_uri, (2, 2))
+    assert put_bytes_if_unchanged(b"other", notice_uri, etag=etag) is None
+
+
+def test_locked_cache_folder_is_skipped_when_caching_opportunistically(tmp_path, monkeypatch):
+    notice_uri = str(tmp_path / "notice.csv")
+    lease = _acquire_processing_lease(notice_uri)
+
+    def _build_locked_city_cache(*args, **kwargs):
+        _acquire_processing_lease(notice_uri)
+
+    city_extent = GeoExtent(IDN_JAKARTA_TILED_ZONES)
+    monkeypatch.setattr(city_extent, "geo_type", GeoType.CITY_AREA)
+    monkeypatch.setattr(metrix_model, "is_cache_usable", lambda *args, **kwargs: False)
+    monkeypatch.setattr(metrix_model, "build_file_key", lambda *args, **kwargs: (str(tmp_path), None, None, None))
+    layer = MockLayer()
+    monkeypatch.setattr(layer, "_build_city_cache", _build_locked_city_cache)
+    try:
+        # the retrieved data is returned although the folder could not be cached
+        data = layer.retrieve_data(city_extent, s3_bucket=f"file://{tmp_path}", s3_env=DEFAULT_DEVELOPMENT_ENV)
+        assert data.size > 0
+    finally:
+        lease.release()
+
+
+def _create_utm_test_raster():
+    data = np.arange(100 * 100, dtype="float32").reshape(100, 100)
+    x_coords = 500000 + (np.arange(100) + 0.5) * 10
+    y_coords = 9300000 - (np.arange(100) + 0.5) * 10
+    raster = xr.DataArray(data, dims=("y", "x"), coords={"y": y_coords, "x": x_coords})
+    return raster.rio.write_crs("EPSG:32748")
+
+
+class _FakeS3Client:
+    def __init__(self, objects):
+        self.objects = objects
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+
+def _patch_cached_geotiff_reads(monkeypatch, objects, range_read_paths):
+    """
+    Serves cached objects from memory. Range reads through /vsis3/ are served from local files, or fail
+    when no local file is given so that the whole-object download is used.
+    """
+    import boto3
+    import rasterio
+    from rasterio.errors import RasterioIOError
+
+    rasterio_open = rasterio.open
+
+    def fake_open(path, *args, **kwargs):
+        if not str(path).startswith("s3://"):
+            return rasterio_open(path, *args, **kwargs)
+        if path not in range_read_paths:
+            raise RasterioIOError(f"range read failed: {path}")
+        return rasterio_open(range_read_paths[path], *args, **kwargs)
+
+    monkeypatch.setattr(rasterio, "open", fake_open)
+    monkeypatch.setattr(metrix_dao, "get_s3_client", lambda: _FakeS3Client(objects))
+    monkeypatch.setattr(
+        metrix_dao,
+        "get_aws_session",
+        lambda: boto3.Session(aws_access_key_id="test", aws_secret_access_key="test", region_name="us-east-1"),
+    )
+
+
+def test_geotiff_sub_area_range_read_and_fallback(tmp_path, monkeypatch):
+    raster = _create_utm_test_raster()
+    tile_bytes = serialize_geotiff(raster)
+    tile_path = tmp_path / "tile_00000.tif"
+    tile_path.write_bytes(tile_bytes)
+    sub_area = (500200, 9299300, 500500, 9299700)
+    expected = raster.sel(x=slice(500200, 500500), y=slice(9299700, 9299300)).values
+
+    # the window is read from the file without downloading the object
+    _patch_cached_geotiff_reads(monkeypatch, {}, {"s3://bucket/cache/tile_00000.tif": str(tile_path)})
+    monkeypatch.setattr(metrix_dao, "_is_s3_folder_or_file", lambda uri: "file")
+    range_read = read_geotiff_subarea_from_cache("s3://bucket/cache/tile_00000.tif", sub_area, "EPSG:32748")
+    assert (range_read.values == expected).all()
+
+    # a failed range read falls back to downloading the whole object
+    _patch_cached_geotiff_reads(monkeypatch, {"cache/tile_00000.tif": tile_bytes}, {})
+    downloaded = read_geotiff_subarea_from_cache("s3://bucket/cache/tile_00000.tif", sub_area, "EPSG:32748")
+    assert (downloaded.values == expected).all()
+    assert (downloaded.x.values == range_read.x.values).all()
+    assert (downloaded.y.values == range_read.y.values).all()
+
+
+def test_geotiff_sub_area_merged_across_tiles(monkeypatch):
+    raster = _create_utm_test_raster()
+    tiles = [raster.isel(x=slice(0, 50)), raster.isel(x=slice(50, 100))]
+    index = {
+        "file_uri": "s3://bucket/cache",
+        "crs": "EPSG:32748",
+        "tiles": [
+            {"tile_name": f"tile_{tile_id:05d}.tif", "bbox": list(tile.rio.bounds())}
+            for tile_id, tile in enumerate(tiles)
+        ],
+    }
+    objects = {f"cache/tile_{tile_id:05d}.tif": serialize_geotiff(tile) for tile_id, tile in enumerate(tiles)}
+    objects["cache/geotiff_index.json"] = json.dumps(index).encode("utf-8")
+    _patch_cached_geotiff_reads(monkeypatch, objects, {})
+    monkeypatch.setattr(metrix_dao, "_is_s3_folder_or_file", lambda uri: "folder")
+
+    sub_area = (500300, 9299300, 500700, 9299700)
+    merged = read_geotiff_subarea_from_cache("s3://bucket/cache", sub_area, "EPSG:32748")
+    expected = raster.sel(x=slice(500300, 500700), y=slice(9299700, 9299300))
+    assert (merged.values == expected.values).all()
+    # the transform of the merged sub-area starts at its own corner, not at the corner of the last tile
+    assert merged.rio.transform() == expected.rio.transform(recalc=True)
+
+
+def test_align_on_shared_grid():
+    raster = _create_utm_test_raster()
+    # the same grid is reused without reprojection
+    assert np.shares_memory(LayerGroupBy._align(raster, raster).values, raster.values)
+
+    # a 30 m grid whose origin is on a 10 m pixel corner is resampled by repeating pixels
+    coarse_data = np.arange(35 * 35, dtype="float32").reshape(35, 35)
+    coarse = xr.DataArray(coarse_data, dims=("y", "x"),
+                          coords={"y": 9300030 - (np.arange(35) + 0.5) * 30,
+                                  "x": 499970 + (np.arange(35) + 0.5) * 30}).rio.write_crs("EPSG:32748")
+    aligned = LayerGroupBy._align_on_shared_grid(coarse, raster)
+    assert aligned.shape == raster.shape
+    assert (aligned.values == coarse.rio.reproject_match(raster).values).all()
+
+    # an origin between pixel corners needs reprojection
+    shifted = coarse.assign_coords(x=coarse.x + 4).rio.write_crs("EPSG:32748")
+    assert LayerGroupBy._align_on_shared_grid(shifted, raster) is None
+
+
+def test_zone_pixel_index_stats_and_cache(tmp_path):
+    zone_raster = np.array([[0, 0, 1, -1], [2, 1, 1, -1], [2, 2, 0, 1]], dtype="int32")
+    values = np.array([[1, 2, 3, 4], [np.nan, np.nan, 7, 8], [np.nan, np.nan, 11, 12]])
+    zone_index = ZonePixelIndex.from_zone_raster(zone_raster)
+    assert np.array_equal(zone_index.to_raster(), zone_raster)
+
+    stats = zone_index.zonal_stats(values, ["count", "sum", "mean", "min", "max", "variance"])
+    assert list(stats["zone"]) == [0, 1, 2]
+    assert list(stats["count"][:2]) == [3, 3]
+    assert list(stats["sum"][:2]) == [14, 22]
+    assert list(stats["min"][:2]) == [1, 3]
+    assert list(stats["max"][:2]) == [11, 12]
+    assert np.isclose(stats["variance"][1], np.var([3, 7, 12]))
+    # a zone without finite values gets NaN statistics, as with xrspatial
+    assert np.isnan(stats.iloc[2, 1:].to_numpy(dtype="float64")).all()
+
+    zones = gpd.GeoDataFrame(geometry=[shapely.box(0, 0, 1, 1)], crs="EPSG:32633")
+    key = ZonePixelIndexCache.build_key(zones, (1, 0, 0, 0, -1, 3), (3, 4), "EPSG:32633")
+    ZonePixelIndexCache(cache_dir=str(tmp_path)).put(key, zone_index.to_arrays())
+    # a new process-wide cache reloads the persisted index
+    reloaded = ZonePixelIndex.from_arrays(ZonePixelIndexCache(cache_dir=str(tmp_path)).get(key))
+    assert np.array_equal(reloaded.to_raster(), zone_raster)
+
+
+def test_zonal_stats_kernel_percentiles_and_layer_groups():
+    rng = np.random.default_rng(0)
+    group_codes = rng.integers(0, 5, 1000)
+    values = rng.normal(size=1000)
+    values[::7] = np.nan
+    stats = compute_grouped_stats(group_codes, values, 6, ["count", "std", "min", "median", "p90"])
+    for group in range(5):
+        group_values = values[(group_codes == group) & np.isfinite(values)]
+        assert stats["count"][group] == len(group_values)
+        assert np.isclose(stats["std"][group], np.std(group_values))
+        assert stats["min"][group] == group_values.min()
+        assert np.isclose(stats["median"][group], np.median(group_values))
+        assert np.isclose(stats["p90"][group], np.percentile(group_values, 90))
+    # a group without values
+    assert np.isnan([stats[func][5] for func in stats]).all()
+
+    # zone ids beyond the 16 bits available to the former encoding of layer values
+    zone_index = ZonePixelIndex.from_zone_raster(np.array([[70000, 70000, 3], [3, -1, 70000]]))
+    values = np.array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+    layer_values = np.array([[1, 2, 1], [1, 1, 2]], dtype="float32")
+    stats = zone_index.zonal_stats(values, ["sum"], layer_values)
+    assert stats[["zone", "layer", "sum"]].values.tolist() == [[3, 1, 7], [70000, 1, 1], [70000, 2, 8]]
+
+
+def test_extract_bbox_aoi_aligned_slice():
+    raster = _create_utm_test_raster()
+    bbox = GeoExtent((500100, 9299500, 500300, 9299800), crs="EPSG:32748")
+    clipped = extract_bbox_aoi(raster, bbox)
+    assert clipped.shape == (30, 20)
+    assert clipped.rio.bounds() == (500100, 9299500, 500300, 9299800)
+    assert np.shares_memory(clipped.values, raster.values)
+    assert (clipped.values == raster.values[20:50, 10:30]).all()
+
+
+def test_extract_bbox_aoi_unaligned_regrid():
+    raster = _create_utm_test_raster()
+    bbox = GeoExtent((500104, 9299500, 500304, 9299800), crs="EPSG:32748")
+    clipped = extract_bbox_aoi(raster, bbox)
+    assert clipped.shape == (30, 20)
+    assert clipped.rio.bounds() == (500104, 9299500, 500304, 9299800)
+    assert (clipped.values == raster.values[20:50, 10:30]).all()
+
+
+def test_hazard_binning_and_predictive_sampling():
+    observed_vals = np.array([0, 1, 2, 4, 5, 9])
+    centervals, bincounts = bin_observed_values(observed_vals, 4)
+    assert np.allclose(centervals, [0, 3, 6, 9])
+    assert (bincounts == [2, 2, 1, 1]).all()
+
+    alpha = bincounts + 1 / 4
+    first = sample_predictive_mean(centervals, alpha, 4, num_samples=5000, seed=7, batch_size=1000)
+    # the sampled mean is reproducible for a seed and close to the Dirichlet expectation
+    assert first == sample_predictive_mean(centervals, alpha, 4, num_samples=5000, seed=7, batch_size=1000)
+    assert np.isclose(first, np.dot(alpha / alpha.sum(), centervals), atol=0.2)
+    # metrics do not pass a seed, so the default seed keeps their values reproducible
+    assert sample_predictive_mean(centervals, alpha, 4) == sample_predictive_mean(centervals, alpha, 4)
+
+
+def test_habitat_cluster_areas():
+    import shapely
+
+    # the first three patches are chained within 100 m of each other; the last is isolated
+    patches = np.array([shapely.box(0, 0, 100, 100), shapely.box(150, 0, 250, 100),
+                        shapely.box(300, 0, 350, 50), shapely.box(1000, 1000, 1100, 1100)])
+    cluster_areas = get_cluster_areas(patches, 100)
+    assert sorted(cluster_areas[cluster_areas > 0]) == [10000, 22500]
+    assert len(get_cluster_areas(patches[:0], 100)) == 0
+
+
+def test_import_is_lazy():
+    check = ("import sys, city_metrix, city_metrix.layers, city_metrix.metrics; "
+             "assert not {'ee', 'boto3', 'osmnx'} & set(sys.modules)")
+    assert subprocess.run([sys.executable, "-c", check]).returncode == 0
+
+
+def test_layers_without_earth_engine_do_not_initialize_it(monkeypatch):
+    import city_metrix
+
+    def fail_initialize_ee():
+        raise AssertionError("Earth Engine was initialized")
+
+    monkeypatch.setattr(city_metrix, "initialize_ee", fail_initialize_ee)
+    monkeypatch.setattr(metrix_model, "initialize_ee", fail_initialize_ee)
+    counts = MockLayer().mask(MockMaskLayer()).groupby(IDN_JAKARTA_TILED_ZONES).count()
+    assert convert_to_series(counts).size == 100
+
+
 def convert_to_series(data):
     if 'zone' in data.columns:
         data = data.drop(columns=['zone'])